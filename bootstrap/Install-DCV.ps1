@@ -15,6 +15,11 @@ HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTIO
 OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 #>
+# DCV server transport, keep in line with the DcvServerTransport output of the CDK samples.
+# QUIC streams over UDP next to the web (TCP) port.
+$EnableQuic = 1
+$WebPort = 8443
+$QuicPort = 8443
 $token = Invoke-RestMethod -Headers @{'X-aws-ec2-metadata-token-ttl-seconds' = '21600'} -Method PUT -Uri http://169.254.169.254/latest/api/token
 $instanceType = Invoke-RestMethod -Headers @{'X-aws-ec2-metadata-token' = $token} -Method GET -Uri http://169.254.169.254/latest/meta-data/instance-type
 $OSVersion = ((Get-ItemProperty -Path "Microsoft.PowerShell.Core\Registry::\HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion" -Name ProductName).ProductName) -replace  "[^0-9]" , ''
@@ -34,6 +39,15 @@ if($VirtualDisplayDriverRequired){
 }
 Invoke-Command -ScriptBlock {Start-Process "msiexec.exe" -ArgumentList "/I C:\Windows\Temp\DCVServer.msi ADDLOCAL=ALL /quiet /norestart /l*v dcv_install_msi.log " -Wait}
 while (-not(Get-Service dcvserver -ErrorAction SilentlyContinue)) { Start-Sleep -Milliseconds 250 }
+$dcvPath = "Microsoft.PowerShell.Core\Registry::\HKEY_USERS\S-1-5-18\Software\GSettings\com\nicesoftware\dcv"
+if (-not (Test-Path "$dcvPath\connectivity")) { New-Item -Path "$dcvPath\connectivity" | Out-Null }
+New-ItemProperty -Path "$dcvPath\connectivity" -Name enable-quic-frontend -PropertyType DWORD -Value $EnableQuic -force
+New-ItemProperty -Path "$dcvPath\connectivity" -Name web-port -PropertyType DWORD -Value $WebPort -force
+New-ItemProperty -Path "$dcvPath\connectivity" -Name quic-port -PropertyType DWORD -Value $QuicPort -force
+# The installer only opens the default port in Windows Firewall
+New-NetFirewallRule -DisplayName "DCV Server TCP $WebPort" -Direction Inbound -Protocol TCP -LocalPort $WebPort -Action Allow | Out-Null
+if ($EnableQuic) { New-NetFirewallRule -DisplayName "DCV Server UDP $QuicPort" -Direction Inbound -Protocol UDP -LocalPort $QuicPort -Action Allow | Out-Null }
+Restart-Service dcvserver
 
 # Automatic DCV Session Creation
 # https://docs.aws.amazon.com/dcv/latest/adminguide/managing-sessions-start.html#managing-sessions-start-auto
@@ -17,6 +17,11 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 #>
 $SessMgrDNS = "SESSION-MGR-PRIVATE-DNS"
 $BrokerAgentConnectionPort = "8445"
+# DCV server transport, keep in line with the DcvServerTransport output of the CDK samples.
+# QUIC streams over UDP next to the web (TCP) port.
+$EnableQuic = 1
+$WebPort = 8443
+$QuicPort = 8443
 $token = Invoke-RestMethod -Headers @{'X-aws-ec2-metadata-token-ttl-seconds' = '21600'} -Method PUT -Uri http://169.254.169.254/latest/api/token
 $instanceType = Invoke-RestMethod -Headers @{'X-aws-ec2-metadata-token' = $token} -Method GET -Uri http://169.254.169.254/latest/meta-data/instance-type
 $OSVersion = ((Get-ItemProperty -Path "Microsoft.PowerShell.Core\Registry::\HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows NT\CurrentVersion" -Name ProductName).ProductName) -replace  "[^0-9]" , ''
@@ -40,6 +45,13 @@ $dcvPath = "Microsoft.PowerShell.Core\Registry::\HKEY_USERS\S-1-5-18\Software\GS
 Set-ItemProperty -Path "$dcvPath\session-management" -Name create-session -Value 0 -force
 New-ItemProperty -Path "$dcvPath\security" -Name "auth-token-verifier" -Value "https://$SessMgrDNS`:$BrokerAgentConnectionPort/agent/validate-authentication-token" -Force
 New-ItemProperty -Path "$dcvPath\security" -Name no-tls-strict -PropertyType DWORD -Value 1 -force
+if (-not (Test-Path "$dcvPath\connectivity")) { New-Item -Path "$dcvPath\connectivity" | Out-Null }
+New-ItemProperty -Path "$dcvPath\connectivity" -Name enable-quic-frontend -PropertyType DWORD -Value $EnableQuic -force
+New-ItemProperty -Path "$dcvPath\connectivity" -Name web-port -PropertyType DWORD -Value $WebPort -force
+New-ItemProperty -Path "$dcvPath\connectivity" -Name quic-port -PropertyType DWORD -Value $QuicPort -force
+# The installer only opens the default port in Windows Firewall
+New-NetFirewallRule -DisplayName "DCV Server TCP $WebPort" -Direction Inbound -Protocol TCP -LocalPort $WebPort -Action Allow | Out-Null
+if ($EnableQuic) { New-NetFirewallRule -DisplayName "DCV Server UDP $QuicPort" -Direction Inbound -Protocol UDP -LocalPort $QuicPort -Action Allow | Out-Null }
 Stop-Service dcvserver
 
 Start-Job -Name SMWebReq -ScriptBlock { Invoke-WebRequest -uri https://d1uj6qtbmh3dt5.cloudfront.net/nice-dcv-session-manager-agent-x64-Release.msi -OutFile C:\Windows\Temp\DCVSMAgent.msi }  
@@ -0,0 +1,276 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Reports where DCV instances spend their boot time, from the phase events of their install logs
+
+The bootstrap installers and the CDK user data scripts write a JSON event when
+each phase starts and ends (imds, download, install, config, service, health,
+and broker-wait on the Connection Gateway) next to their free-form lines in
+/var/log/dcv-*-install.log. Collect the logs of many instances, for example
+with the CloudWatch agent or SSM Run Command, and run this script offline on
+the files or the folders holding them. Only the Python standard library is
+needed.
+
+    python3 boot_timing.py logs/
+    python3 boot_timing.py logs/ --component connection-gwy --slowest 5
+    python3 boot_timing.py gwy-*.log --json > boot-timing.json
+
+Times are seconds since the instance booted, read from /proc/uptime, so they
+include the time the OS took to start the user data. Events are grouped by the
+kernel boot ID, a file may hold several boots and a boot may span several files.
+A gateway resumed from a hibernated warm pool keeps its boot ID and is reported
+as a resume, timed from its first event.
+"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+
+# Time from kernel start to the first event, and time between phases on the critical path
+BOOT = 'boot'
+UNTRACKED = 'untracked'
+# Shorter gaps between phases are script overhead and stay out of the critical path
+UNTRACKED_MIN_SECONDS = 1.0
+
+
+def percentile(samples, pct):
+    """ Returns the pct percentile of an already sorted list of samples """
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+def read_events(paths):
+    """ Yields (file, event) for the phase events found in log files and folders, in file order """
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(folder, name)
+                           for folder, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as log_file:
+                for line in log_file:
+                    start = line.find('{"_phase"')
+                    if start < 0:
+                        continue
+                    try:
+                        yield file_path, json.loads(line[start:])
+                    except ValueError:
+                        continue
+
+
+class Boot:
+    """ The phases one component ran during one boot, or one resume from the warm pool """
+
+    def __init__(self, boot_id, component, resume=False):
+        self.boot_id = boot_id
+        self.component = component
+        self.resume = resume
+        self.files = set()
+        # Phase name to [start, end], end is None while the phase did not finish
+        self.phases = {}
+        self.first = None
+
+    def add(self, file_path, event):
+        """ Records an event, returns False when the phase already ran and a resume starts """
+        uptime = float(event['uptime'])
+        name = event['phase']
+        if event['event'] == 'start':
+            if name in self.phases and self.phases[name][1] is not None:
+                return False
+            self.phases[name] = [uptime, None]
+        elif event['event'] == 'end' and name in self.phases:
+            self.phases[name][1] = uptime
+        else:
+            return True
+        self.files.add(file_path)
+        if self.first is None or uptime < self.first:
+            self.first = uptime
+        return True
+
+    @property
+    def failed_phase(self):
+        """ Returns the first phase that started and never ended, None when the boot completed """
+        open_phases = sorted((start, name) for name, (start, end) in self.phases.items() if end is None)
+        return open_phases[0][1] if open_phases else None
+
+    @property
+    def origin(self):
+        """ Returns the uptime times are measured from, the kernel start or the first event of a resume """
+        return self.first if self.resume else 0.0
+
+    @property
+    def ready(self):
+        """ Returns the seconds from the origin until the last phase ended """
+        return max(end for _, end in self.phases.values() if end is not None) - self.origin
+
+    def critical_path(self):
+        """ Returns the (phase, seconds) that chained up to the ready time, in boot order
+
+        Walks back from the phase that ended last, each time to the phase that
+        ended last before the current one started. Phases running alongside the
+        path, like nested or background ones, are left out, and a gap of a second
+        or more between two phases on the path is reported as untracked.
+        """
+        done = [(start, end, name) for name, (start, end) in self.phases.items() if end is not None]
+        path = []
+        current = max(done, key=lambda phase: phase[1])
+        while current is not None:
+            path.append(current)
+            earlier = [phase for phase in done if phase[1] <= current[0] and phase not in path]
+            current = max(earlier, key=lambda phase: phase[1]) if earlier else None
+        path.reverse()
+
+        steps = []
+        previous_end = self.origin
+        if not self.resume:
+            # Kernel, cloud-init and the script up to its first event
+            steps.append((BOOT, path[0][0]))
+            previous_end = path[0][0]
+        for start, end, name in path:
+            if start - previous_end >= UNTRACKED_MIN_SECONDS:
+                steps.append((UNTRACKED, start - previous_end))
+            steps.append((name, end - start))
+            previous_end = end
+        return steps
+
+
+def group_boots(events):
+    """ Returns the Boot records of the events, a repeated phase of the same boot starts a resume """
+    boots = []
+    current = {}
+    for file_path, event in events:
+        key = (event.get('boot'), event.get('component'))
+        if key not in current:
+            current[key] = Boot(*key)
+            boots.append(current[key])
+        if not current[key].add(file_path, event):
+            current[key] = Boot(*key, resume=True)
+            boots.append(current[key])
+            current[key].add(file_path, event)
+    return [boot for boot in boots if boot.phases]
+
+def distribution(samples):
+    """ Returns the count, percentiles and mean of a list of seconds """
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'p50': percentile(samples, 50),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+        'max': samples[-1],
+        'mean': sum(samples) / len(samples)
+    }
+
+def summarize(boots):
+    """ Returns the per phase duration distributions and critical path shares of one component """
+    completed = [boot for boot in boots if boot.failed_phase is None]
+    launches = [boot.ready for boot in completed if not boot.resume]
+    resumes = [boot.ready for boot in completed if boot.resume]
+    durations = collections.defaultdict(list)
+    starts = collections.defaultdict(list)
+    for boot in boots:
+        if not boot.resume:
+            durations[BOOT].append(boot.first)
+            starts[BOOT].append(0.0)
+        for name, (start, end) in boot.phases.items():
+            starts[name].append(start - boot.origin)
+            if end is not None:
+                durations[name].append(end - start)
+
+    path_seconds = collections.Counter()
+    path_boots = collections.Counter()
+    for boot in completed:
+        for name, seconds in boot.critical_path():
+            path_seconds[name] += seconds
+            path_boots[name] += 1
+    total_ready = sum(boot.ready for boot in completed)
+
+    phases = {}
+    # Phases in the order they usually start, untracked time last
+    order = sorted(durations, key=lambda name: percentile(sorted(starts[name]), 50))
+    for name in order + ([UNTRACKED] if path_seconds[UNTRACKED] else []):
+        stats = distribution(durations[name]) if name in durations else {'count': path_boots[name]}
+        stats['criticalPathBoots'] = path_boots[name]
+        stats['criticalPathShare'] = path_seconds[name] / total_ready if total_ready else 0.0
+        phases[name] = stats
+
+    return {
+        'boots': len([boot for boot in boots if not boot.resume]),
+        'resumes': len([boot for boot in boots if boot.resume]),
+        'incomplete': dict(collections.Counter(boot.failed_phase for boot in boots
+                                               if boot.failed_phase is not None)),
+        'ready': distribution(launches) if launches else None,
+        'resumeReady': distribution(resumes) if resumes else None,
+        'phases': phases
+    }
+
+def print_report(component, summary):
+    """ Prints the summary of one component as a table """
+    print(f"{component}: {summary['boots']} boots, {summary['resumes']} resumes")
+    if summary['incomplete']:
+        failed = ', '.join(f"{name} {count}" for name, count in sorted(summary['incomplete'].items()))
+        print(f"  incomplete, by phase left open: {failed}")
+    for key, label in (('ready', 'boot'), ('resumeReady', 'resume')):
+        if summary[key]:
+            ready = summary[key]
+            print(f"  {label} to ready p50/p90/p99 {ready['p50']:.1f} / {ready['p90']:.1f} / "
+                  f"{ready['p99']:.1f} s (max {ready['max']:.1f} s)")
+    print(f"  {'phase':<16}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+          f"{'critical':>10}{'share':>8}")
+    for name, stats in summary['phases'].items():
+        if 'p50' in stats:
+            times = ''.join(f"{stats[key]:>9.1f}" for key in ('p50', 'p90', 'p99', 'max'))
+        else:
+            times = f"{'':>36}"
+        print(f"  {name:<16}{stats['count']:>7}{times}"
+              f"{stats['criticalPathBoots']:>10}{stats['criticalPathShare']:>8.1%}")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help="install logs, or folders of collected logs")
+    parser.add_argument('--component', help="only report this component, for example connection-gwy")
+    parser.add_argument('--slowest', type=int, default=0, help="list the critical path of the N slowest boots")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    boots = group_boots(read_events(args.paths))
+    if args.component:
+        boots = [boot for boot in boots if boot.component == args.component]
+    if not boots:
+        sys.exit("No phase events found")
+
+    components = collections.defaultdict(list)
+    for boot in boots:
+        components[boot.component].append(boot)
+    report = {component: summarize(component_boots)
+              for component, component_boots in sorted(components.items())}
+
+    completed = sorted((boot for boot in boots if boot.failed_phase is None),
+                       key=lambda boot: boot.ready, reverse=True)
+    slowest = [{
+        'component': boot.component,
+        'boot': boot.boot_id,
+        'resume': boot.resume,
+        'files': sorted(boot.files),
+        'ready': boot.ready,
+        'criticalPath': [[name, seconds] for name, seconds in boot.critical_path()]
+    } for boot in completed[:args.slowest]]
+
+    if args.json:
+        json.dump({'components': report, 'slowest': slowest}, sys.stdout, indent=2)
+        print()
+        return
+    for component, summary in report.items():
+        print_report(component, summary)
+    for boot in slowest:
+        path = ' > '.join(f"{name} {seconds:.1f}" for name, seconds in boot['criticalPath'])
+        print(f"{boot['component']} {boot['boot']}{' (resume)' if boot['resume'] else ''}: "
+              f"ready in {boot['ready']:.1f} s, {', '.join(boot['files'])}")
+        print(f"  {path}")
+
+
+if __name__ == '__main__':
+    main()
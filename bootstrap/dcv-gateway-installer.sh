@@ -18,6 +18,13 @@
 
 set -eE
 
+# Boot phase timing, one JSON event per phase start and end, read by boot_timing.py
+LOG_PATH="/var/log/dcv-connection-gwy-install.log"
+PHASE_COMPONENT="connection-gwy"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
 # Retrieve System Info
 read -r system version <<<$(echo $(cat /etc/os-release | grep "^ID=\|^VERSION_ID=" | sort | cut -d"=" -f2 | tr -d "\"" | tr '[:upper:]' '[:lower:]'))
 major_version="${version%.*}"
@@ -64,6 +71,7 @@ if [ -z "$package_type" ]; then
 fi
 
 # Download Packages
+phase start download
 if [ "$package_manager" = apt ]; then
     curl -o "$TMP_DIR/NICE-GPG-KEY" "$CLOUDFRONT_PREFIX/NICE-GPG-KEY"
     gpg --import "$TMP_DIR/NICE-GPG-KEY"
@@ -80,23 +88,42 @@ else
     curl -o "$TMP_DIR/nice-dcv-connection-gateway.$package_extension" "$CLOUDFRONT_PREFIX/nice-dcv-connection-gateway-$package_type.$arch.$package_extension"
     curl -o "$TMP_DIR/nice-dcv-server.tgz" "$CLOUDFRONT_PREFIX/nice-dcv-$package_type-$arch.tgz"
 fi 
+phase end download
 
 # Install Packages
+phase start install
 tar -xvzf "$TMP_DIR/nice-dcv-server.tgz" -C "$TMP_DIR"
 for package_pattern in "nice-dcv-web-viewer*" "nice-dcv-connection-gateway.$package_extension"; do
     package_full_path=$(find "$TMP_DIR" -name "$package_pattern")
     "$package_manager" install -y "$package_full_path"
 done
+phase end install
 
 # Configure Gateway
+phase start config
 ## Enables Web Access through the Gateway
 sed -i --expression 's|url = "https://localhost:8080"|local-resources-path = "/usr/share/dcv/www"|' /etc/dcv-connection-gateway/dcv-connection-gateway.conf
 ## Uncomment the line below to add your Session Resolver and replace the placeholder
 #sed -i --expression 's|url = "https://localhost:8081"|url = "https://RESOLVER-URL"|' /etc/dcv-connection-gateway/dcv-connection-gateway.conf
+phase end config
 
 # Enable and start Gateway
+phase start service
 systemctl enable dcv-connection-gateway
 systemctl start dcv-connection-gateway
+phase end service
 
 # Clean Up
 rm -rf "$TMP_DIR"
+
+# Log the time from boot until the gateway answers on its web port, 8443 unless web-listen-endpoints sets one
+GATEWAY_PORT=$(sed -n 's/^\s*web-listen-endpoints\s*=\s*\[\s*"[^"]*:\([0-9]\+\)".*/\1/p' /etc/dcv-connection-gateway/dcv-connection-gateway.conf | head -1)
+GATEWAY_PORT="${GATEWAY_PORT:-8443}"
+phase start health
+for attempt in $(seq 1 60); do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/$GATEWAY_PORT"; then
+        phase end health
+        break
+    fi
+    sleep 1
+done
@@ -18,6 +18,13 @@
 
 set -eE
 
+# Boot phase timing, one JSON event per phase start and end, read by boot_timing.py
+LOG_PATH="/var/log/dcv-session-mgr-install.log"
+PHASE_COMPONENT="session-mgr"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
 # Retrieve System Info
 read -r system version <<<$(echo $(cat /etc/os-release | grep "^ID=\|^VERSION_ID=" | sort | cut -d"=" -f2 | tr -d "\"" | tr '[:upper:]' '[:lower:]'))
 major_version="${version%.*}"
@@ -64,6 +71,7 @@ if [ -z "$package_type" ]; then
 fi
 
 # Download Packages
+phase start download
 if [ "$package_manager" = apt ]; then
     curl -o "$TMP_DIR/NICE-GPG-KEY" "$CLOUDFRONT_PREFIX/NICE-GPG-KEY"
     gpg --import "$TMP_DIR/NICE-GPG-KEY"
@@ -72,18 +80,22 @@ else
     rpm --import "$CLOUDFRONT_PREFIX"/NICE-GPG-KEY
     curl -o "$TMP_DIR/nice-dcv-session-manager-broker.$package_extension" "$CLOUDFRONT_PREFIX/nice-dcv-session-manager-broker-$package_type.noarch.$package_extension"
 fi 
+phase end download
 
 # Install Packages
+phase start install
 for package_pattern in "nice-dcv-session-manager-broker.$package_extension"; do
     package_full_path=$(find "$TMP_DIR" -name "$package_pattern")
     "$package_manager" install -y "$package_full_path"
 done
+phase end install
 
 # Enable and start DCV Session Manager service
 systemctl start dcv-session-manager-broker
 systemctl enable dcv-session-manager-broker
 
 # Configure DCV Session Manager
+phase start config
 CONFIG_PATH="/etc/dcv-session-manager-broker/session-manager-broker.properties"
 TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`
 REGION=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/placement/region)
@@ -101,9 +113,22 @@ sed -i '/gateway-to-broker-connector-bind-host/s/^#\s//g' "$CONFIG_PATH"
 #sed -i '/dynamodb-table-wcu/s/^#\s//g' "$CONFIG_PATH"
 #sed -i '/dynamodb-table-name-prefix/s/^#\s//g' "$CONFIG_PATH"
 #sed -i "/^dynamodb-region/s/=.*$/= $REGION/" "$CONFIG_PATH"
+phase end config
 
 # Restart the broker service
+phase start service
 systemctl restart dcv-session-manager-broker.service
+phase end service
 
 # Clean Up
-rm -rf "$TMP_DIR"
\ No newline at end of file
+rm -rf "$TMP_DIR"
+
+# Log the time from boot until the broker answers on its gateway port 8447
+phase start health
+for attempt in $(seq 1 60); do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/8447"; then
+        phase end health
+        break
+    fi
+    sleep 1
+done
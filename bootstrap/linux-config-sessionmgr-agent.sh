@@ -14,11 +14,48 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+# Boot phase timing, one JSON event per phase start and end, read by boot_timing.py
+LOG_PATH="/var/log/dcv-session-mgr-agent-install.log"
+PHASE_COMPONENT="session-mgr-agent"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
 BROKER_PRIVATE_DNS="SESSION-MGR-PRIVATE-DNS"
+
+# DCV server transport, keep in line with the DcvServerTransport output of the CDK samples.
+# QUIC streams over UDP next to the web (TCP) port. UDP_BUFFER_BYTES follows udpBufferBytes of the
+# transport profile, UDP_BUFFER_BYTES="" keeps the kernel defaults.
+ENABLE_QUIC="true"
+WEB_PORT="8443"
+QUIC_PORT="8443"
+UDP_BUFFER_BYTES="8388608"
+
+phase start config
 sed -i --expression "s|#auth-token-verifier=\"https://127.0.0.1:8444\"|auth-token-verifier=\"https://$BROKER_PRIVATE_DNS:8445/agent/validate-authentication-token\"|" /etc/dcv/dcv.conf
 sed -i "/\[security\]/a administrators=[\"dcvsmagent\"]\nno-tls-strict=true" /etc/dcv/dcv.conf
+grep -q "^\[connectivity\]" /etc/dcv/dcv.conf || echo "[connectivity]" >> /etc/dcv/dcv.conf
+sed -i "/^\s*\(enable-quic-frontend\|web-port\|quic-port\)\s*=/d" /etc/dcv/dcv.conf
+sed -i "/^\[connectivity\]/a enable-quic-frontend=$ENABLE_QUIC\nweb-port=$WEB_PORT\nquic-port=$QUIC_PORT" /etc/dcv/dcv.conf
+if [ -n "$UDP_BUFFER_BYTES" ]; then
+    printf "net.core.%s = $UDP_BUFFER_BYTES\n" rmem_max wmem_max rmem_default wmem_default > /etc/sysctl.d/90-dcv-quic.conf
+    sysctl -p /etc/sysctl.d/90-dcv-quic.conf > /dev/null
+fi
 sed -i --expression "s|broker_host = ''|broker_host = \"$BROKER_PRIVATE_DNS\"|" /etc/dcv-session-manager-agent/agent.conf
 sed -i --expression 's|#tls_strict = false|tls_strict = false|' /etc/dcv-session-manager-agent/agent.conf
+phase end config
+phase start service
 systemctl enable dcv-session-manager-agent.service
 systemctl start dcv-session-manager-agent
-systemctl restart dcvserver
\ No newline at end of file
+systemctl restart dcvserver
+phase end service
+
+# Log the time from boot until the DCV server answers on its web port
+phase start health
+for attempt in $(seq 1 60); do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/$WEB_PORT"; then
+        phase end health
+        break
+    fi
+    sleep 1
+done
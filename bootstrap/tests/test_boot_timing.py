@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the boot timing report on small synthetic install logs """
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import boot_timing  # noqa: E402
+
+
+def phase_line(boot, event, phase, uptime, component='connection-gwy'):
+    """ Returns an install log line as written by the phase function of the scripts """
+    return json.dumps({'_phase': 1, 'ts': 0, 'boot': boot, 'component': component,
+                       'event': event, 'phase': phase, 'uptime': uptime})
+
+def write_log(path, *phases, free_text=True):
+    """ Writes (boot, phase, start, end) phases to a log file, end None leaves the phase open """
+    lines = ['Installing NICE DCV Connection Gateway'] if free_text else []
+    for boot, phase, start, end in phases:
+        lines.append(phase_line(boot, 'start', phase, start))
+        if end is not None:
+            lines.append(phase_line(boot, 'end', phase, end))
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_events_are_grouped_by_boot_across_files(tmp_path):
+    write_log(tmp_path / 'a.log', ('boot-1', 'imds', 20.0, 21.0), ('boot-2', 'imds', 30.0, 31.0))
+    write_log(tmp_path / 'b.log', ('boot-1', 'install', 22.0, 40.0), free_text=False)
+    boots = boot_timing.group_boots(boot_timing.read_events([str(tmp_path)]))
+    assert [(boot.boot_id, sorted(boot.phases)) for boot in boots] == [
+        ('boot-1', ['imds', 'install']), ('boot-2', ['imds'])]
+    assert boots[0].files == {str(tmp_path / 'a.log'), str(tmp_path / 'b.log')}
+    assert boots[0].ready == 40.0
+
+def test_malformed_lines_are_skipped(tmp_path):
+    log = tmp_path / 'broken.log'
+    log.write_text('{"_phase": 1, "event": \n' + phase_line('boot-1', 'start', 'imds', 5.0) + '\n')
+    assert [event['phase'] for _, event in boot_timing.read_events([str(log)])] == ['imds']
+
+def test_repeated_phase_of_the_same_boot_is_a_resume(tmp_path):
+    log = write_log(tmp_path / 'gwy.log',
+                    ('boot-1', 'imds', 20.0, 21.0), ('boot-1', 'broker-wait', 21.0, 60.0),
+                    ('boot-1', 'imds', 900.0, 900.5), ('boot-1', 'broker-wait', 900.5, 902.0))
+    launch, resume = boot_timing.group_boots(boot_timing.read_events([log]))
+    assert (launch.resume, resume.resume) == (False, True)
+    assert launch.origin == 0.0 and launch.ready == 60.0
+    assert resume.origin == 900.0 and resume.ready == pytest.approx(2.0)
+    assert boot_timing.summarize([launch, resume])['resumes'] == 1
+
+def test_critical_path_skips_background_phases_and_reports_gaps(tmp_path):
+    log = write_log(tmp_path / 'gwy.log',
+                    ('boot-1', 'imds', 20.0, 21.0),
+                    ('boot-1', 'download', 21.2, 30.0),
+                    # Runs alongside download and install, never on the path
+                    ('boot-1', 'metrics', 22.0, 25.0),
+                    ('boot-1', 'install', 35.0, 50.0),
+                    ('boot-1', 'health', 50.0, 52.0))
+    boot, = boot_timing.group_boots(boot_timing.read_events([log]))
+    path = boot.critical_path()
+    assert [name for name, _ in path] == ['boot', 'imds', 'download', 'untracked', 'install', 'health']
+    assert dict(path)['untracked'] == pytest.approx(5.0)
+    # The 0.2 s between imds and download is script overhead, below UNTRACKED_MIN_SECONDS
+    assert sum(seconds for _, seconds in path) == pytest.approx(boot.ready - 0.2)
+
+def test_open_phase_marks_the_boot_incomplete(tmp_path):
+    log = write_log(tmp_path / 'gwy.log',
+                    ('boot-1', 'imds', 20.0, 21.0), ('boot-1', 'broker-wait', 21.0, None),
+                    ('boot-2', 'imds', 18.0, 19.0), ('boot-2', 'broker-wait', 19.0, 40.0))
+    boots = boot_timing.group_boots(boot_timing.read_events([log]))
+    assert [boot.failed_phase for boot in boots] == ['broker-wait', None]
+    summary = boot_timing.summarize(boots)
+    assert summary['incomplete'] == {'broker-wait': 1}
+    assert summary['ready']['count'] == 1 and summary['ready']['max'] == 40.0
+    assert summary['phases']['broker-wait']['count'] == 1
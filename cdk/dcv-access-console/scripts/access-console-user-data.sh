@@ -16,6 +16,13 @@
 
 LOG_PATH="/var/log/dcv-access-console-install.log"
 echo $(date -u) "*****START USER DATA SCRIPT*****" | tee -a "$LOG_PATH"
+
+# Boot phase timing, one JSON event per phase start and end, read by bootstrap/boot_timing.py in the repository root
+PHASE_COMPONENT="access-console"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
 TMP_DIR="$(mktemp -d /tmp/XXXXXX)"
 echo $(date -u) "Created temp directory: $TMP_DIR" | tee -a "$LOG_PATH"
 
@@ -87,6 +94,7 @@ then
 fi
 
 # Download Packages
+phase start download
 if [ "$package_manager" = apt ]; then
     curl -o "$TMP_DIR/NICE-GPG-KEY" "$CLOUDFRONT_PREFIX/NICE-GPG-KEY"
     gpg --import "$TMP_DIR/NICE-GPG-KEY"
@@ -103,8 +111,10 @@ fi
 echo $(date -u) "DCV Access Console packages downloaded" | tee -a "$LOG_PATH"
 
 tar -xvzf "$TMP_DIR/nice-dcv-access-console.tgz" -C "$TMP_DIR"
+phase end download
 
 # Retrieve required setup information
+phase start imds
 TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`
 region=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/placement/region)
 metadata=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/)
@@ -113,6 +123,8 @@ if grep -q "public-hostname" <<< "$metadata"; then
 else
     acDns=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/local-hostname)
 fi
+phase end imds
+phase start config
 smDns=$(aws ssm get-parameter --name dcv-session-manager-dns --region "$region" --with-decryption | grep -Po '"Value": "\K[^"]*')
 adminUser=$(aws ssm get-parameter --name dcv-access-console-admin --region "$region" --with-decryption | grep -Po '"Value": "\K[^"]*')
 response=$?
@@ -156,8 +168,10 @@ if [ $dcvConnGwyCheck ]; then
 fi
 json=$(jq --arg pamAuth $pamAuth '. + {"pam-service-name": $pamAuth}' <<<"$json")
 echo "$json" > "$basePath/onebox-config-input.json"
+phase end config
 
 # Install packages
+phase start install
 if [ "$system" = rocky ]; then
     sudo setsebool -P httpd_can_network_connect 1
 fi
@@ -167,6 +181,18 @@ echo $(date -u) "Initiating DCV Access Console installation wizard" | tee -a "$L
 
 # Comment out the following command and run manually on Ubuntu
 python3 wizard.py --is-onebox --input-json onebox-config-input.json --force
+phase end install
 
 echo "$json" > /etc/dcv-access-console-auth-server/onebox-config-input-bak.json
 echo $(date -u) "Created config backup at /etc/dcv-access-console-auth-server/onebox-config-input-bak.json" | tee -a "$LOG_PATH"
+
+# Log the time from boot until the Access Console answers on its HTTPS port
+phase start health
+for attempt in {1..60}; do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/443"; then
+        phase end health
+        echo $(date -u) "DCV Access Console in service $(cut -d' ' -f1 /proc/uptime)s after boot" | tee -a "$LOG_PATH"
+        break
+    fi
+    sleep 1
+done
@@ -21,6 +21,7 @@ import aws_cdk.aws_iam as iam
 import aws_cdk.aws_kms as kms
 import aws_cdk.aws_ssm as ssm
 from constructs import Construct
+from stacks.performance_profile.performance_profile import PerformanceProfile
 
 # The DCV Access Console stack
 class DcvAccessConsole(Stack):
@@ -142,21 +143,20 @@ class DcvAccessConsole(Stack):
             key_pair_name=config_data['sshKeypairName']
         )
 
+        # Instance type and volume of the performance profile selected in the config.json file
+        access_console_profile = PerformanceProfile(config_data, 'accessConsole')
+
         # Create the Session Manager EC2 instance
         access_console_instance = ec2.Instance(self, "AccessConsoleInstance",
                                 vpc=vpc,
                                 vpc_subnets=subnet_target,
-                                instance_type=ec2.InstanceType.of(
-                                    ec2.InstanceClass.M6G, ec2.InstanceSize.LARGE),
+                                instance_type=access_console_profile.instance_type("m6g.large"),
                                 machine_image=session_mgr_ami,
                                 security_group=sg_access_console,
                                 key_pair=key_pair,
                                 user_data=access_console_user_data,
                                 role=role_access_console,
-                                block_devices=[ec2.BlockDevice(
-                                    device_name="/dev/xvda",
-                                    volume=ec2.BlockDeviceVolume.ebs(
-                                        8, encrypted=True, kms_key=kms_key))]
+                                block_devices=access_console_profile.block_devices(kms_key)
                                 )
 
         cdk.CfnOutput(self, "AccessConsoleURL", \
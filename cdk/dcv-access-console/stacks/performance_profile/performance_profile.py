@@ -0,0 +1,49 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_kms as kms
+
+# The performance profile of a DCV component
+class PerformanceProfile:
+    """ Instance type and root volume of a component, from the selected profile of config.json """
+    def __init__(self, config_data: dict, component: str) -> None:
+        self.name = config_data.get('performanceProfile', 'standard')
+        profiles = {name: profile for name, profile in config_data.get('performanceProfiles', {}).items()
+                    if name != 'comment'}
+        if profiles and self.name not in profiles:
+            raise ValueError(f"performanceProfile: unknown profile '{self.name}', "
+                             f"use one of {', '.join(profiles)}")
+        self.component = component
+        self.settings = profiles.get(self.name, {}).get(component, {})
+
+    def instance_type(self, default: str) -> ec2.InstanceType:
+        """ Returns the instance type of the profile, the default when the profile has none """
+        return ec2.InstanceType(self.settings.get('instanceType', default))
+
+    def block_devices(self, kms_key: kms.IKey, minimum_size: int = 8) -> list:
+        """ Returns the encrypted gp3 root volume with the size and IOPS of the profile """
+        volume = self.settings.get('volume', {})
+        return [ec2.BlockDevice(
+            device_name="/dev/xvda",
+            volume=ec2.BlockDeviceVolume.ebs(
+                max(volume.get('sizeGiB', 8), minimum_size),
+                encrypted=True,
+                kms_key=kms_key,
+                volume_type=ec2.EbsDeviceVolumeType.GP3,
+                iops=volume.get('iops', 3000)
+                )
+            )]
+
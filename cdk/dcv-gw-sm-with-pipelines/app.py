@@ -18,6 +18,7 @@ import json
 import aws_cdk as cdk
 from stacks.dcv_ami.dcv_ami import DcvAmi
 from stacks.dcv_infra.dcv_infra import DcvInfra
+from stacks.performance_profile.performance_profile import PerformanceProfile
 
 app = cdk.App()
 
@@ -44,12 +45,16 @@ connection_gwy_component = open(os.path.join(os.path.dirname( __file__ ),
 # Set CDK environment variables
 environment = cdk.Environment(account=config_data['accountId'], region=config_data['region'])
 
+# The images are built on the instance types of the selected performance profile
+session_mgr_instance_type = PerformanceProfile(config_data, 'sessionMgr').instance_type("m6g.large")
+connection_gwy_instance_type = PerformanceProfile(config_data, 'connectionGwy').instance_type("c7g.large")
+
 # Create the DCV AMI Builder Stack for Session Manager
 session_mgr_ami = DcvAmi(app, "SessionMgrAmiStack",
                          description='(uksb-1tupboc66) (tag:dcv-session-mgr-pipeline)',
                          image_pipeline_name="dcv-session-mgr-ami",
                          component_content=session_mgr_component,
-                         instance_type="m6g.large",
+                         instance_type=session_mgr_instance_type.to_string(),
                          config_data=config_data,
                          env=environment)
 
@@ -58,7 +63,7 @@ connection_gwy_ami= DcvAmi(app, "ConnectionGwyAmiStack",
                            description='(uksb-1tupboc66) (tag:dcv-connection-gwy-pipeline)',
                            image_pipeline_name="dcv-connection-gwy-ami",
                            component_content=connection_gwy_component,
-                           instance_type="c7g.large",
+                           instance_type=connection_gwy_instance_type.to_string(),
                            config_data=config_data,
                            env=environment)
 
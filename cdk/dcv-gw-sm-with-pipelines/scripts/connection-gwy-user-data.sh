@@ -17,35 +17,97 @@
 LOG_PATH="/var/log/dcv-connection-gwy-install.log"
 echo $(date -u) "*****START USER DATA SCRIPT*****" | tee -a "$LOG_PATH"
 
+# Boot phase timing, one JSON event per phase start and end, read by bootstrap/boot_timing.py
+PHASE_COMPONENT="connection-gwy"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
+# Session resolver URL, set by the CDK app when it deploys the session resolver Lambda function.
+# Left empty, the gateway uses the Session Manager broker resolver.
+RESOLVER_URL=""
+
+# Launch lifecycle hook completed once the gateway is ready, set by the CDK app with the warm pool.
+# Left empty, the instance goes in service without waiting.
+LIFECYCLE_HOOK_NAME=""
+
+# Socket buffer size for QUIC over UDP, set by the CDK app from the transport profile.
+# Left empty, the kernel defaults are kept.
+UDP_BUFFER_BYTES=""
+
 # Get current region
+phase start imds
 TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`
 REGION=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/placement/region)
 echo $(date -u) "Current Region: $REGION" | tee -a "$LOG_PATH"
+phase end imds
 
-# Retrieve Broker Private DNS from SSM Parameter Store
-echo $(date -u) "Retrieving broker private DNS from SSM Parameter Store" | tee -a "$LOG_PATH"
-BROKER_PRIVATE_DNS=$(aws ssm get-parameter --name dcv-broker-private-dns --region "$REGION" --with-decryption | grep -Po '"Value": "\K[^"]*')
-timeout 1 bash -c "/dev/tcp/$BROKER_PRIVATE_DNS/8447"
-RESPONSE="$?"
-while [ "$RESPONSE" != 0 ]; do
-    echo $(date -u) "Unable to reach broker. Waiting before retry." | tee -a "$LOG_PATH"
-    sleep 15s
-    BROKER_PRIVATE_DNS=$(aws ssm get-parameter --name dcv-broker-private-dns --region "$REGION" --with-decryption | grep -Po '"Value": "\K[^"]*')
-    timeout 1 bash -c "cat < /dev/null > /dev/tcp/$BROKER_PRIVATE_DNS/8447"
-    RESPONSE="$?"
-done
-echo $(date -u) "Broker private DNS found $BROKER_PRIVATE_DNS" | tee -a "$LOG_PATH"
+if [ -n "$RESOLVER_URL" ]; then
+    # The gateway appends /resolveSession to the URL
+    RESOLVER_URL="${RESOLVER_URL%/}"
+    echo $(date -u) "Using session resolver $RESOLVER_URL" | tee -a "$LOG_PATH"
+else
+    # Wait for the brokers to publish their readiness in SSM Parameter Store. The parameter is only
+    # written once a broker answers on the gateway port, short backoff picks it up seconds later.
+    echo $(date -u) "Waiting for broker readiness in SSM Parameter Store" | tee -a "$LOG_PATH"
+    phase start broker-wait
+    # Set by the CDK app, longer than the brokers retry publishing their readiness
+    BROKER_WAIT_TIMEOUT_SECONDS=""
+    BROKER_WAIT_START=$(date +%s)
+    DELAY=1
+    while true; do
+        BROKER_PRIVATE_DNS=$(aws ssm get-parameter --name dcv-broker-ready --region "$REGION" --query "Parameter.Value" --output text 2>/dev/null)
+        # A parameter left by an earlier deployment is only trusted once the broker answers
+        if [ -n "$BROKER_PRIVATE_DNS" ] && timeout 1 bash -c "cat < /dev/null > /dev/tcp/$BROKER_PRIVATE_DNS/8447"; then
+            break
+        fi
+        if [ $(( $(date +%s) - BROKER_WAIT_START )) -ge "$BROKER_WAIT_TIMEOUT_SECONDS" ]; then
+            echo $(date -u) "Error: no broker ready after ${BROKER_WAIT_TIMEOUT_SECONDS}s, giving up" | tee -a "$LOG_PATH"
+            # Without a broker the gateway cannot serve, have the Auto Scaling group replace the instance
+            if [ -n "$LIFECYCLE_HOOK_NAME" ]; then
+                INSTANCE_ID=$(curl -s -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/instance-id)
+                ASG_NAME=$(aws autoscaling describe-auto-scaling-instances --instance-ids "$INSTANCE_ID" --region "$REGION" --query "AutoScalingInstances[0].AutoScalingGroupName" --output text)
+                aws autoscaling complete-lifecycle-action --lifecycle-hook-name "$LIFECYCLE_HOOK_NAME" \
+                    --auto-scaling-group-name "$ASG_NAME" --instance-id "$INSTANCE_ID" \
+                    --lifecycle-action-result ABANDON --region "$REGION" 2>&1 | tee -a "$LOG_PATH"
+            else
+                # A stopped instance fails the EC2 health check of the Auto Scaling group
+                shutdown -h now
+            fi
+            exit 1
+        fi
+        echo $(date -u) "Broker not ready. Retrying in ${DELAY}s." | tee -a "$LOG_PATH"
+        sleep "$DELAY"
+        DELAY=$(( DELAY * 2 > 16 ? 16 : DELAY * 2 ))
+    done
+    phase end broker-wait
+    echo $(date -u) "Broker $BROKER_PRIVATE_DNS ready after $(( $(date +%s) - BROKER_WAIT_START ))s" | tee -a "$LOG_PATH"
+    RESOLVER_URL="https://$BROKER_PRIVATE_DNS:8447"
+fi
 
-# Port Configuration. Using hex to escape double quotes: \x22 = "
+# Gateway configuration, rendered by the CDK app from scripts/dcv-connection-gateway.conf
+phase start config
 echo $(date -u) "Configuring Connection Gateway..." | tee -a "$LOG_PATH"
-sed -i "s/^#\[health-check\]/\[health-check\]/g" /etc/dcv-connection-gateway/dcv-connection-gateway.conf
-sed -i --expression 's|#bind-addr = "::"|bind-addr = "::"|' /etc/dcv-connection-gateway/dcv-connection-gateway.conf
-sed -i --expression 's|#tls-strict = false|tls-strict = false|' /etc/dcv-connection-gateway/dcv-connection-gateway.conf
-sed -i "/\[resolver\]/a tls-strict = false" /etc/dcv-connection-gateway/dcv-connection-gateway.conf
-sed -i "/bind-addr = \"::\"/a port = 8989" /etc/dcv-connection-gateway/dcv-connection-gateway.conf
-sed -i "s|url = \"https://localhost:8081\"|url = \"https://$BROKER_PRIVATE_DNS:8447\"|" /etc/dcv-connection-gateway/dcv-connection-gateway.conf
+cat > /etc/dcv-connection-gateway/dcv-connection-gateway.conf <<'EOF'
+DCV_CONNECTION_GATEWAY_CONF
+EOF
+sed -i "s|RESOLVER-URL|$RESOLVER_URL|" /etc/dcv-connection-gateway/dcv-connection-gateway.conf
+
+# Larger UDP socket buffers keep QUIC from dropping packets at high stream bitrates
+if [ -n "$UDP_BUFFER_BYTES" ]; then
+    echo $(date -u) "Setting UDP socket buffers to $UDP_BUFFER_BYTES bytes" | tee -a "$LOG_PATH"
+    cat > /etc/sysctl.d/90-dcv-quic.conf <<EOF
+net.core.rmem_max = $UDP_BUFFER_BYTES
+net.core.wmem_max = $UDP_BUFFER_BYTES
+net.core.rmem_default = $UDP_BUFFER_BYTES
+net.core.wmem_default = $UDP_BUFFER_BYTES
+EOF
+    sysctl -p /etc/sysctl.d/90-dcv-quic.conf > /dev/null
+fi
+phase end config
 
 # Start DCV Connection Gateway Service
+phase start service
 echo $(date -u) "Starting and Enabling Connection Gateway service..." | tee -a "$LOG_PATH"
 systemctl restart dcv-connection-gateway.service
 
@@ -54,4 +116,72 @@ if [[ $? -eq 0 ]]; then
     echo $(date -u) "Successfully installed DCV Connection Gateway" | tee -a "$LOG_PATH"
 else
     echo $(date -u) "There was an error during DCV Connection Gateway installation" | tee -a "$LOG_PATH"
+fi
+phase end service
+
+# Log the time from boot until the gateway answers its load balancer health check
+phase start health
+for attempt in $(seq 1 60); do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/8989"; then
+        phase end health
+        echo $(date -u) "Connection Gateway in service $(cut -d' ' -f1 /proc/uptime)s after boot" | tee -a "$LOG_PATH"
+        break
+    fi
+    sleep 1
+done
+
+# Complete the Auto Scaling launch lifecycle action once the gateway answers its health check.
+# A systemd unit repeats it at every boot and hibernation resume, when the instance leaves the warm pool.
+if [ -n "$LIFECYCLE_HOOK_NAME" ]; then
+    echo $(date -u) "Installing Connection Gateway lifecycle readiness service..." | tee -a "$LOG_PATH"
+    cat > /etc/dcv-connection-gateway/lifecycle-hook.env <<EOF
+LIFECYCLE_HOOK_NAME=$LIFECYCLE_HOOK_NAME
+REGION=$REGION
+LOG_PATH=$LOG_PATH
+EOF
+    cat > /usr/local/bin/dcv-connection-gwy-ready.sh <<'EOF'
+#!/bin/bash
+# Waits for the Connection Gateway health check port, then completes the launch lifecycle action
+PHASE_COMPONENT="connection-gwy"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+phase start lifecycle
+RESULT="ABANDON"
+for attempt in $(seq 1 120); do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/8989"; then
+        RESULT="CONTINUE"
+        break
+    fi
+    sleep 1
+done
+TOKEN=$(curl -s -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 300")
+INSTANCE_ID=$(curl -s -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/instance-id)
+TARGET_STATE=$(curl -s -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/autoscaling/target-lifecycle-state)
+ASG_NAME=$(aws autoscaling describe-auto-scaling-instances --instance-ids "$INSTANCE_ID" --region "$REGION" --query "AutoScalingInstances[0].AutoScalingGroupName" --output text)
+echo $(date -u) "Completing lifecycle action with $RESULT, target state $TARGET_STATE, $(cut -d' ' -f1 /proc/uptime)s after boot" | tee -a "$LOG_PATH"
+# Fails harmlessly after a reboot while in service, when no lifecycle action is pending
+aws autoscaling complete-lifecycle-action --lifecycle-hook-name "$LIFECYCLE_HOOK_NAME" \
+    --auto-scaling-group-name "$ASG_NAME" --instance-id "$INSTANCE_ID" \
+    --lifecycle-action-result "$RESULT" --region "$REGION" 2>&1 | tee -a "$LOG_PATH"
+phase end lifecycle
+EOF
+    chmod 755 /usr/local/bin/dcv-connection-gwy-ready.sh
+    cat > /etc/systemd/system/dcv-connection-gwy-ready.service <<'EOF'
+[Unit]
+Description=Complete the DCV Connection Gateway launch lifecycle action
+Wants=network-online.target
+After=network-online.target dcv-connection-gateway.service hibernate.target
+
+[Service]
+Type=oneshot
+EnvironmentFile=/etc/dcv-connection-gateway/lifecycle-hook.env
+ExecStart=/usr/local/bin/dcv-connection-gwy-ready.sh
+
+[Install]
+WantedBy=multi-user.target hibernate.target
+EOF
+    systemctl daemon-reload
+    systemctl enable dcv-connection-gwy-ready.service
+    systemctl start dcv-connection-gwy-ready.service
 fi
\ No newline at end of file
@@ -17,7 +17,22 @@
 LOG_PATH="/var/log/dcv-session-mgr-install.log"
 echo $(date -u) "*****START USER DATA SCRIPT*****" | tee -a "$LOG_PATH"
 
+# Boot phase timing, one JSON event per phase start and end, read by bootstrap/boot_timing.py
+PHASE_COMPONENT="session-mgr"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
+# Broker tier settings, set by the CDK app when it runs the brokers in an Auto Scaling group
+# behind an internal Network Load Balancer. Left empty, this instance is the only broker.
+BROKER_ENDPOINT=""
+BROKER_TARGET_GROUP_ARN=""
+DYNAMODB_TABLE_PREFIX=""
+DYNAMODB_TABLE_RCU=""
+DYNAMODB_TABLE_WCU=""
+
 # Get the private IP for connection gateway to use during configuration
+phase start imds
 echo $(date -u) "Retrieving private broker DNS..." | tee -a "$LOG_PATH"
 TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`
 MAC=`curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/network/interfaces/macs/`
@@ -27,16 +42,75 @@ echo $(date -u) "Using private DNS $PRIVATE_DNS" | tee -a "$LOG_PATH"
 # Get current region
 REGION=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/placement/region)
 echo $(date -u) "Current Region: $REGION" | tee -a "$LOG_PATH"
+phase end imds
+
+# Configure persistence and clustering when this broker is part of the broker tier
+if [ -n "$BROKER_ENDPOINT" ]; then
+    echo $(date -u) "Configuring broker persistence and clustering..." | tee -a "$LOG_PATH"
+    phase start cluster-config
+    CONFIG_PATH="/etc/dcv-session-manager-broker/session-manager-broker.properties"
+    set_broker_property() {
+        if grep -q "^#\?\s*$1\s*=" "$CONFIG_PATH"; then
+            sed -i "s|^#\?\s*$1\s*=.*$|$1 = $2|" "$CONFIG_PATH"
+        else
+            echo "$1 = $2" >> "$CONFIG_PATH"
+        fi
+    }
+    # Sessions and hosts are kept in DynamoDB, so any broker can answer any request. The stack
+    # creates the tables with the prefix, the capacity units only apply to tables the broker creates.
+    set_broker_property enable-persistence true
+    set_broker_property persistence-db dynamodb
+    set_broker_property dynamodb-region "$REGION"
+    set_broker_property dynamodb-table-name-prefix "$DYNAMODB_TABLE_PREFIX"
+    set_broker_property dynamodb-table-rcu "$DYNAMODB_TABLE_RCU"
+    set_broker_property dynamodb-table-wcu "$DYNAMODB_TABLE_WCU"
+    # Brokers find each other through the load balancer target group
+    set_broker_property broker-to-broker-discovery-aws-region "$REGION"
+    set_broker_property broker-to-broker-discovery-aws-alb-target-group-arn "$BROKER_TARGET_GROUP_ARN"
+    # The broker service is restarted once the parameter is stored
+    phase end cluster-config
+
+    # The gateways reach the brokers through the load balancer
+    PRIVATE_DNS="$BROKER_ENDPOINT"
+fi
 
 # Store the private private DNS name in SSM Parameter Store
+phase start publish
 echo $(date -u) "Storing broker private DNS name in AWS SSM Parameter Store..." | tee -a "$LOG_PATH"
 aws ssm put-parameter --name dcv-broker-private-dns --value "$PRIVATE_DNS" --type String --overwrite --region "$REGION"
 # Log if successful installation
 if [[ $? -eq 0 ]]; then
     echo $(date -u) "Stored private DNS name $PRIVATE_DNS in Parameter Store" | tee -a "$LOG_PATH"
+    phase end publish
     # Restart the broker service for the new config to get pulled
+    phase start service
     systemctl restart dcv-session-manager-broker.service
+    phase end service
     echo $(date -u) "Successfully installed DCV Session Manager" | tee -a "$LOG_PATH"
 else
     echo $(date -u) "There was an error during DCV Session Manager installation" | tee -a "$LOG_PATH"
-fi
\ No newline at end of file
+fi
+
+# Publish broker readiness once the broker answers on the gateway port. The Connection Gateways wait
+# on this parameter instead of polling the broker, and every write adds a new parameter version.
+# The CDK app sets the timeout from sessionMgr.brokerReadyTimeoutSeconds and has the gateways wait longer.
+echo $(date -u) "Waiting for the broker to answer on the gateway port..." | tee -a "$LOG_PATH"
+phase start health
+BROKER_READY_TIMEOUT_SECONDS=""
+HEALTH_START=$(date +%s)
+PUBLISHED=false
+DELAY=1
+while [ $(( $(date +%s) - HEALTH_START )) -lt "$BROKER_READY_TIMEOUT_SECONDS" ]; do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/8447" \
+        && aws ssm put-parameter --name dcv-broker-ready --value "$PRIVATE_DNS" --type String --overwrite --region "$REGION" > /dev/null; then
+        phase end health
+        echo $(date -u) "Published broker readiness $(cut -d' ' -f1 /proc/uptime)s after boot" | tee -a "$LOG_PATH"
+        PUBLISHED=true
+        break
+    fi
+    sleep "$DELAY"
+    DELAY=$(( DELAY * 2 > 16 ? 16 : DELAY * 2 ))
+done
+if [ "$PUBLISHED" != true ]; then
+    echo $(date -u) "Error: broker readiness not published, the broker did not answer on the gateway port within ${BROKER_READY_TIMEOUT_SECONDS}s" | tee -a "$LOG_PATH"
+fi
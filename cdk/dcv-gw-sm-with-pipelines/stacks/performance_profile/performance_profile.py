@@ -0,0 +1,92 @@
+"""
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE. 
+"""
+
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_kms as kms
+from constructs import Construct
+
+# Placement strategies for the Auto Scaling groups. A cluster placement group
+# holds a single Availability Zone, the groups span two.
+PLACEMENT_STRATEGIES = {
+    "spread": ec2.PlacementGroupStrategy.SPREAD,
+    "partition": ec2.PlacementGroupStrategy.PARTITION
+}
+
+# The performance profile of a DCV component
+class PerformanceProfile:
+    """ Instance type, root volume and network settings of a component, from the selected profile of config.json """
+    def __init__(self, config_data: dict, component: str) -> None:
+        self.name = config_data.get('performanceProfile', 'standard')
+        profiles = {name: profile for name, profile in config_data.get('performanceProfiles', {}).items()
+                    if name != 'comment'}
+        if profiles and self.name not in profiles:
+            raise ValueError(f"performanceProfile: unknown profile '{self.name}', "
+                             f"use one of {', '.join(profiles)}")
+        self.component = component
+        self.settings = profiles.get(self.name, {}).get(component, {})
+
+        self.placement_strategy = self.settings.get('placementGroup', '')
+        if self.placement_strategy and self.placement_strategy not in PLACEMENT_STRATEGIES:
+            raise ValueError(f"performanceProfiles.{self.name}.{component}: unknown placementGroup "
+                             f"'{self.placement_strategy}', use one of {', '.join(PLACEMENT_STRATEGIES)}")
+
+    def instance_type(self, default: str) -> ec2.InstanceType:
+        """ Returns the instance type of the profile, the default when the profile has none """
+        return ec2.InstanceType(self.settings.get('instanceType', default))
+
+    def block_devices(self, kms_key: kms.IKey, minimum_size: int = 8) -> list:
+        """ Returns the encrypted gp3 root volume with the size, IOPS and throughput of the profile
+
+        CloudFormation only sets the throughput through launch templates, an
+        instance created on its own keeps the gp3 baseline of 125 MiB/s.
+        """
+        volume = self.settings.get('volume', {})
+        return [ec2.BlockDevice(
+            device_name="/dev/xvda",
+            volume=ec2.BlockDeviceVolume.ebs(
+                max(volume.get('sizeGiB', 8), minimum_size),
+                encrypted=True,
+                kms_key=kms_key,
+                volume_type=ec2.EbsDeviceVolumeType.GP3,
+                iops=volume.get('iops', 3000),
+                throughput=volume.get('throughputMiBps', 125)
+                )
+            )]
+
+    def apply_to_launch_template(self, scope: Construct, launch_template: ec2.LaunchTemplate,
+                                 security_group: ec2.ISecurityGroup) -> None:
+        """ Adds the placement group and ENA Express settings of the profile to a launch template """
+        cfn_launch_template = launch_template.node.default_child
+
+        if self.placement_strategy:
+            placement_group = ec2.PlacementGroup(scope, "PlacementGroup",
+                                  strategy=PLACEMENT_STRATEGIES[self.placement_strategy]
+                                  )
+            cfn_launch_template.add_property_override(
+                "LaunchTemplateData.Placement.GroupName", placement_group.placement_group_name)
+
+        # ENA Express is set on the network interface, which then holds the security group.
+        # TCP and UDP, QUIC streams use UDP.
+        if self.settings.get('enaExpress', False):
+            cfn_launch_template.add_property_override("LaunchTemplateData.NetworkInterfaces", [{
+                "DeviceIndex": 0,
+                "Groups": [security_group.security_group_id],
+                "EnaSrdSpecification": {
+                    "EnaSrdEnabled": True,
+                    "EnaSrdUdpSpecification": {"EnaSrdUdpEnabled": True}
+                }
+            }])
+            cfn_launch_template.add_property_deletion_override("LaunchTemplateData.SecurityGroupIds")
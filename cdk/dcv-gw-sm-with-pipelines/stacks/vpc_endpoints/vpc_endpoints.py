@@ -0,0 +1,91 @@
+"""
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE. 
+"""
+
+import aws_cdk.aws_ec2 as ec2
+from constructs import Construct
+
+# Gateway endpoints, routed through the route tables of the selected subnets at no charge
+GATEWAY_ENDPOINTS = {
+    "s3": ("S3", ec2.GatewayVpcEndpointAwsService.S3),
+    "dynamodb": ("DynamoDB", ec2.GatewayVpcEndpointAwsService.DYNAMODB)
+}
+
+# Interface endpoints for the AWS APIs the instances call while they boot and run
+INTERFACE_ENDPOINTS = {
+    "ssm": ("SSM", ec2.InterfaceVpcEndpointAwsService.SSM),
+    "ssmmessages": ("SSMMessages", ec2.InterfaceVpcEndpointAwsService.SSM_MESSAGES),
+    "ec2messages": ("EC2Messages", ec2.InterfaceVpcEndpointAwsService.EC2_MESSAGES),
+    "ec2": ("EC2", ec2.InterfaceVpcEndpointAwsService.EC2),
+    "logs": ("Logs", ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS),
+    "monitoring": ("Monitoring", ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_MONITORING),
+    "autoscaling": ("AutoScaling", ec2.InterfaceVpcEndpointAwsService.AUTOSCALING),
+    "elasticloadbalancing": ("ElasticLoadBalancing", ec2.InterfaceVpcEndpointAwsService.ELASTIC_LOAD_BALANCING),
+    "kms": ("KMS", ec2.InterfaceVpcEndpointAwsService.KMS),
+    "sts": ("STS", ec2.InterfaceVpcEndpointAwsService.STS)
+}
+
+def check_names(kind, names, supported):
+    """ Raises a ValueError for endpoint names of config.json that are not supported """
+    for name in names:
+        if name not in supported:
+            raise ValueError(f"network.endpoints: unknown {kind} endpoint '{name}', "
+                             f"use one of {', '.join(supported)}")
+
+# The VPC endpoints construct
+class VpcEndpoints(Construct):
+    """ Keeps the AWS API traffic of the instances in the VPC instead of sending it through the NAT gateways """
+    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.IVpc,
+                 vpc_subnets: ec2.SubnetSelection, endpoints_config: dict, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        gateway_names = endpoints_config.get('gateway', [])
+        interface_names = endpoints_config.get('interface', [])
+        check_names("gateway", gateway_names, GATEWAY_ENDPOINTS)
+        check_names("interface", interface_names, INTERFACE_ENDPOINTS)
+
+        # S3 serves the DCV license bucket, DynamoDB the broker persistence
+        self.gateway_endpoints = {}
+        for name in gateway_names:
+            endpoint_id, service = GATEWAY_ENDPOINTS[name]
+            self.gateway_endpoints[name] = ec2.GatewayVpcEndpoint(self, endpoint_id,
+                                               vpc=vpc,
+                                               service=service,
+                                               subnets=[vpc_subnets]
+                                               )
+
+        self.interface_endpoints = {}
+        if interface_names:
+            # HTTPS from the VPC to the endpoint network interfaces
+            self.security_group = ec2.SecurityGroup(self, "SecurityGroup",
+                                      vpc=vpc,
+                                      description="HTTPS from the VPC to the AWS API endpoints",
+                                      allow_all_outbound=True, #Egress all
+                                      disable_inline_rules=True
+                                      )
+            self.security_group.add_ingress_rule(
+                ec2.Peer.ipv4(vpc.vpc_cidr_block), ec2.Port.tcp(443), "allow HTTPS to the AWS API endpoints"
+                )
+            # Private DNS resolves the regional API names to the endpoints, one network interface per zone
+            for name in interface_names:
+                endpoint_id, service = INTERFACE_ENDPOINTS[name]
+                self.interface_endpoints[name] = ec2.InterfaceVpcEndpoint(self, endpoint_id,
+                                                     vpc=vpc,
+                                                     service=service,
+                                                     subnets=vpc_subnets,
+                                                     private_dns_enabled=True,
+                                                     security_groups=[self.security_group],
+                                                     open=False
+                                                     )
@@ -0,0 +1,145 @@
+"""
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE. 
+"""
+
+import pytest
+import aws_cdk as cdk
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+from aws_cdk.assertions import Match
+from stacks.transport_profile.transport_profile import TransportProfile, TransportValidation
+
+GATEWAY_CONF_TEMPLATE = """[gateway]
+web-listen-endpoints = ${web_listen_endpoints}
+quic-listen-endpoints = ${quic_listen_endpoints}
+
+[health-check]
+port = 8989
+"""
+
+
+def select_profile(config_data, **settings):
+    """ Selects a transport profile of the given settings over the quic-first defaults """
+    config_data['transportProfiles']['test'] = dict(config_data['transportProfiles']['quic-first'], **settings)
+    config_data['transportProfile'] = "test"
+    return config_data
+
+
+def test_quic_first_profile_passes_validation(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "Port": 8443,
+        "Protocol": "TCP_UDP"
+    })
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "IpProtocol": "udp",
+        "FromPort": 8443,
+        "SourceSecurityGroupId": Match.any_value()
+    })
+    template.has_output("DcvServerTransport", {
+        "Value": "enable-quic-frontend=true web-port=8443 quic-port=8443"
+    })
+
+def test_tcp_only_profile_opens_no_udp(config_data, synth_infra):
+    config_data['transportProfile'] = "tcp-only"
+    template = synth_infra(config_data)
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {"Protocol": "TCP"})
+    template.resource_properties_count_is("AWS::EC2::SecurityGroupIngress", {"IpProtocol": "udp"}, 0)
+
+def test_custom_ports_follow_the_profile(config_data, synth_infra):
+    template = synth_infra(select_profile(config_data, gatewayPort=443, serverTcpPort=8443,
+                                          serverQuicPort=8444, udpBufferBytes=4194304))
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "Port": 443,
+        "Protocol": "TCP_UDP"
+    })
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "IpProtocol": "udp",
+        "FromPort": 8444,
+        "ToPort": 8444
+    })
+    template.has_output("DcvServerTransport", {
+        "Value": "enable-quic-frontend=true web-port=8443 quic-port=8444"
+    })
+
+def test_resolver_port_override_fails_the_synth(config_data, synth_infra):
+    config_data['sessionResolver']['enabled'] = True
+    config_data['sessionResolver']['environment']['DCV_UDP_PORT'] = "8444"
+
+    with pytest.raises(Exception, match="sessionResolver.environment.DCV_UDP_PORT is 8444, expected 8443"):
+        synth_infra(config_data)
+
+def test_gateway_configuration_without_quic_fails_the_synth(config_data, synth_infra, monkeypatch):
+    # A gateway configuration template that no longer listens for QUIC
+    monkeypatch.setattr(TransportProfile, "render_gateway_conf", lambda self, template: template.replace(
+        "${quic_listen_endpoints}", "[]").replace("${web_listen_endpoints}", '["0.0.0.0:8443", "[::]:8443"]'))
+
+    with pytest.raises(Exception, match=r"the gateway configuration \[gateway\] quic-listen-endpoints is \[\], "
+                                        r"expected \["):
+        synth_infra(config_data)
+
+def test_gateway_health_check_port_mismatch_fails_the_synth(config_data, synth_infra, monkeypatch):
+    render_gateway_conf = TransportProfile.render_gateway_conf
+    monkeypatch.setattr(TransportProfile, "render_gateway_conf", lambda self, template: render_gateway_conf(
+        self, template.replace("port = 8989", "port = 8990")))
+
+    with pytest.raises(Exception, match=r"\[health-check\] port is 8990, expected 8989"):
+        synth_infra(config_data)
+
+def transport_validation(config_data, user_data=None, **settings):
+    """ Returns an empty stack and a TransportValidation of it with the rendered test configuration """
+    profile = TransportProfile(select_profile(config_data, **settings))
+    stack = cdk.Stack(cdk.App(), "TransportStack")
+    gateway_conf = profile.render_gateway_conf(GATEWAY_CONF_TEMPLATE)
+    if user_data is None:
+        user_data = f'UDP_BUFFER_BYTES="{profile.udp_buffer_bytes}"\n{gateway_conf}'
+    validation = TransportValidation(profile, stack, gateway_conf=gateway_conf, gateway_user_data=user_data)
+    return stack, validation
+
+def test_consistent_inputs_pass_validation(config_data):
+    _, validation = transport_validation(config_data, udpBufferBytes=4194304)
+    assert validation.validate() == []
+
+def test_user_data_without_placeholders_fails_validation(config_data):
+    _, validation = transport_validation(config_data, user_data='UDP_BUFFER_BYTES=""\n', udpBufferBytes=4194304)
+    errors = validation.validate()
+    assert any("DCV_CONNECTION_GATEWAY_CONF is missing" in error for error in errors)
+    assert any("does not set UDP_BUFFER_BYTES to 4194304" in error for error in errors)
+
+def test_udp_without_quic_fails_validation(config_data):
+    stack, validation = transport_validation(config_data, quic=False)
+    ec2.CfnSecurityGroupIngress(stack, "StrayUdp", ip_protocol="udp", from_port=8443, to_port=8443,
+                                group_id="sg-0123456789abcdef0", cidr_ip="0.0.0.0/0")
+    elbv2.CfnListener(stack, "StrayListener", load_balancer_arn="arn", port=8443, protocol="TCP_UDP",
+                      default_actions=[])
+    ec2.CfnSecurityGroupIngress(stack, "Tcp", ip_protocol="tcp", from_port=8443, to_port=8443,
+                                group_id="sg-0123456789abcdef0", cidr_ip="0.0.0.0/0")
+
+    assert validation.validate() == [
+        "transportProfile 'test': QUIC is off but TransportStack/StrayUdp allows UDP 8443",
+        "transportProfile 'test': QUIC is off but TransportStack/StrayListener is TCP_UDP"
+    ]
+
+@pytest.mark.parametrize('settings, message', [
+    ({"gatewayPort": 8989}, "is the gateway health check port"),
+    ({"serverQuicPort": 70000}, "serverQuicPort 70000 is not a valid port"),
+    ({"udpBufferBytes": -1}, "udpBufferBytes must be 0 or more")
+])
+def test_invalid_profiles_are_rejected(config_data, settings, message):
+    with pytest.raises(ValueError, match=message):
+        TransportProfile(select_profile(config_data, **settings))
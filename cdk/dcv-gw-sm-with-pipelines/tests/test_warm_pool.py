@@ -0,0 +1,73 @@
+"""
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE. 
+"""
+
+import pytest
+from aws_cdk.assertions import Match
+from stacks.dcv_infra.dcv_infra import hibernation_volume_size, instance_memory_gib
+
+
+def hibernated_config(config_data, profile):
+    """ Selects a profile and keeps the gateways in a hibernated warm pool """
+    config_data['performanceProfile'] = profile
+    config_data['connectionGwy']['warmPool']['enabled'] = True
+    config_data['connectionGwy']['warmPool']['poolState'] = "Hibernated"
+    return config_data
+
+
+@pytest.mark.parametrize('instance_type, memory', [
+    ("c7g.large", 4), ("c7g.2xlarge", 16), ("c7gn.4xlarge", 32), ("c6g.medium", 2),
+    ("m6g.xlarge", 16), ("r7g.large", 16), ("x2gd.xlarge", 64), ("t4g.small", 2)
+])
+def test_instance_memory(instance_type, memory):
+    assert instance_memory_gib(instance_type) == memory
+
+@pytest.mark.parametrize('instance_type', ["c7g.metal", "im4gn.large", "c7i.large", "t4g.huge"])
+def test_unknown_instance_memory(instance_type):
+    assert instance_memory_gib(instance_type) is None
+
+@pytest.mark.parametrize('instance_type, size', [("c7g.large", 12), ("c7g.2xlarge", 24), ("c7gn.4xlarge", 40)])
+def test_hibernated_volume_holds_the_memory(instance_type, size):
+    assert hibernation_volume_size(instance_type) == size
+
+def test_hibernation_rejects_unsized_and_large_instance_types():
+    with pytest.raises(ValueError, match="cannot size the hibernated root volume of 'c7g.metal'"):
+        hibernation_volume_size("c7g.metal")
+    with pytest.raises(ValueError, match="hibernation needs less than 150 GiB"):
+        hibernation_volume_size("r7g.8xlarge")
+
+@pytest.mark.parametrize('profile, size', [("standard", 12), ("high-throughput", 24), ("network-optimized", 40)])
+def test_hibernated_gateway_root_volume(config_data, synth_infra, profile, size):
+    template = synth_infra(hibernated_config(config_data, profile))
+
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": Match.object_like({
+            "HibernationOptions": {"Configured": True},
+            "BlockDeviceMappings": [Match.object_like({
+                "Ebs": Match.object_like({"VolumeSize": size})
+            })]
+        })
+    })
+
+def test_stopped_gateway_root_volume(config_data, synth_infra):
+    config_data['connectionGwy']['warmPool']['enabled'] = True
+    config_data['connectionGwy']['warmPool']['poolState'] = "Stopped"
+    template = synth_infra(config_data)
+
+    launch_templates = template.find_resources("AWS::EC2::LaunchTemplate")
+    gateway, = [resource['Properties']['LaunchTemplateData'] for logical_id, resource in launch_templates.items()
+                if logical_id.startswith("ConnectionGwyLaunchTemplate")]
+    assert 'HibernationOptions' not in gateway
+    assert gateway['BlockDeviceMappings'][0]['Ebs']['VolumeSize'] == 8
@@ -18,6 +18,20 @@ set -eE
 LOG_PATH="/var/log/dcv-session-mgr-install.log"
 echo $(date -u) "*****START USER DATA SCRIPT*****" | tee -a $LOG_PATH
 
+# Boot phase timing, one JSON event per phase start and end, read by bootstrap/boot_timing.py
+PHASE_COMPONENT="session-mgr"
+phase() {
+    echo "{\"_phase\":1,\"ts\":$(date +%s%3N),\"boot\":\"$(cat /proc/sys/kernel/random/boot_id)\",\"component\":\"$PHASE_COMPONENT\",\"event\":\"$1\",\"phase\":\"$2\",\"uptime\":$(cut -d' ' -f1 /proc/uptime)}" >> "$LOG_PATH"
+}
+
+# Broker tier settings, set by the CDK app when it runs the brokers in an Auto Scaling group
+# behind an internal Network Load Balancer. Left empty, this instance is the only broker.
+BROKER_ENDPOINT=""
+BROKER_TARGET_GROUP_ARN=""
+DYNAMODB_TABLE_PREFIX=""
+DYNAMODB_TABLE_RCU=""
+DYNAMODB_TABLE_WCU=""
+
 # Retrieve System Info
 read -r system version <<<$(echo $(cat /etc/os-release | grep "^ID=\|^VERSION_ID=" | sort | cut -d"=" -f2 | tr -d "\"" | tr '[:upper:]' '[:lower:]'))
 major_version="${version%.*}"
@@ -64,6 +78,7 @@ if [ -z "$package_type" ]; then
 fi
 
 # Download Packages
+phase start download
 if [ "$package_manager" = apt ]; then
     curl -o "$TMP_DIR/NICE-GPG-KEY" "$CLOUDFRONT_PREFIX/NICE-GPG-KEY"
     gpg --import "$TMP_DIR/NICE-GPG-KEY"
@@ -72,18 +87,22 @@ else
     rpm --import "$CLOUDFRONT_PREFIX"/NICE-GPG-KEY
     curl -o "$TMP_DIR/nice-dcv-session-manager-broker.$package_extension" "$CLOUDFRONT_PREFIX/nice-dcv-session-manager-broker-$package_type.noarch.$package_extension"
 fi 
+phase end download
 
 # Install Packages
+phase start install
 for package_pattern in "nice-dcv-session-manager-broker.$package_extension"; do
     package_full_path=$(find "$TMP_DIR" -name "$package_pattern")
     "$package_manager" install -y "$package_full_path"
 done
+phase end install
 
 # Enable and start DCV Session Manager service
 systemctl start dcv-session-manager-broker
 systemctl enable dcv-session-manager-broker
 
 # Configure DCV Session Manager
+phase start config
 CONFIG_PATH="/etc/dcv-session-manager-broker/session-manager-broker.properties"
 ## Enable the gateway in config
 sed -i '/^enable-gateway/s/=.*$/= true/' "$CONFIG_PATH"
@@ -99,14 +118,18 @@ sed -i '/gateway-to-broker-connector-bind-host/s/^#\s//g' "$CONFIG_PATH"
 #sed -i '/dynamodb-table-wcu/s/^#\s//g' "$CONFIG_PATH"
 #sed -i '/dynamodb-table-name-prefix/s/^#\s//g' "$CONFIG_PATH"
 #sed -i "/^dynamodb-region/s/=.*$/= $REGION/" "$CONFIG_PATH"
+phase end config
 
 # Restart the broker service 
+phase start service
 systemctl restart dcv-session-manager-broker.service
+phase end service
 
 # Clean Up
 rm -rf "$TMP_DIR"
 
 # Get the private IP for connection gateway to use during configuration
+phase start imds
 echo $(date -u) "Retrieving private broker DNS..." | tee -a "$LOG_PATH"
 TOKEN=`curl -X PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 21600"`
 MAC=`curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/network/interfaces/macs/`
@@ -116,13 +139,70 @@ echo $(date -u) "Using private DNS $PRIVATE_DNS" | tee -a "$LOG_PATH"
 # Get current region
 REGION=$(curl -H "X-aws-ec2-metadata-token: $TOKEN" http://169.254.169.254/latest/meta-data/placement/region)
 echo $(date -u) "Current Region: $REGION" | tee -a "$LOG_PATH"
+phase end imds
+
+# Configure persistence and clustering when this broker is part of the broker tier
+if [ -n "$BROKER_ENDPOINT" ]; then
+    echo $(date -u) "Configuring broker persistence and clustering..." | tee -a "$LOG_PATH"
+    phase start cluster-config
+    CONFIG_PATH="/etc/dcv-session-manager-broker/session-manager-broker.properties"
+    set_broker_property() {
+        if grep -q "^#\?\s*$1\s*=" "$CONFIG_PATH"; then
+            sed -i "s|^#\?\s*$1\s*=.*$|$1 = $2|" "$CONFIG_PATH"
+        else
+            echo "$1 = $2" >> "$CONFIG_PATH"
+        fi
+    }
+    # Sessions and hosts are kept in DynamoDB, so any broker can answer any request. The stack
+    # creates the tables with the prefix, the capacity units only apply to tables the broker creates.
+    set_broker_property enable-persistence true
+    set_broker_property persistence-db dynamodb
+    set_broker_property dynamodb-region "$REGION"
+    set_broker_property dynamodb-table-name-prefix "$DYNAMODB_TABLE_PREFIX"
+    set_broker_property dynamodb-table-rcu "$DYNAMODB_TABLE_RCU"
+    set_broker_property dynamodb-table-wcu "$DYNAMODB_TABLE_WCU"
+    # Brokers find each other through the load balancer target group
+    set_broker_property broker-to-broker-discovery-aws-region "$REGION"
+    set_broker_property broker-to-broker-discovery-aws-alb-target-group-arn "$BROKER_TARGET_GROUP_ARN"
+    systemctl restart dcv-session-manager-broker.service
+    phase end cluster-config
+
+    # The gateways reach the brokers through the load balancer
+    PRIVATE_DNS="$BROKER_ENDPOINT"
+fi
 
 # Store the private private DNS name in SSM Parameter Store
+phase start publish
 echo $(date -u) "Storing broker private DNS name in AWS SSM Parameter Store..." | tee -a "$LOG_PATH"
 aws ssm put-parameter --name dcv-broker-private-dns --value "$PRIVATE_DNS" --type String --overwrite --region "$REGION"
 # Log if successful installation
 if [[ $? -eq 0 ]]; then
     echo $(date -u) "Stored private DNS name $PRIVATE_DNS in Parameter Store" | tee -a "$LOG_PATH"
+    phase end publish
 else
     echo $(date -u) "There was an error during DCV Session Manager installation" | tee -a "$LOG_PATH"
-fi
\ No newline at end of file
+fi
+
+# Publish broker readiness once the broker answers on the gateway port. The Connection Gateways wait
+# on this parameter instead of polling the broker, and every write adds a new parameter version.
+# The CDK app sets the timeout from sessionMgr.brokerReadyTimeoutSeconds and has the gateways wait longer.
+echo $(date -u) "Waiting for the broker to answer on the gateway port..." | tee -a "$LOG_PATH"
+phase start health
+BROKER_READY_TIMEOUT_SECONDS=""
+HEALTH_START=$(date +%s)
+PUBLISHED=false
+DELAY=1
+while [ $(( $(date +%s) - HEALTH_START )) -lt "$BROKER_READY_TIMEOUT_SECONDS" ]; do
+    if timeout 1 bash -c "cat < /dev/null > /dev/tcp/127.0.0.1/8447" \
+        && aws ssm put-parameter --name dcv-broker-ready --value "$PRIVATE_DNS" --type String --overwrite --region "$REGION" > /dev/null; then
+        phase end health
+        echo $(date -u) "Published broker readiness $(cut -d' ' -f1 /proc/uptime)s after boot" | tee -a "$LOG_PATH"
+        PUBLISHED=true
+        break
+    fi
+    sleep "$DELAY"
+    DELAY=$(( DELAY * 2 > 16 ? 16 : DELAY * 2 ))
+done
+if [ "$PUBLISHED" != true ]; then
+    echo $(date -u) "Error: broker readiness not published, the broker did not answer on the gateway port within ${BROKER_READY_TIMEOUT_SECONDS}s" | tee -a "$LOG_PATH"
+fi
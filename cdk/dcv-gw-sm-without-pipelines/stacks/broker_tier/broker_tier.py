@@ -0,0 +1,180 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import aws_cdk as cdk
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_iam as iam
+import aws_cdk.aws_kms as kms
+import aws_cdk.aws_autoscaling as autoscaling
+import aws_cdk.aws_dynamodb as dynamodb
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+from constructs import Construct
+from stacks.performance_profile.performance_profile import PerformanceProfile
+
+# Broker ports: CLI and Access Console API, agents, and the gateway resolver
+BROKER_PORTS = {
+    "Client": 8443,
+    "Agent": 8445,
+    "Resolver": 8447
+}
+
+# Billing modes of the persistence tables
+BILLING_MODES = {
+    "PROVISIONED": dynamodb.BillingMode.PROVISIONED,
+    "PAY_PER_REQUEST": dynamodb.BillingMode.PAY_PER_REQUEST
+}
+
+# Persistence tables of the brokers, by name after the table prefix. Expiring records carry a TTL attribute.
+BROKER_TABLES = {
+    "Sessions": {"partitionKey": "Id"},
+    "Servers": {"partitionKey": "Id"},
+    "SessionTokens": {"partitionKey": "Id", "ttlAttribute": "ExpiresAt"}
+}
+
+# Target utilization of the provisioned tables' capacity autoscaling
+TABLE_UTILIZATION_PERCENT = 70
+
+# The DCV Session Manager broker tier construct
+class BrokerTier(Construct):
+    """ Runs the Session Manager brokers in an Auto Scaling group behind an internal Network Load Balancer """
+    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.IVpc,
+                 vpc_subnets: ec2.SubnetSelection, security_group: ec2.ISecurityGroup,
+                 role: iam.IRole, machine_image: ec2.IMachineImage, key_pair: ec2.IKeyPair,
+                 kms_key: kms.IKey, user_data_content: str, tier_config: dict,
+                 profile: PerformanceProfile, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        table_prefix = tier_config.get('tablePrefix', 'DcvSm-')
+        billing_mode = tier_config.get('billingMode', 'PAY_PER_REQUEST')
+        if billing_mode not in BILLING_MODES:
+            raise ValueError(f"sessionMgr.brokerTier: unknown billingMode '{billing_mode}', "
+                             f"use one of {', '.join(BILLING_MODES)}")
+
+        # Internal Network Load Balancer in front of every broker port
+        self.load_balancer = elbv2.NetworkLoadBalancer(self, "NLB",
+                                 vpc=vpc,
+                                 internet_facing=False,
+                                 vpc_subnets=vpc_subnets,
+                                 cross_zone_enabled=True
+                                 )
+        self.endpoint = self.load_balancer.load_balancer_dns_name
+
+        # Target groups are created first, the brokers discover each other through the client one
+        target_groups = {}
+        for name, port in BROKER_PORTS.items():
+            target_groups[name] = elbv2.NetworkTargetGroup(self, f"{name}TargetGroup",
+                                      vpc=vpc,
+                                      port=port,
+                                      protocol=elbv2.Protocol.TCP,
+                                      target_type=elbv2.TargetType.INSTANCE,
+                                      health_check=elbv2.HealthCheck(
+                                          protocol=elbv2.Protocol.TCP,
+                                          interval=cdk.Duration.seconds(10),
+                                          healthy_threshold_count=2,
+                                          unhealthy_threshold_count=2
+                                          )
+                                      )
+            self.load_balancer.add_listener(f"{name}Listener",
+                port=port,
+                protocol=elbv2.Protocol.TCP,
+                default_target_groups=[target_groups[name]]
+                )
+
+        # Persistence tables, owned by the stack so that billing, scaling and TTL are set from the start
+        read_capacity = tier_config.get('readCapacityUnits', 10)
+        write_capacity = tier_config.get('writeCapacityUnits', 10)
+        provisioned = billing_mode == "PROVISIONED"
+        self.tables = []
+        for name, table_config in tier_config.get('tables', BROKER_TABLES).items():
+            if name == 'comment':
+                continue
+            table = dynamodb.Table(self, f"{name}Table",
+                        table_name=f"{table_prefix}{name}",
+                        partition_key=dynamodb.Attribute(name=table_config['partitionKey'],
+                                                         type=dynamodb.AttributeType.STRING),
+                        billing_mode=BILLING_MODES[billing_mode],
+                        read_capacity=read_capacity if provisioned else None,
+                        write_capacity=write_capacity if provisioned else None,
+                        time_to_live_attribute=table_config.get('ttlAttribute'),
+                        removal_policy=cdk.RemovalPolicy.DESTROY
+                        )
+            if provisioned:
+                table.auto_scale_read_capacity(
+                    min_capacity=read_capacity,
+                    max_capacity=tier_config.get('maxReadCapacityUnits', read_capacity * 10)
+                    ).scale_on_utilization(target_utilization_percent=TABLE_UTILIZATION_PERCENT)
+                table.auto_scale_write_capacity(
+                    min_capacity=write_capacity,
+                    max_capacity=tier_config.get('maxWriteCapacityUnits', write_capacity * 10)
+                    ).scale_on_utilization(target_utilization_percent=TABLE_UTILIZATION_PERCENT)
+            table.grant_read_write_data(role)
+            self.tables.append(table)
+
+        # Broker user data settings for persistence and clustering
+        user_data_content = user_data_content.replace(
+            'BROKER_ENDPOINT=""', f'BROKER_ENDPOINT="{self.endpoint}"').replace(
+            'BROKER_TARGET_GROUP_ARN=""',
+            f'BROKER_TARGET_GROUP_ARN="{target_groups["Client"].target_group_arn}"').replace(
+            'DYNAMODB_TABLE_PREFIX=""', f'DYNAMODB_TABLE_PREFIX="{table_prefix}"').replace(
+            'DYNAMODB_TABLE_RCU=""', f'DYNAMODB_TABLE_RCU="{read_capacity}"').replace(
+            'DYNAMODB_TABLE_WCU=""', f'DYNAMODB_TABLE_WCU="{write_capacity}"')
+
+        # The broker lists the tables with its prefix at start
+        role.add_to_principal_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=['dynamodb:ListTables'],
+            resources=["*"]
+        ))
+
+        # Permission for broker to broker discovery, DescribeTargetHealth has no resource-level permissions
+        role.add_to_principal_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=['elasticloadbalancing:DescribeTargetHealth'],
+            resources=["*"]
+        ))
+
+        launch_template = ec2.LaunchTemplate(self, "LaunchTemplate",
+                              machine_image=machine_image,
+                              security_group=security_group,
+                              instance_type=profile.instance_type("m6g.large"),
+                              key_pair=key_pair,
+                              user_data=ec2.UserData.custom(user_data_content),
+                              role=role,
+                              block_devices=profile.block_devices(kms_key)
+                              )
+        profile.apply_to_launch_template(self, launch_template, security_group)
+
+        self.auto_scaling_group = autoscaling.AutoScalingGroup(self, "ASG",
+                                      vpc=vpc,
+                                      launch_template=launch_template,
+                                      min_capacity=tier_config.get('minCapacity', 2),
+                                      max_capacity=tier_config.get('maxCapacity', 4),
+                                      vpc_subnets=vpc_subnets,
+                                      # Replace brokers the load balancer finds unhealthy
+                                      health_check=autoscaling.HealthCheck.elb(
+                                          grace=cdk.Duration.seconds(300))
+                                      )
+        for target_group in target_groups.values():
+            self.auto_scaling_group.attach_to_network_target_group(target_group)
+        # The brokers must find their tables in place when they start
+        self.auto_scaling_group.node.add_dependency(*self.tables)
+
+        # Broker API calls are CPU bound in the broker JVM
+        self.auto_scaling_group.scale_on_cpu_utilization("CPUUtilization",
+            target_utilization_percent=tier_config.get('cpuUtilizationPercent', 60)
+            )
+
+        cdk.CfnOutput(self, "Endpoint", value=self.endpoint,
+                      description="Internal DNS name of the Session Manager brokers")
@@ -0,0 +1,187 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import aws_cdk as cdk
+import aws_cdk.aws_autoscaling as autoscaling
+import aws_cdk.aws_cloudwatch as cloudwatch
+import aws_cdk.aws_cloudwatch_actions as cloudwatch_actions
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+from constructs import Construct
+
+# Metric pairs supported by predictive scaling for the Connection Gateway
+PREDICTIVE_METRICS = ["ASGCPUUtilization", "ASGNetworkIn", "ASGNetworkOut"]
+
+def step_scaling(scope, construct_id, auto_scaling_group, metric, steps_config, warmup):
+    """ Creates the step scaling actions and alarms of the {"lower", "upper", "change"} steps of config.json """
+    # StepScalingPolicy passes the deprecated cooldown to its actions, they are built here without it
+    scale_out = sorted((step for step in steps_config if step['change'] > 0), key=lambda step: step['lower'])
+    scale_in = sorted((step for step in steps_config if step['change'] < 0), key=lambda step: -step['upper'])
+
+    # Scale out from the lowest lower bound, each step up to the next one
+    if scale_out:
+        threshold = scale_out[0]['lower']
+        action = autoscaling.StepScalingAction(scope, f"{construct_id}UpperPolicy",
+            auto_scaling_group=auto_scaling_group,
+            adjustment_type=autoscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+            metric_aggregation_type=autoscaling.MetricAggregationType.AVERAGE,
+            estimated_instance_warmup=warmup
+            )
+        for index, step in enumerate(scale_out):
+            upper = scale_out[index + 1]['lower'] if index + 1 < len(scale_out) else step.get('upper')
+            action.add_adjustment(adjustment=step['change'],
+                                  lower_bound=step['lower'] - threshold,
+                                  upper_bound=upper - threshold if upper is not None else None)
+        cloudwatch.Alarm(scope, f"{construct_id}UpperAlarm",
+            metric=metric,
+            alarm_description="Upper threshold scaling alarm",
+            comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+            evaluation_periods=1,
+            threshold=threshold
+            ).add_alarm_action(cloudwatch_actions.AutoScalingAction(action))
+
+    # Scale in from the highest upper bound, each step down to the next one
+    if scale_in:
+        threshold = scale_in[0]['upper']
+        action = autoscaling.StepScalingAction(scope, f"{construct_id}LowerPolicy",
+            auto_scaling_group=auto_scaling_group,
+            adjustment_type=autoscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+            metric_aggregation_type=autoscaling.MetricAggregationType.AVERAGE,
+            estimated_instance_warmup=warmup
+            )
+        for index, step in enumerate(scale_in):
+            lower = scale_in[index + 1]['upper'] if index + 1 < len(scale_in) else step.get('lower')
+            action.add_adjustment(adjustment=step['change'],
+                                  lower_bound=lower - threshold if lower is not None else None,
+                                  upper_bound=step['upper'] - threshold)
+        cloudwatch.Alarm(scope, f"{construct_id}LowerAlarm",
+            metric=metric,
+            alarm_description="Lower threshold scaling alarm",
+            comparison_operator=cloudwatch.ComparisonOperator.LESS_THAN_OR_EQUAL_TO_THRESHOLD,
+            evaluation_periods=1,
+            threshold=threshold
+            ).add_alarm_action(cloudwatch_actions.AutoScalingAction(action))
+
+# The DCV Connection Gateway scaling policies construct
+class ConnectionGwyScaling(Construct):
+    """ Scales the Connection Gateway Auto Scaling Group on gateway load instead of CPU only """
+    def __init__(self, scope: Construct, construct_id: str,
+                 auto_scaling_group: autoscaling.AutoScalingGroup,
+                 load_balancer: elbv2.INetworkLoadBalancer,
+                 target_group: elbv2.INetworkTargetGroup,
+                 scaling_config: dict, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        # Time for a new gateway to boot and register with the load balancer
+        warmup = cdk.Duration.seconds(int(scaling_config.get('instanceWarmupSeconds', 300)))
+
+        # CPU Utilization target tracking
+        cpu_utilization_percent = scaling_config.get('cpuUtilizationPercent', 75)
+        if cpu_utilization_percent:
+            autoscaling.TargetTrackingScalingPolicy(self, "CPUUtilization",
+                auto_scaling_group=auto_scaling_group,
+                predefined_metric=autoscaling.PredefinedMetric.ASG_AVERAGE_CPU_UTILIZATION,
+                target_value=cpu_utilization_percent,
+                estimated_instance_warmup=warmup
+                )
+
+        # Network throughput target tracking, the streams of a gateway are bound by its bandwidth
+        network_out_bytes_per_second = scaling_config.get('networkOutBytesPerSecond', 0)
+        if network_out_bytes_per_second:
+            autoscaling.TargetTrackingScalingPolicy(self, "NetworkOut",
+                auto_scaling_group=auto_scaling_group,
+                predefined_metric=autoscaling.PredefinedMetric.ASG_AVERAGE_NETWORK_OUT,
+                # ASGAverageNetworkOut is measured in bytes per minute with detailed monitoring
+                target_value=network_out_bytes_per_second * 60,
+                estimated_instance_warmup=warmup
+                )
+
+        # Flows per healthy gateway, from the Network Load Balancer flow metrics
+        healthy_hosts = cloudwatch.Metric(
+            namespace="AWS/NetworkELB",
+            metric_name="HealthyHostCount",
+            dimensions_map={
+                "LoadBalancer": load_balancer.load_balancer_full_name,
+                "TargetGroup": target_group.target_group_full_name
+            },
+            statistic="Minimum",
+            period=cdk.Duration.minutes(1)
+            )
+
+        def flows_per_host(metric_name, statistic):
+            """ Divides an NLB flow metric by the healthy gateways, the whole count while none is healthy """
+            return cloudwatch.MathExpression(
+                expression="IF(hosts > 0, flows / hosts, flows)",
+                using_metrics={
+                    "flows": cloudwatch.Metric(
+                        namespace="AWS/NetworkELB",
+                        metric_name=metric_name,
+                        dimensions_map={
+                            "LoadBalancer": load_balancer.load_balancer_full_name
+                        },
+                        statistic=statistic,
+                        period=cdk.Duration.minutes(1)
+                        ),
+                    "hosts": healthy_hosts
+                },
+                label=f"{metric_name} per healthy gateway",
+                period=cdk.Duration.minutes(1)
+                )
+
+        # Step scaling on concurrent streams, larger steps for larger bursts
+        active_flow_steps = scaling_config.get('activeFlowSteps', [])
+        if active_flow_steps:
+            step_scaling(self, "ActiveFlows", auto_scaling_group, flows_per_host("ActiveFlowCount", "Average"),
+                         active_flow_steps, warmup)
+
+        # Step scaling on connection rate, reacts to a login wave before the streams add up
+        new_flow_steps = scaling_config.get('newFlowSteps', [])
+        if new_flow_steps:
+            step_scaling(self, "NewFlows", auto_scaling_group, flows_per_host("NewFlowCount", "Sum"),
+                         new_flow_steps, warmup)
+
+        # Scheduled capacity changes, for example ahead of the weekday login peak
+        time_zone = scaling_config.get('timeZone', 'UTC')
+        for schedule in scaling_config.get('schedules', []):
+            auto_scaling_group.scale_on_schedule(f"Schedule{schedule['name']}",
+                schedule=autoscaling.Schedule.expression(schedule['cron']),
+                min_capacity=schedule.get('minCapacity'),
+                max_capacity=schedule.get('maxCapacity'),
+                desired_capacity=schedule.get('desiredCapacity'),
+                time_zone=time_zone
+                )
+
+        # Predictive scaling learns the daily and weekly load pattern of the gateways
+        predictive = scaling_config.get('predictive', {})
+        if predictive.get('enabled', False):
+            metric = predictive.get('metric', 'ASGNetworkOut')
+            if metric not in PREDICTIVE_METRICS:
+                raise ValueError(f"connectionGwy.scaling.predictive: unknown metric '{metric}', "
+                                 f"use one of {', '.join(PREDICTIVE_METRICS)}")
+            autoscaling.CfnScalingPolicy(self, "Predictive",
+                auto_scaling_group_name=auto_scaling_group.auto_scaling_group_name,
+                policy_type="PredictiveScaling",
+                predictive_scaling_configuration=autoscaling.CfnScalingPolicy.PredictiveScalingConfigurationProperty(
+                    metric_specifications=[autoscaling.CfnScalingPolicy.PredictiveScalingMetricSpecificationProperty(
+                        target_value=predictive['targetValue'],
+                        predefined_metric_pair_specification=autoscaling.CfnScalingPolicy.PredictiveScalingPredefinedMetricPairProperty(
+                            predefined_metric_type=metric
+                            )
+                        )],
+                    # ForecastOnly until the forecast has been checked against real traffic
+                    mode=predictive.get('mode', 'ForecastOnly'),
+                    scheduling_buffer_time=int(predictive.get('schedulingBufferSeconds', 600)),
+                    max_capacity_breach_behavior=predictive.get('maxCapacityBreachBehavior', 'HonorMaxCapacity')
+                    )
+                )
@@ -13,7 +13,9 @@
 # IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 # CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import math
 import os
+import re
 from aws_cdk import Stack
 import aws_cdk as cdk
 import aws_cdk.aws_ec2 as ec2
@@ -22,6 +24,51 @@ import aws_cdk.aws_kms as kms
 import aws_cdk.aws_autoscaling as autoscaling
 import aws_cdk.aws_elasticloadbalancingv2 as elbv2
 from constructs import Construct
+from stacks.session_resolver.session_resolver import SessionResolver
+from stacks.connection_gwy_scaling.connection_gwy_scaling import ConnectionGwyScaling
+from stacks.broker_tier.broker_tier import BrokerTier
+from stacks.vpc_endpoints.vpc_endpoints import VpcEndpoints
+from stacks.performance_profile.performance_profile import PerformanceProfile
+from stacks.transport_profile.transport_profile import (GATEWAY_HEALTH_CHECK_PORT, TransportProfile,
+                                                        TransportValidation)
+
+# Launch lifecycle hook completed by the Connection Gateway user data
+CONNECTION_GWY_LAUNCH_HOOK_NAME = "dcv-connection-gwy-launch"
+
+# Time the Connection Gateways keep waiting for a ready broker after the brokers stop publishing
+BROKER_WAIT_MARGIN_SECONDS = 300
+
+# Memory per vCPU of the Graviton instance families, by the letter of the family
+MEMORY_GIB_PER_VCPU = {"c": 2, "m": 4, "r": 8, "x": 16}
+
+# Memory of the burstable Graviton instance sizes
+T4G_MEMORY_GIB = {"nano": 0.5, "micro": 1, "small": 2, "medium": 4, "large": 8, "xlarge": 16, "2xlarge": 32}
+
+# Hibernation is supported for instances with less than 150 GiB of memory
+HIBERNATION_MAX_MEMORY_GIB = 150
+
+def instance_memory_gib(instance_type: str):
+    """ Returns the memory of a Graviton instance type in GiB, None when the type is not known """
+    family, _, size = instance_type.partition(".")
+    if family == "t4g":
+        return T4G_MEMORY_GIB.get(size)
+    match = re.fullmatch(r"([cmrx])\d+g[a-z]*", family)
+    size_match = re.fullmatch(r"medium|large|(\d*)xlarge", size)
+    if not match or not size_match:
+        return None
+    vcpus = {"medium": 1, "large": 2}.get(size) or 4 * int(size_match.group(1) or 1)
+    return vcpus * MEMORY_GIB_PER_VCPU[match.group(1)]
+
+def hibernation_volume_size(instance_type: str, system_size: int = 8) -> int:
+    """ Returns the root volume size in GiB that holds the system and the memory of a hibernated instance """
+    memory = instance_memory_gib(instance_type)
+    if memory is None:
+        raise ValueError(f"connectionGwy.warmPool: cannot size the hibernated root volume of '{instance_type}', "
+                         f"use a c, m, r, x or t4g Graviton instance type")
+    if memory >= HIBERNATION_MAX_MEMORY_GIB:
+        raise ValueError(f"connectionGwy.warmPool: '{instance_type}' has {memory} GiB of memory, "
+                         f"hibernation needs less than {HIBERNATION_MAX_MEMORY_GIB} GiB")
+    return system_size + math.ceil(memory)
 
 # The NICE DCV INFRA stack
 class DcvInfra(Stack):
@@ -51,12 +98,14 @@ class DcvInfra(Stack):
             subnets_private_ref_a = ec2.Subnet.from_subnet_attributes(
                 self, "PrivateSubnetAFromAttributes",
                 subnet_id=config_data['network']['privateASubnetId'],
-                availability_zone=f"{self.region}a"
+                availability_zone=f"{self.region}a",
+                route_table_id=config_data['network'].get('privateARouteTableId') or None
                 )
             subnets_private_ref_b = ec2.Subnet.from_subnet_attributes(
                 self, "PrivateSubnetBFromAttributes",
                 subnet_id=config_data['network']['privateBSubnetId'],
-                availability_zone=f"{self.region}b"
+                availability_zone=f"{self.region}b",
+                route_table_id=config_data['network'].get('privateBRouteTableId') or None
                 )
             subnets_public = ec2.SubnetSelection(
                 subnets=[subnets_public_ref_a, subnets_public_ref_b]
@@ -64,10 +113,15 @@ class DcvInfra(Stack):
             subnets_private = ec2.SubnetSelection(
                 subnets=[subnets_private_ref_a, subnets_private_ref_b]
                 )
+            # Gateway endpoints are added to the route tables of the private subnets
+            private_route_tables = config_data['network'].get('privateARouteTableId') \
+                and config_data['network'].get('privateBRouteTableId')
         else:
-            # Create new VPC, subnets, and NAT Gateway
+            # Create new VPC, subnets, and NAT Gateway,
+            # one per Availability Zone keeps the egress traffic of each zone in the zone
+            nat_gateway_per_az = config_data['network'].get('natGatewayPerAz', False)
             vpc = ec2.Vpc(self, "VPC",
-                        nat_gateways = 1,
+                        nat_gateways = 2 if nat_gateway_per_az else 1,
                         max_azs = 2,
                         subnet_configuration=[
                             ec2.SubnetConfiguration(
@@ -90,6 +144,21 @@ class DcvInfra(Stack):
             subnets_private = ec2.SubnetSelection(
                 subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS
                 )
+            private_route_tables = True
+
+        # VPC endpoints for the AWS APIs called by the instances
+        endpoints_config = config_data['network'].get('endpoints', {})
+        if endpoints_config.get('gateway') and not private_route_tables:
+            cdk.Annotations.of(self).add_warning(
+                "network.endpoints.gateway is skipped, set privateARouteTableId and "
+                "privateBRouteTableId to add gateway endpoints to an existing VPC")
+            endpoints_config = dict(endpoints_config, gateway=[])
+        if endpoints_config.get('gateway') or endpoints_config.get('interface'):
+            VpcEndpoints(self, "VpcEndpoints",
+                vpc=vpc,
+                vpc_subnets=subnets_private,
+                endpoints_config=endpoints_config
+                )
 
 
         # IAM Fleet Role Configuration
@@ -145,6 +214,7 @@ class DcvInfra(Stack):
                 ],
             resources=[
                 f"arn:aws:ssm:{self.region}:{self.account}:parameter/dcv-broker-private-dns",
+                f"arn:aws:ssm:{self.region}:{self.account}:parameter/dcv-broker-ready",
                 ]
         ))
 
@@ -170,7 +240,8 @@ class DcvInfra(Stack):
                 'ssm:GetParameter'
                 ],
             resources=[
-                f"arn:aws:ssm:{self.region}:{self.account}:parameter/dcv-broker-private-dns"
+                f"arn:aws:ssm:{self.region}:{self.account}:parameter/dcv-broker-private-dns",
+                f"arn:aws:ssm:{self.region}:{self.account}:parameter/dcv-broker-ready"
                 ]
         ))
 
@@ -197,6 +268,9 @@ class DcvInfra(Stack):
             sg_session_mgr, ec2.Port.all_traffic(), "allow Broker to Broker communication"
             )
 
+        # Ports and QUIC settings of the streaming path from the transport profile in the config.json file
+        transport_profile = TransportProfile(config_data)
+
         # Connection Gateway Security Group configuration
         sg_connection_gwy = ec2.SecurityGroup(self, "CGSecurityGroup",
                                vpc=vpc,
@@ -206,13 +280,16 @@ class DcvInfra(Stack):
                                )
 
         sg_connection_gwy.add_ingress_rule(
-            ec2.Peer.any_ipv4(), ec2.Port.tcp(8443), "allow TCP DCV access from public internet"
-            )
-        sg_connection_gwy.add_ingress_rule(
-            ec2.Peer.any_ipv4(), ec2.Port.udp(8443), "allow UDP DCV access from public internet"
+            ec2.Peer.any_ipv4(), ec2.Port.tcp(transport_profile.gateway_port),
+            "allow TCP DCV access from public internet"
             )
+        if transport_profile.quic:
+            sg_connection_gwy.add_ingress_rule(
+                ec2.Peer.any_ipv4(), ec2.Port.udp(transport_profile.gateway_port),
+                "allow UDP DCV access from public internet"
+                )
         sg_connection_gwy.add_ingress_rule(
-            ec2.Peer.any_ipv4(), ec2.Port.tcp(8989), "allow health check for NLB targets"
+            ec2.Peer.any_ipv4(), ec2.Port.tcp(GATEWAY_HEALTH_CHECK_PORT), "allow health check for NLB targets"
             )
 
         # Gateway to Session Manager resolver communication
@@ -229,11 +306,38 @@ class DcvInfra(Stack):
                                )
 
         sg_dcv_server.add_ingress_rule(
-            sg_connection_gwy, ec2.Port.tcp(8443), "allow DCV streaming traffic from Gateway"
-            )
-        sg_dcv_server.add_ingress_rule(
-            sg_connection_gwy, ec2.Port.udp(8443), "allow DCV streaming traffic from Gateway"
+            sg_connection_gwy, ec2.Port.tcp(transport_profile.server_tcp_port),
+            "allow DCV streaming traffic from Gateway"
             )
+        if transport_profile.quic:
+            sg_dcv_server.add_ingress_rule(
+                sg_connection_gwy, ec2.Port.udp(transport_profile.server_quic_port),
+                "allow DCV streaming traffic from Gateway"
+                )
+
+        # Session Resolver Lambda function, used by the gateways instead of the broker resolver
+        resolver_config = config_data.get('sessionResolver', {})
+        session_resolver = None
+        if resolver_config.get('enabled', False):
+            # The resolver returns the DCV server ports of the transport profile
+            resolver_config = dict(resolver_config, environment=dict(
+                transport_profile.resolver_environment(), **resolver_config.get('environment', {})))
+            session_resolver = SessionResolver(self, "SessionResolver",
+                                   vpc=vpc,
+                                   vpc_subnets=subnets_private,
+                                   gateway_security_group=sg_connection_gwy,
+                                   resolver_config=resolver_config
+                                   )
+            # Resolver to broker and DCV server communication when it runs in the VPC
+            if session_resolver.security_group is not None:
+                sg_session_mgr.add_ingress_rule(
+                    session_resolver.security_group, ec2.Port.tcp(8443),
+                    "allow session resolver to Broker communication"
+                    )
+                sg_dcv_server.add_ingress_rule(
+                    session_resolver.security_group, ec2.Port.tcp(transport_profile.server_tcp_port),
+                    "allow session resolver health checks"
+                    )
 
         # Get KMS Key from Alias/Key Name
         kms_arn = f"arn:aws:kms:{self.region}:{self.account}:alias/{config_data['kmsKeyName']}"
@@ -253,6 +357,13 @@ class DcvInfra(Stack):
                                                        "session-mgr-user-data.sh"),
                                                        "r", encoding="utf-8")
         session_mgr_user_data_content = session_mgr_user_data_file.read()
+        # The brokers publish their readiness for this long, the gateways wait for it a margin longer
+        broker_ready_timeout = config_data['sessionMgr'].get('brokerReadyTimeoutSeconds', 1800)
+        if not isinstance(broker_ready_timeout, int) or broker_ready_timeout <= 0:
+            raise ValueError(f"sessionMgr.brokerReadyTimeoutSeconds: expected a positive number of seconds, "
+                             f"got '{broker_ready_timeout}'")
+        session_mgr_user_data_content = session_mgr_user_data_content.replace(
+            'BROKER_READY_TIMEOUT_SECONDS=""', f'BROKER_READY_TIMEOUT_SECONDS="{broker_ready_timeout}"')
         session_mgr_user_data = ec2.UserData.custom(session_mgr_user_data_content)
 
         # Create a reference to the SSH Key Pair name given in the config.json file
@@ -260,22 +371,45 @@ class DcvInfra(Stack):
             key_pair_name=config_data['sshKeypairName']
         )
 
-        # Create the Session Manager EC2 instance
-        session_mgr_instance = ec2.Instance(self, "SessionMgrInstance",
-                                vpc=vpc,
-                                vpc_subnets=subnets_private,
-                                instance_type=ec2.InstanceType.of(
-                                    ec2.InstanceClass.M6G, ec2.InstanceSize.LARGE),
-                                machine_image=session_mgr_ami,
-                                security_group=sg_session_mgr,
-                                key_pair=key_pair,
-                                user_data=session_mgr_user_data,
-                                role=role_session_mgr,
-                                block_devices=[ec2.BlockDevice(
-                                    device_name="/dev/xvda",
-                                    volume=ec2.BlockDeviceVolume.ebs(
-                                        8, encrypted=True, kms_key=kms_key))]
-                                )
+        # Instance types, volumes and network settings of the performance profile selected in the config.json file
+        session_mgr_profile = PerformanceProfile(config_data, 'sessionMgr')
+        connection_gwy_profile = PerformanceProfile(config_data, 'connectionGwy')
+
+        # Optional broker tier, an Auto Scaling group of brokers behind an internal Network Load Balancer
+        broker_tier_config = config_data['sessionMgr'].get('brokerTier', {})
+        if broker_tier_config.get('enabled', False):
+            session_mgr_broker_tier = BrokerTier(self, "SessionMgrBrokerTier",
+                                          vpc=vpc,
+                                          vpc_subnets=subnets_private,
+                                          security_group=sg_session_mgr,
+                                          role=role_session_mgr,
+                                          machine_image=session_mgr_ami,
+                                          key_pair=key_pair,
+                                          kms_key=kms_key,
+                                          user_data_content=session_mgr_user_data_content,
+                                          tier_config=broker_tier_config,
+                                          profile=session_mgr_profile
+                                          )
+            session_mgr_resource = session_mgr_broker_tier
+            # Gateways reach the brokers through the load balancer, which preserves their IP address
+            sg_session_mgr.add_ingress_rule(
+                ec2.Peer.ipv4(vpc.vpc_cidr_block), ec2.Port.tcp(8447),
+                "allow Gateway to Broker resolver communication through the NLB"
+                )
+        else:
+            # Create the Session Manager EC2 instance
+            session_mgr_instance = ec2.Instance(self, "SessionMgrInstance",
+                                    vpc=vpc,
+                                    vpc_subnets=subnets_private,
+                                    instance_type=session_mgr_profile.instance_type("m6g.large"),
+                                    machine_image=session_mgr_ami,
+                                    security_group=sg_session_mgr,
+                                    key_pair=key_pair,
+                                    user_data=session_mgr_user_data,
+                                    role=role_session_mgr,
+                                    block_devices=session_mgr_profile.block_devices(kms_key)
+                                    )
+            session_mgr_resource = session_mgr_instance
 
         # Connection Gateway
         ### Connection Gateway AMI
@@ -291,41 +425,110 @@ class DcvInfra(Stack):
                                                           "r", encoding="utf-8")
 
         connection_gwy_user_data_content = connection_gwy_user_data_file.read()
+        connection_gwy_user_data_content = connection_gwy_user_data_content.replace(
+            'BROKER_WAIT_TIMEOUT_SECONDS=""',
+            f'BROKER_WAIT_TIMEOUT_SECONDS="{broker_ready_timeout + BROKER_WAIT_MARGIN_SECONDS}"')
+        # Point the gateway [resolver] url at the session resolver instead of the broker
+        if session_resolver is not None and session_resolver.gateway_url:
+            connection_gwy_user_data_content = connection_gwy_user_data_content.replace(
+                'RESOLVER_URL=""', f'RESOLVER_URL="{session_resolver.gateway_url}"')
+
+        # Gateway configuration rendered from its template with the transport profile
+        connection_gwy_conf_file = open(os.path.join(os.path.dirname( __file__ ),
+                                                     "..", "..",
+                                                     "scripts",
+                                                     "dcv-connection-gateway.conf"),
+                                                     "r", encoding="utf-8")
+        connection_gwy_conf = transport_profile.render_gateway_conf(connection_gwy_conf_file.read())
+        connection_gwy_user_data_content = connection_gwy_user_data_content.replace(
+            'DCV_CONNECTION_GATEWAY_CONF\n', connection_gwy_conf)
+        if transport_profile.udp_buffer_bytes:
+            connection_gwy_user_data_content = connection_gwy_user_data_content.replace(
+                'UDP_BUFFER_BYTES=""', f'UDP_BUFFER_BYTES="{transport_profile.udp_buffer_bytes}"')
+
+        # Optional warm pool of pre-configured Connection Gateway instances
+        connection_gwy_warm_pool_config = config_data['connectionGwy'].get('warmPool', {})
+        connection_gwy_warm_pool = connection_gwy_warm_pool_config.get('enabled', False)
+        connection_gwy_pool_state = connection_gwy_warm_pool_config.get('poolState', 'Stopped')
+        # Hibernation saves the instance memory to the root volume, make room for it
+        connection_gwy_hibernated = connection_gwy_warm_pool and connection_gwy_pool_state == 'Hibernated'
+        connection_gwy_volume_size = 8
+        if connection_gwy_hibernated:
+            connection_gwy_volume_size = hibernation_volume_size(
+                connection_gwy_profile.instance_type("c7g.large").to_string())
+        if connection_gwy_warm_pool:
+            # The instances complete the launch lifecycle action themselves once the gateway is ready
+            connection_gwy_user_data_content = connection_gwy_user_data_content.replace(
+                'LIFECYCLE_HOOK_NAME=""', f'LIFECYCLE_HOOK_NAME="{CONNECTION_GWY_LAUNCH_HOOK_NAME}"')
         connection_gwy_session_mgr_user_data = ec2.UserData.custom(connection_gwy_user_data_content)
 
         # Create an EC2 launch template with the encrypted volume for Connection Gateway
         connection_gwy_launch_template = ec2.LaunchTemplate(self, "ConnectionGwyLaunchTemplate",
                                              machine_image=connection_gwy_ami,
                                              security_group=sg_connection_gwy,
-                                             instance_type=ec2.InstanceType.of(
-                                                 ec2.InstanceClass.C7G, ec2.InstanceSize.LARGE),
+                                             instance_type=connection_gwy_profile.instance_type("c7g.large"),
                                              key_pair=key_pair,
                                              user_data=connection_gwy_session_mgr_user_data,
                                              role=role_connection_gwy,
-                                             block_devices=[ec2.BlockDevice(
-                                                 device_name="/dev/xvda",
-                                                 volume=ec2.BlockDeviceVolume.ebs(
-                                                     8, encrypted=True, kms_key=kms_key))],
+                                             block_devices=connection_gwy_profile.block_devices(
+                                                 kms_key, connection_gwy_volume_size),
+                                             hibernation_configured=connection_gwy_hibernated or None,
+                                             # One minute metrics, the network scaling targets are per minute
+                                             detailed_monitoring=True,
                                             )
+        connection_gwy_profile.apply_to_launch_template(self, connection_gwy_launch_template,
+                                                        sg_connection_gwy)
+
+        # Connection Gateway capacity and scaling policies from the config.json file
+        connection_gwy_scaling_config = config_data['connectionGwy'].get('scaling', {})
 
         # Create a Connection Gateway Auto Scaling Group
         connection_gwy_asg = autoscaling.AutoScalingGroup(self, "ConnectionGwyASG",
                                      vpc=vpc,
                                      launch_template=connection_gwy_launch_template,
-                                     min_capacity=1,
-                                     max_capacity=5,
-                                     desired_capacity=1,
+                                     min_capacity=connection_gwy_scaling_config.get('minCapacity', 1),
+                                     max_capacity=connection_gwy_scaling_config.get('maxCapacity', 5),
+                                     # Left unset, a deployment does not reset the capacity set by scaling
+                                     desired_capacity=connection_gwy_scaling_config.get('desiredCapacity'),
                                      vpc_subnets=subnets_private
                                     )
 
-        # Ensure Session Manager instance is created before Connection Gateway targets
-        connection_gwy_asg.node.add_dependency(session_mgr_instance)
-
-        # Connection Gateway Auto Scaling Group CPU Utilization to scale
-        connection_gwy_asg.scale_on_cpu_utilization(
-            "ConnectionGwyASGCPUUtilization", target_utilization_percent=75
+        if connection_gwy_warm_pool:
+            connection_gwy_asg.add_warm_pool(
+                min_size=connection_gwy_warm_pool_config.get('minSize', 1),
+                max_group_prepared_capacity=connection_gwy_warm_pool_config.get('maxGroupPreparedCapacity'),
+                pool_state=autoscaling.PoolState(connection_gwy_pool_state.upper()),
+                reuse_on_scale_in=connection_gwy_warm_pool_config.get('reuseOnScaleIn', True)
+                )
+            # Keeps new and warmed instances out of service until the gateway is configured
+            connection_gwy_asg.add_lifecycle_hook("ConnectionGwyLaunchHook",
+                lifecycle_hook_name=CONNECTION_GWY_LAUNCH_HOOK_NAME,
+                lifecycle_transition=autoscaling.LifecycleTransition.INSTANCE_LAUNCHING,
+                default_result=autoscaling.DefaultResult.ABANDON,
+                heartbeat_timeout=cdk.Duration.seconds(
+                    connection_gwy_warm_pool_config.get('lifecycleHookTimeoutSeconds', 900))
+                )
+            # Permission for the Connection Gateway instances to complete their lifecycle action.
+            # A separate policy, the launch template depends on the role default policy.
+            iam.Policy(self, "ConnectionGwyLifecyclePolicy",
+                roles=[role_connection_gwy],
+                statements=[
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=["autoscaling:CompleteLifecycleAction"],
+                        resources=[connection_gwy_asg.auto_scaling_group_arn]
+                    ),
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=["autoscaling:DescribeAutoScalingInstances"],
+                        resources=["*"]
+                    )
+                ]
             )
 
+        # Ensure Session Manager is created before Connection Gateway targets
+        connection_gwy_asg.node.add_dependency(session_mgr_resource)
+
         # Create a Connection Gateway Network Load Balancer
         connection_gwy_nlb = elbv2.NetworkLoadBalancer(self, "ConnectionGwyNLB",
                                         vpc=vpc,
@@ -337,19 +540,42 @@ class DcvInfra(Stack):
 
         # Connection Gateway Listener to Target Setup for NLB
         connection_gwy_listener = connection_gwy_nlb.add_listener(
-            "ConnectionGwyNLBListener", port=8443, protocol=elbv2.Protocol.TCP_UDP
+            "ConnectionGwyNLBListener", port=transport_profile.gateway_port,
+            protocol=transport_profile.load_balancer_protocol
             )
 
+        # Load balancer health check of the Connection Gateways, fewer and faster checks put new capacity in service sooner
+        connection_gwy_health_check_config = config_data['connectionGwy'].get('healthCheck', {})
+
         # Route the Connection Gateway targets
-        connection_gwy_listener.add_targets("ConnectionGwyNLBTarget",
-                                            port=8443,
-                                            protocol=elbv2.Protocol.TCP_UDP,
+        connection_gwy_target_group = connection_gwy_listener.add_targets("ConnectionGwyNLBTarget",
+                                            port=transport_profile.gateway_port,
+                                            protocol=transport_profile.load_balancer_protocol,
                                             health_check=elbv2.HealthCheck(
-                                                port="8989",
+                                                port=str(GATEWAY_HEALTH_CHECK_PORT),
                                                 protocol=elbv2.Protocol.TCP,
-                                                unhealthy_threshold_count=5,
-                                                healthy_threshold_count=5,
-                                                interval=cdk.Duration.seconds(30)
+                                                unhealthy_threshold_count=connection_gwy_health_check_config.get('unhealthyThresholdCount', 5),
+                                                healthy_threshold_count=connection_gwy_health_check_config.get('healthyThresholdCount', 5),
+                                                interval=cdk.Duration.seconds(
+                                                    connection_gwy_health_check_config.get('intervalSeconds', 30))
                                                 ),
                                             targets=[connection_gwy_asg]
                                             )
+
+        # Fail the synth when the gateway configuration, user data or resolver disagree with the
+        # transport profile, or UDP is opened with QUIC off
+        self.node.add_validation(TransportValidation(transport_profile, self,
+                                     gateway_conf=connection_gwy_conf,
+                                     gateway_user_data=connection_gwy_user_data_content,
+                                     resolver_environment=session_resolver.environment if session_resolver else None
+                                     ))
+        cdk.CfnOutput(self, "DcvServerTransport", value=transport_profile.server_settings(),
+                      description="DCV server [connectivity] settings of the transport profile, set them in the bootstrap scripts")
+
+        # Scale the Connection Gateways on CPU, network throughput and load balancer flows
+        ConnectionGwyScaling(self, "ConnectionGwyScaling",
+                             auto_scaling_group=connection_gwy_asg,
+                             load_balancer=connection_gwy_nlb,
+                             target_group=connection_gwy_target_group,
+                             scaling_config=connection_gwy_scaling_config
+                             )
@@ -0,0 +1,164 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import aws_cdk as cdk
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_iam as iam
+import aws_cdk.aws_lambda as lambda_
+import aws_cdk.aws_logs as logs
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+import aws_cdk.aws_elasticloadbalancingv2_targets as elbv2_targets
+from constructs import Construct
+
+# The session-resolver folder at the root of the repository
+RESOLVER_CODE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "session-resolver")
+
+# Development files that are not part of the Lambda deployment package
+RESOLVER_CODE_EXCLUDES = ["benchmarks", "tests", "tools", "*.md", "requirements-dev.txt", "**/__pycache__"]
+
+# The DCV Session Resolver construct
+class SessionResolver(Construct):
+    """ Deploys the session resolver Lambda function and the endpoint the gateway calls it on """
+    def __init__(self, scope: Construct, construct_id: str, vpc: ec2.IVpc,
+                 vpc_subnets: ec2.SubnetSelection, gateway_security_group: ec2.ISecurityGroup,
+                 resolver_config: dict, **kwargs) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+
+        provisioned_concurrency = int(resolver_config.get('provisionedConcurrency', 0))
+        snap_start = bool(resolver_config.get('snapStart', False))
+        endpoint = resolver_config.get('endpoint', 'alb')
+
+        # SnapStart cannot be used together with provisioned concurrency
+        if provisioned_concurrency and snap_start:
+            raise ValueError("sessionResolver: set either provisionedConcurrency or snapStart, not both")
+        if endpoint not in ('alb', 'functionUrl'):
+            raise ValueError(f"sessionResolver: unknown endpoint '{endpoint}', use alb or functionUrl")
+
+        environment = {key: str(value) for key, value in resolver_config.get('environment', {}).items()}
+        self.environment = environment
+        # Warm capacity runs the init phase ahead of traffic, create the AWS clients there
+        if provisioned_concurrency or snap_start:
+            environment.setdefault('PREWARM_CLIENTS', 'true')
+
+        # Resolver Security Group, only needed when the function runs in the VPC
+        self.security_group = None
+        function_vpc_options = {}
+        if resolver_config.get('vpcAccess', False):
+            self.security_group = ec2.SecurityGroup(self, "SecurityGroup",
+                                   vpc=vpc,
+                                   description="SG for the DCV session resolver function",
+                                   allow_all_outbound=True, #Egress all
+                                   disable_inline_rules=True
+                                   )
+            function_vpc_options = {
+                'vpc': vpc,
+                'vpc_subnets': vpc_subnets,
+                'security_groups': [self.security_group]
+            }
+
+        log_group = logs.LogGroup(self, "LogGroup",
+                                  retention=logs.RetentionDays.ONE_MONTH,
+                                  removal_policy=cdk.RemovalPolicy.DESTROY
+                                  )
+
+        # Graviton function, the resolver only uses boto3 from the Lambda runtime
+        self.function = lambda_.Function(self, "Function",
+                            runtime=lambda_.Runtime.PYTHON_3_12,
+                            architecture=lambda_.Architecture.ARM_64,
+                            handler="resolver.lambda_handler",
+                            code=lambda_.Code.from_asset(RESOLVER_CODE_PATH,
+                                                         exclude=RESOLVER_CODE_EXCLUDES),
+                            memory_size=int(resolver_config.get('memorySize', 256)),
+                            timeout=cdk.Duration.seconds(10),
+                            environment=environment,
+                            snap_start=lambda_.SnapStartConf.ON_PUBLISHED_VERSIONS if snap_start else None,
+                            log_group=log_group,
+                            **function_vpc_options
+                            )
+
+        # DescribeInstances does not support resource-level permissions
+        self.function.add_to_role_policy(iam.PolicyStatement(
+            effect=iam.Effect.ALLOW,
+            actions=["ec2:DescribeInstances"],
+            resources=["*"]
+        ))
+
+        # Permission to read the broker API client secret in session-manager resolution mode
+        if environment.get('BROKER_CLIENT_SECRET_ARN'):
+            self.function.add_to_role_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["secretsmanager:GetSecretValue"],
+                resources=[environment['BROKER_CLIENT_SECRET_ARN']]
+            ))
+
+        # Provisioned concurrency and SnapStart both apply to a published version
+        self.alias = lambda_.Alias(self, "LiveAlias",
+                        alias_name="live",
+                        version=self.function.current_version,
+                        provisioned_concurrent_executions=provisioned_concurrency or None
+                        )
+
+        if endpoint == 'functionUrl':
+            # The URL is public, without IAM auth anyone could map instance IDs to private IPs and
+            # spend the resolver's EC2 calls. The gateway cannot sign requests, it keeps the broker resolver
+            function_url = self.alias.add_function_url(auth_type=lambda_.FunctionUrlAuthType.AWS_IAM)
+            self.url = function_url.url
+            self.gateway_url = None
+        else:
+            # Internal Application Load Balancer only reachable from the Connection Gateways
+            sg_load_balancer = ec2.SecurityGroup(self, "LoadBalancerSecurityGroup",
+                                   vpc=vpc,
+                                   description="SG for the DCV session resolver load balancer",
+                                   allow_all_outbound=True, #Egress all
+                                   disable_inline_rules=True
+                                   )
+            load_balancer = elbv2.ApplicationLoadBalancer(self, "LoadBalancer",
+                                vpc=vpc,
+                                internet_facing=False,
+                                vpc_subnets=vpc_subnets,
+                                security_group=sg_load_balancer
+                                )
+            # HTTPS when a certificate is given, the gateway does not verify the resolver certificate
+            certificate_arn = resolver_config.get('certificateArn', '')
+            if certificate_arn:
+                listener_port = 443
+                listener = load_balancer.add_listener("HttpsListener",
+                                port=listener_port,
+                                protocol=elbv2.ApplicationProtocol.HTTPS,
+                                certificates=[elbv2.ListenerCertificate.from_arn(certificate_arn)],
+                                open=False
+                                )
+                self.url = f"https://{load_balancer.load_balancer_dns_name}"
+            else:
+                listener_port = 80
+                listener = load_balancer.add_listener("HttpListener",
+                                port=listener_port,
+                                protocol=elbv2.ApplicationProtocol.HTTP,
+                                open=False
+                                )
+                self.url = f"http://{load_balancer.load_balancer_dns_name}"
+            sg_load_balancer.add_ingress_rule(
+                gateway_security_group, ec2.Port.tcp(listener_port),
+                "allow Gateway to session resolver communication"
+                )
+            listener.add_targets("ResolverTarget",
+                                 targets=[elbv2_targets.LambdaTarget(self.alias)]
+                                 )
+            self.gateway_url = self.url
+
+        cdk.CfnOutput(self, "Url", value=self.url,
+                      description="URL of the session resolver for the Connection Gateway [resolver] section"
+                      if self.gateway_url else "URL of the session resolver, requests must be signed with SigV4")
@@ -0,0 +1,158 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import string
+import typing
+import jsii
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+from constructs import Construct, IValidation
+
+# Connection Gateway health check port, answered outside of the transport profile
+GATEWAY_HEALTH_CHECK_PORT = 8989
+
+# Defaults of the settings a transport profile leaves out, the DCV ports without UDP buffer tuning
+DEFAULT_TRANSPORT = {
+    "quic": True,
+    "gatewayPort": 8443,
+    "serverTcpPort": 8443,
+    "serverQuicPort": 8443,
+    "udpBufferBytes": 0
+}
+
+# The transport profile of the DCV streaming path
+class TransportProfile:
+    """ Ports and QUIC settings of the gateways, the DCV servers and the session resolver, from config.json """
+    def __init__(self, config_data: dict) -> None:
+        self.name = config_data.get('transportProfile', 'quic-first')
+        profiles = {name: profile for name, profile in config_data.get('transportProfiles', {}).items()
+                    if name != 'comment'}
+        if profiles and self.name not in profiles:
+            raise ValueError(f"transportProfile: unknown profile '{self.name}', "
+                             f"use one of {', '.join(profiles)}")
+        settings = dict(DEFAULT_TRANSPORT, **profiles.get(self.name, {}))
+
+        self.quic = bool(settings['quic'])
+        self.gateway_port = int(settings['gatewayPort'])
+        self.server_tcp_port = int(settings['serverTcpPort'])
+        self.server_quic_port = int(settings['serverQuicPort'])
+        self.udp_buffer_bytes = int(settings['udpBufferBytes'])
+
+        for key, port in (('gatewayPort', self.gateway_port), ('serverTcpPort', self.server_tcp_port),
+                          ('serverQuicPort', self.server_quic_port)):
+            if not 0 < port < 65536:
+                raise ValueError(f"transportProfiles.{self.name}: {key} {port} is not a valid port")
+        if self.gateway_port == GATEWAY_HEALTH_CHECK_PORT:
+            raise ValueError(f"transportProfiles.{self.name}: gatewayPort {self.gateway_port} "
+                             "is the gateway health check port")
+        if self.udp_buffer_bytes < 0:
+            raise ValueError(f"transportProfiles.{self.name}: udpBufferBytes must be 0 or more")
+
+    @property
+    def load_balancer_protocol(self) -> elbv2.Protocol:
+        """ Returns the protocol of the gateway load balancer listener and targets """
+        return elbv2.Protocol.TCP_UDP if self.quic else elbv2.Protocol.TCP
+
+    def render_gateway_conf(self, template: str) -> str:
+        """ Returns the Connection Gateway configuration file rendered from its template """
+        endpoints = f'["0.0.0.0:{self.gateway_port}", "[::]:{self.gateway_port}"]'
+        return string.Template(template).substitute(
+            web_listen_endpoints=endpoints,
+            quic_listen_endpoints=endpoints if self.quic else "[]"
+            )
+
+    def resolver_environment(self) -> dict:
+        """ Returns the session resolver environment variables of the DCV server ports """
+        return {
+            'DCV_TCP_PORT': str(self.server_tcp_port),
+            'DCV_UDP_PORT': str(self.server_quic_port)
+        }
+
+    def server_settings(self) -> str:
+        """ Returns the DCV server [connectivity] settings matching the profile """
+        return (f"enable-quic-frontend={str(self.quic).lower()} "
+                f"web-port={self.server_tcp_port} quic-port={self.server_quic_port}")
+
+
+def conf_values(conf: str) -> typing.Dict[typing.Tuple[str, str], str]:
+    """ Returns the (section, key) settings of a TOML style configuration file, values as written """
+    values = {}
+    section = ""
+    for line in conf.splitlines():
+        line = line.strip()
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1]
+        elif "=" in line and not line.startswith("#"):
+            key, _, value = line.partition("=")
+            values[(section, key.strip())] = value.strip()
+    return values
+
+# Synth-time check of the streaming path
+@jsii.implements(IValidation)
+class TransportValidation:
+    """ Checks that the gateway configuration file, user data and resolver settings agree with the profile
+
+    The load balancer and security groups are built from the profile itself, so
+    only stray UDP listeners and rules, added with QUIC turned off, are looked for.
+    """
+    def __init__(self, profile: TransportProfile, scope: Construct, gateway_conf: str, gateway_user_data: str,
+                 resolver_environment: typing.Optional[dict] = None) -> None:
+        self.profile = profile
+        self.scope = scope
+        self.gateway_conf = gateway_conf
+        self.gateway_user_data = gateway_user_data
+        self.resolver_environment = resolver_environment
+
+    def validate(self) -> typing.List[str]:
+        profile = self.profile
+        prefix = f"transportProfile '{profile.name}'"
+        errors = []
+
+        # The configuration file is a template in scripts/, edits can drop or hard-code the listeners
+        endpoints = f'["0.0.0.0:{profile.gateway_port}", "[::]:{profile.gateway_port}"]'
+        conf = conf_values(self.gateway_conf)
+        expected_conf = {
+            ("gateway", "web-listen-endpoints"): endpoints,
+            ("gateway", "quic-listen-endpoints"): endpoints if profile.quic else "[]",
+            ("health-check", "port"): str(GATEWAY_HEALTH_CHECK_PORT)
+        }
+        for (section, key), value in expected_conf.items():
+            if conf.get((section, key)) != value:
+                errors.append(f"{prefix}: the gateway configuration [{section}] {key} is "
+                              f"{conf.get((section, key))}, expected {value}")
+
+        # The user data placeholders must still be there for the substitutions to take
+        if self.gateway_conf not in self.gateway_user_data:
+            errors.append(f"{prefix}: the gateway user data does not write the gateway configuration, "
+                          "DCV_CONNECTION_GATEWAY_CONF is missing")
+        if profile.udp_buffer_bytes and f'UDP_BUFFER_BYTES="{profile.udp_buffer_bytes}"' not in self.gateway_user_data:
+            errors.append(f"{prefix}: the gateway user data does not set UDP_BUFFER_BYTES to "
+                          f"{profile.udp_buffer_bytes}")
+
+        # Resolver environment overrides in config.json win over the profile ports
+        if self.resolver_environment is not None:
+            for key, value in profile.resolver_environment().items():
+                if self.resolver_environment.get(key) != value:
+                    errors.append(f"{prefix}: sessionResolver.environment.{key} is "
+                                  f"{self.resolver_environment.get(key)}, expected {value}")
+
+        if not profile.quic:
+            for construct in self.scope.node.find_all():
+                if isinstance(construct, ec2.CfnSecurityGroupIngress) and construct.ip_protocol == "udp":
+                    errors.append(f"{prefix}: QUIC is off but {construct.node.path} allows UDP {construct.from_port}")
+                elif (isinstance(construct, (elbv2.CfnListener, elbv2.CfnTargetGroup))
+                      and construct.protocol in ("UDP", "TCP_UDP")):
+                    errors.append(f"{prefix}: QUIC is off but {construct.node.path} is {construct.protocol}")
+        return errors
@@ -0,0 +1,44 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import pytest
+import aws_cdk as cdk
+from aws_cdk.assertions import Template
+from stacks.dcv_infra.dcv_infra import DcvInfra
+
+APP_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Stands in for the account and region placeholders of config.json
+TEST_ENVIRONMENT = cdk.Environment(account="123456789012", region="us-east-1")
+
+@pytest.fixture
+def config_data():
+    """ Returns the app configuration from config.json with a test account and region """
+    with open(os.path.join(APP_DIR, "config.json"), "r", encoding="utf-8") as config_file:
+        config_data = json.load(config_file)
+    config_data['accountId'] = TEST_ENVIRONMENT.account
+    config_data['region'] = TEST_ENVIRONMENT.region
+    return config_data
+
+@pytest.fixture
+def synth_infra():
+    """ Returns a function synthesizing the DcvInfra stack of a configuration into a Template """
+    def synth(config_data, context=None):
+        app = cdk.App(context=context)
+        stack = DcvInfra(app, "DcvInfraStack", config_data=config_data, env=TEST_ENVIRONMENT)
+        return Template.from_stack(stack)
+    return synth
@@ -0,0 +1,56 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import pytest
+
+
+def user_data(template, resource_type, logical_id_prefix):
+    """ Returns the user data of the resource whose logical ID starts with the prefix, as JSON text """
+    resources = template.find_resources(resource_type)
+    matches = [resource['Properties'] for logical_id, resource in resources.items()
+               if logical_id.startswith(logical_id_prefix)]
+    assert len(matches) == 1
+    properties = matches[0].get('LaunchTemplateData', matches[0])
+    return json.dumps(properties['UserData'])
+
+
+@pytest.mark.parametrize('timeout', [None, 600])
+def test_gateways_wait_longer_than_the_broker_publishes(config_data, synth_infra, timeout):
+    if timeout is not None:
+        config_data['sessionMgr']['brokerReadyTimeoutSeconds'] = timeout
+    broker_timeout = timeout or 1800
+    template = synth_infra(config_data)
+
+    broker = user_data(template, "AWS::EC2::Instance", "SessionMgrInstance")
+    gateway = user_data(template, "AWS::EC2::LaunchTemplate", "ConnectionGwyLaunchTemplate")
+    assert f'BROKER_READY_TIMEOUT_SECONDS=\\"{broker_timeout}\\"' in broker
+    assert f'BROKER_WAIT_TIMEOUT_SECONDS=\\"{broker_timeout + 300}\\"' in gateway
+
+def test_broker_tier_publishes_for_the_configured_time(config_data, synth_infra):
+    config_data['sessionMgr']['brokerTier']['enabled'] = True
+    config_data['sessionMgr']['brokerReadyTimeoutSeconds'] = 1200
+    template = synth_infra(config_data)
+
+    broker = user_data(template, "AWS::EC2::LaunchTemplate", "SessionMgrBrokerTier")
+    gateway = user_data(template, "AWS::EC2::LaunchTemplate", "ConnectionGwyLaunchTemplate")
+    assert 'BROKER_READY_TIMEOUT_SECONDS=\\"1200\\"' in broker
+    assert 'BROKER_WAIT_TIMEOUT_SECONDS=\\"1500\\"' in gateway
+
+@pytest.mark.parametrize('timeout', [0, "1800"])
+def test_invalid_broker_ready_timeout_is_rejected(config_data, synth_infra, timeout):
+    config_data['sessionMgr']['brokerReadyTimeoutSeconds'] = timeout
+    with pytest.raises(ValueError, match="brokerReadyTimeoutSeconds: expected a positive number of seconds"):
+        synth_infra(config_data)
@@ -0,0 +1,101 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import pytest
+from aws_cdk.assertions import Match
+
+
+def broker_tier_config(config_data, **tier_config):
+    """ Runs the brokers as a tier with the given settings """
+    config_data['sessionMgr']['brokerTier']['enabled'] = True
+    config_data['sessionMgr']['brokerTier'].update(tier_config)
+    return config_data
+
+def broker_user_data(template):
+    """ Returns the user data script of the broker tier launch template """
+    launch_templates = template.find_resources("AWS::EC2::LaunchTemplate")
+    broker, = [resource['Properties']['LaunchTemplateData'] for logical_id, resource in launch_templates.items()
+               if logical_id.startswith("SessionMgrBrokerTier")]
+    return json.dumps(broker['UserData'])
+
+
+def test_on_demand_tables_are_created_by_the_stack(config_data, synth_infra):
+    template = synth_infra(broker_tier_config(config_data))
+
+    template.resource_count_is("AWS::DynamoDB::Table", 3)
+    for name in ("Sessions", "Servers"):
+        template.has_resource_properties("AWS::DynamoDB::Table", {
+            "TableName": f"DcvSm-{name}",
+            "BillingMode": "PAY_PER_REQUEST",
+            "KeySchema": [{"AttributeName": "Id", "KeyType": "HASH"}],
+            "TimeToLiveSpecification": Match.absent()
+        })
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "DcvSm-SessionTokens",
+        "TimeToLiveSpecification": {"AttributeName": "ExpiresAt", "Enabled": True}
+    })
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 0)
+
+def test_provisioned_tables_scale_their_capacity(config_data, synth_infra):
+    template = synth_infra(broker_tier_config(config_data, billingMode="PROVISIONED",
+                                              readCapacityUnits=5, maxReadCapacityUnits=50))
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "DcvSm-Sessions",
+        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 10}
+    })
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 6)
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "ScalableDimension": "dynamodb:table:ReadCapacityUnits",
+        "MinCapacity": 5,
+        "MaxCapacity": 50
+    })
+
+def test_configured_tables_replace_the_defaults(config_data, synth_infra):
+    template = synth_infra(broker_tier_config(config_data, tablePrefix="Sm-", tables={
+        "comment": "test tables",
+        "Hosts": {"partitionKey": "HostId"}
+    }))
+
+    template.resource_count_is("AWS::DynamoDB::Table", 1)
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "Sm-Hosts",
+        "KeySchema": [{"AttributeName": "HostId", "KeyType": "HASH"}]
+    })
+    assert 'DYNAMODB_TABLE_PREFIX=\\"Sm-\\"' in broker_user_data(template)
+
+def test_brokers_do_not_create_or_update_tables(config_data, synth_infra):
+    template = synth_infra(broker_tier_config(config_data))
+
+    user_data = broker_user_data(template)
+    assert 'update-table' not in user_data and 'DYNAMODB_BILLING_MODE' not in user_data
+    policies = json.dumps(template.find_resources("AWS::IAM::Policy"))
+    assert 'dynamodb:CreateTable' not in policies and 'dynamodb:UpdateTable' not in policies
+    auto_scaling_group, = template.find_resources("AWS::AutoScaling::AutoScalingGroup", {
+        "Properties": {"LaunchTemplate": Match.object_like({
+            "LaunchTemplateId": {"Ref": Match.string_like_regexp("SessionMgrBrokerTier")}
+        })}
+    }).values()
+    assert len([name for name in auto_scaling_group['DependsOn'] if 'Table' in name]) == 3
+
+def test_unknown_billing_mode_is_rejected(config_data, synth_infra):
+    with pytest.raises(ValueError, match="unknown billingMode 'ON_DEMAND'"):
+        synth_infra(broker_tier_config(config_data, billingMode="ON_DEMAND"))
+
+def test_single_broker_has_no_tables(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    template.resource_count_is("AWS::DynamoDB::Table", 0)
@@ -0,0 +1,152 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+import aws_cdk as cdk
+import aws_cdk.aws_autoscaling as autoscaling
+import aws_cdk.aws_ec2 as ec2
+import aws_cdk.aws_elasticloadbalancingv2 as elbv2
+from aws_cdk.assertions import Match, Template
+from stacks.connection_gwy_scaling.connection_gwy_scaling import ConnectionGwyScaling
+
+
+def synth_scaling(**scaling_config):
+    """ Synthesizes the scaling policies of a gateway Auto Scaling Group and returns the stack """
+    stack = cdk.Stack(cdk.App(), "ScalingStack")
+    vpc = ec2.Vpc(stack, "Vpc", max_azs=2)
+    auto_scaling_group = autoscaling.AutoScalingGroup(stack, "ASG",
+                            vpc=vpc,
+                            instance_type=ec2.InstanceType("c7g.large"),
+                            machine_image=ec2.MachineImage.latest_amazon_linux2023(
+                                cpu_type=ec2.AmazonLinuxCpuType.ARM_64)
+                            )
+    load_balancer = elbv2.NetworkLoadBalancer(stack, "NLB", vpc=vpc)
+    listener = load_balancer.add_listener("Listener", port=443)
+    target_group = listener.add_targets("Targets", port=8443, targets=[auto_scaling_group])
+    ConnectionGwyScaling(stack, "Scaling",
+                         auto_scaling_group=auto_scaling_group,
+                         load_balancer=load_balancer,
+                         target_group=target_group,
+                         scaling_config=scaling_config)
+    return stack
+
+def step_adjustments(template, policy):
+    """ Returns the step adjustments of the step scaling policy whose logical ID starts with policy """
+    policies = template.find_resources("AWS::AutoScaling::ScalingPolicy", {
+        "Properties": {"PolicyType": "StepScaling"}
+    })
+    matches = [resource["Properties"] for name, resource in policies.items() if name.startswith(policy)]
+    assert len(matches) == 1
+    return matches[0]
+
+
+def test_network_target_is_bytes_per_minute():
+    template = Template.from_stack(synth_scaling(cpuUtilizationPercent=0, networkOutBytesPerSecond=1000,
+                                                 instanceWarmupSeconds=120))
+
+    template.resource_properties_count_is("AWS::AutoScaling::ScalingPolicy",
+                                          {"PolicyType": "TargetTrackingScaling"}, 1)
+    template.has_resource_properties("AWS::AutoScaling::ScalingPolicy", {
+        "PolicyType": "TargetTrackingScaling",
+        "EstimatedInstanceWarmup": 120,
+        "TargetTrackingConfiguration": {
+            "PredefinedMetricSpecification": {"PredefinedMetricType": "ASGAverageNetworkOut"},
+            "TargetValue": 60000
+        }
+    })
+
+def test_cpu_target_is_on_by_default():
+    template = Template.from_stack(synth_scaling())
+
+    template.has_resource_properties("AWS::AutoScaling::ScalingPolicy", {
+        "TargetTrackingConfiguration": {
+            "PredefinedMetricSpecification": {"PredefinedMetricType": "ASGAverageCPUUtilization"},
+            "TargetValue": 75
+        }
+    })
+
+def test_active_flow_steps_scale_both_ways():
+    template = Template.from_stack(synth_scaling(cpuUtilizationPercent=0, activeFlowSteps=[
+        {"upper": 50, "change": -1},
+        {"lower": 200, "change": 1},
+        {"lower": 400, "change": 2}
+    ]))
+
+    upper = step_adjustments(template, "ScalingActiveFlowsUpperPolicy")
+    lower = step_adjustments(template, "ScalingActiveFlowsLowerPolicy")
+
+    assert upper["StepAdjustments"] == [
+        {"MetricIntervalLowerBound": 0, "MetricIntervalUpperBound": 200, "ScalingAdjustment": 1},
+        {"MetricIntervalLowerBound": 200, "ScalingAdjustment": 2}
+    ]
+    assert lower["StepAdjustments"] == [{"MetricIntervalUpperBound": 0, "ScalingAdjustment": -1}]
+    for policy in (upper, lower):
+        assert policy["EstimatedInstanceWarmup"] == 300
+        assert policy["MetricAggregationType"] == "Average"
+        assert "Cooldown" not in policy
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "ComparisonOperator": "GreaterThanOrEqualToThreshold",
+        "Threshold": 200,
+        "Metrics": Match.array_with([Match.object_like({"Expression": "IF(hosts > 0, flows / hosts, flows)"})])
+    })
+    template.has_resource_properties("AWS::CloudWatch::Alarm", {
+        "ComparisonOperator": "LessThanOrEqualToThreshold",
+        "Threshold": 50
+    })
+
+def test_new_flow_steps_only_scale_out():
+    template = Template.from_stack(synth_scaling(cpuUtilizationPercent=0, newFlowSteps=[
+        {"lower": 150, "change": 2},
+        {"lower": 60, "change": 1}
+    ]))
+
+    upper = step_adjustments(template, "ScalingNewFlowsUpperPolicy")
+
+    assert upper["StepAdjustments"] == [
+        {"MetricIntervalLowerBound": 0, "MetricIntervalUpperBound": 90, "ScalingAdjustment": 1},
+        {"MetricIntervalLowerBound": 90, "ScalingAdjustment": 2}
+    ]
+    template.resource_count_is("AWS::CloudWatch::Alarm", 1)
+
+def test_step_scaling_has_no_deprecated_cooldown(capfd):
+    synth_scaling(activeFlowSteps=[{"upper": 50, "change": -1}, {"lower": 200, "change": 1}])
+
+    # The jsii runtime prints the deprecation warnings to the standard error
+    assert "cooldown is deprecated" not in capfd.readouterr().err
+
+def test_schedules_use_the_time_zone():
+    template = Template.from_stack(synth_scaling(timeZone="Europe/Paris", schedules=[
+        {"name": "WeekdayPeak", "cron": "30 7 * * MON-FRI", "minCapacity": 4}
+    ]))
+
+    template.has_resource_properties("AWS::AutoScaling::ScheduledAction", {
+        "Recurrence": "30 7 * * MON-FRI",
+        "MinSize": 4,
+        "TimeZone": "Europe/Paris"
+    })
+
+def test_unknown_predictive_metric_is_rejected():
+    with pytest.raises(ValueError, match="unknown metric 'ALBRequestCount'"):
+        synth_scaling(predictive={"enabled": True, "metric": "ALBRequestCount", "targetValue": 1})
+
+def test_gateways_use_detailed_monitoring(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    template.has_resource_properties("AWS::EC2::LaunchTemplate", {
+        "LaunchTemplateData": Match.object_like({
+            "Monitoring": {"Enabled": True},
+            "UserData": Match.any_value()
+        })
+    })
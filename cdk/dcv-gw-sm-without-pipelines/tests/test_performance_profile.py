@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import aws_cdk as cdk
+import aws_cdk.aws_kms as kms
+import pytest
+from stacks.performance_profile.performance_profile import PerformanceProfile
+
+
+def gateway_profile(settings):
+    """ Returns the Connection Gateway profile of a configuration with a single profile """
+    return PerformanceProfile({
+        "performanceProfile": "test",
+        "performanceProfiles": {"test": {"connectionGwy": settings}}
+    }, 'connectionGwy')
+
+def gateway_launch_template(template):
+    """ Returns the launch template data of the Connection Gateways """
+    launch_templates = template.find_resources("AWS::EC2::LaunchTemplate")
+    gateway, = [resource['Properties']['LaunchTemplateData'] for logical_id, resource in launch_templates.items()
+                if logical_id.startswith("ConnectionGwyLaunchTemplate")]
+    return gateway
+
+
+def test_unknown_profile_is_rejected(config_data):
+    config_data['performanceProfile'] = "turbo"
+    with pytest.raises(ValueError, match="unknown profile 'turbo', use one of standard, high-throughput"):
+        PerformanceProfile(config_data, 'connectionGwy')
+
+def test_unknown_placement_group_is_rejected():
+    with pytest.raises(ValueError, match="unknown placementGroup 'cluster', use one of spread, partition"):
+        gateway_profile({"placementGroup": "cluster"})
+
+def test_instance_type_defaults_when_the_profile_has_none():
+    assert gateway_profile({}).instance_type("c7g.large").to_string() == "c7g.large"
+    assert gateway_profile({"instanceType": "c7gn.xlarge"}).instance_type("c7g.large").to_string() == "c7gn.xlarge"
+
+def test_missing_profile_selection_uses_standard(config_data):
+    del config_data['performanceProfile']
+    profile = PerformanceProfile(config_data, 'sessionMgr')
+    assert profile.name == "standard"
+    assert profile.instance_type("m6g.xlarge").to_string() == "m6g.large"
+
+@pytest.mark.parametrize('size, minimum, expected', [(8, 8, 8), (16, 8, 16), (16, 24, 24)])
+def test_block_devices_keep_the_minimum_size(size, minimum, expected):
+    kms_key = kms.Key(cdk.Stack(cdk.App(), "Keys"), "Key")
+    devices = gateway_profile({"volume": {"sizeGiB": size, "iops": 4000}}).block_devices(kms_key, minimum)
+    ebs = devices[0].volume.ebs_device
+    assert (ebs.volume_size, ebs.iops, ebs.throughput) == (expected, 4000, 125)
+
+def test_standard_profile_leaves_the_network_interface_alone(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    gateway = gateway_launch_template(template)
+    assert 'NetworkInterfaces' not in gateway and 'Placement' not in gateway
+    assert gateway['SecurityGroupIds']
+    template.resource_count_is("AWS::EC2::PlacementGroup", 0)
+
+def test_network_optimized_profile_enables_ena_express(config_data, synth_infra):
+    config_data['performanceProfile'] = "network-optimized"
+    template = synth_infra(config_data)
+
+    gateway = gateway_launch_template(template)
+    assert 'SecurityGroupIds' not in gateway
+    interface, = gateway['NetworkInterfaces']
+    assert interface['DeviceIndex'] == 0 and len(interface['Groups']) == 1
+    assert interface['EnaSrdSpecification'] == {"EnaSrdEnabled": True,
+                                                "EnaSrdUdpSpecification": {"EnaSrdUdpEnabled": True}}
+    assert gateway['InstanceType'] == "c7gn.4xlarge"
+    template.has_resource_properties("AWS::EC2::PlacementGroup", {"Strategy": "partition"})
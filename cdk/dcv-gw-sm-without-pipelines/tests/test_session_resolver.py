@@ -0,0 +1,150 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import pytest
+import aws_cdk as cdk
+import aws_cdk.aws_ec2 as ec2
+from aws_cdk.assertions import Match, Template
+from stacks.session_resolver.session_resolver import SessionResolver
+
+
+def synth_resolver(**resolver_config):
+    """ Synthesizes a SessionResolver in a stack of its own and returns its Template """
+    stack = cdk.Stack(cdk.App(), "ResolverStack")
+    vpc = ec2.Vpc(stack, "Vpc", max_azs=2)
+    gateway_security_group = ec2.SecurityGroup(stack, "GatewaySecurityGroup", vpc=vpc)
+    SessionResolver(stack, "SessionResolver",
+                    vpc=vpc,
+                    vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+                    gateway_security_group=gateway_security_group,
+                    resolver_config=resolver_config)
+    return Template.from_stack(stack)
+
+
+def test_function_runs_on_graviton_with_least_privilege():
+    template = synth_resolver()
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Architectures": ["arm64"],
+        "Runtime": "python3.12",
+        "Handler": "resolver.lambda_handler"
+    })
+    template.has_resource_properties("AWS::IAM::Policy", {
+        "PolicyDocument": {
+            "Statement": [{
+                "Action": "ec2:DescribeInstances",
+                "Effect": "Allow",
+                "Resource": "*"
+            }]
+        }
+    })
+
+def test_provisioned_concurrency_is_set_on_the_live_alias():
+    template = synth_resolver(provisionedConcurrency=2)
+
+    template.has_resource_properties("AWS::Lambda::Alias", {
+        "Name": "live",
+        "ProvisionedConcurrencyConfig": {"ProvisionedConcurrentExecutions": 2}
+    })
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Environment": {"Variables": Match.object_like({"PREWARM_CLIENTS": "true"})}
+    })
+
+def test_snap_start_applies_to_published_versions():
+    template = synth_resolver(provisionedConcurrency=0, snapStart=True)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "SnapStart": {"ApplyOn": "PublishedVersions"}
+    })
+    template.has_resource_properties("AWS::Lambda::Alias", {
+        "Name": "live",
+        "ProvisionedConcurrencyConfig": Match.absent()
+    })
+
+def test_provisioned_concurrency_and_snap_start_are_exclusive():
+    with pytest.raises(ValueError, match="provisionedConcurrency or snapStart"):
+        synth_resolver(provisionedConcurrency=1, snapStart=True)
+
+def test_default_endpoint_is_an_internal_load_balancer():
+    template = synth_resolver()
+
+    template.resource_count_is("AWS::Lambda::Url", 0)
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::LoadBalancer", {
+        "Scheme": "internal"
+    })
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "Port": 80,
+        "Protocol": "HTTP"
+    })
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::TargetGroup", {
+        "TargetType": "lambda",
+        "Targets": [{"Id": {"Ref": Match.string_like_regexp("LiveAlias")}}]
+    })
+    # Only the Connection Gateways may reach the load balancer
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "IpProtocol": "tcp",
+        "FromPort": 80,
+        "ToPort": 80,
+        "SourceSecurityGroupId": {"Fn::GetAtt": [Match.string_like_regexp("GatewaySecurityGroup"), "GroupId"]}
+    })
+
+def test_load_balancer_listens_on_https_with_a_certificate():
+    template = synth_resolver(certificateArn="arn:aws:acm:us-east-1:123456789012:certificate/test")
+
+    template.has_resource_properties("AWS::ElasticLoadBalancingV2::Listener", {
+        "Port": 443,
+        "Protocol": "HTTPS"
+    })
+
+def test_function_url_requires_iam_auth():
+    template = synth_resolver(endpoint="functionUrl")
+
+    template.has_resource_properties("AWS::Lambda::Url", {
+        "AuthType": "AWS_IAM",
+        "Qualifier": "live"
+    })
+    template.resource_count_is("AWS::ElasticLoadBalancingV2::LoadBalancer", 0)
+
+def test_unknown_endpoint_is_rejected():
+    with pytest.raises(ValueError, match="unknown endpoint 'apiGateway'"):
+        synth_resolver(endpoint="apiGateway")
+
+def gateway_user_data(template):
+    """ Returns the rendered user data of the Connection Gateway launch template """
+    launch_templates = template.find_resources("AWS::EC2::LaunchTemplate")
+    user_data = [json.dumps(resource["Properties"]["LaunchTemplateData"]["UserData"])
+                 for name, resource in launch_templates.items() if name.startswith("ConnectionGwyLaunchTemplate")]
+    assert len(user_data) == 1
+    return user_data[0]
+
+def test_gateway_calls_the_load_balancer(config_data, synth_infra):
+    config_data['sessionResolver']['enabled'] = True
+    template = synth_infra(config_data)
+
+    user_data = gateway_user_data(template)
+
+    assert 'RESOLVER_URL=\\\"http://' in user_data
+    assert "SessionResolverLoadBalancer" in user_data
+
+def test_gateway_keeps_the_broker_resolver_with_a_function_url(config_data, synth_infra):
+    config_data['sessionResolver']['enabled'] = True
+    config_data['sessionResolver']['endpoint'] = "functionUrl"
+    template = synth_infra(config_data)
+
+    user_data = gateway_user_data(template)
+
+    assert 'RESOLVER_URL=\\\"\\\"' in user_data
+    template.has_resource_properties("AWS::Lambda::Url", {"AuthType": "AWS_IAM"})
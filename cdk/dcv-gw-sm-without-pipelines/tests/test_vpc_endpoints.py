@@ -0,0 +1,129 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of
+# this software and associated documentation files (the "Software"), to deal in
+# the Software without restriction, including without limitation the rights to
+# use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+# the Software, and to permit persons to whom the Software is furnished to do so.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+from aws_cdk.assertions import Match
+
+VPC_ID = "vpc-0123456789abcdef0"
+
+# Subnets of the existing VPC, as config.json and the VPC lookup see them
+SUBNETS = {
+    "publicASubnetId": ("subnet-0a000000000000001", "10.1.0.0/24", "us-east-1a", "rtb-0a000000000000001"),
+    "publicBSubnetId": ("subnet-0b000000000000001", "10.1.1.0/24", "us-east-1b", "rtb-0a000000000000001"),
+    "privateASubnetId": ("subnet-0a000000000000002", "10.1.2.0/24", "us-east-1a", "rtb-0a000000000000002"),
+    "privateBSubnetId": ("subnet-0b000000000000002", "10.1.3.0/24", "us-east-1b", "rtb-0b000000000000002")
+}
+
+def existing_vpc(config_data, route_tables=True):
+    """ Points the configuration at an existing VPC and returns the context answering its lookup """
+    config_data['network']['vpcId'] = VPC_ID
+    for setting, (subnet_id, _, _, _) in SUBNETS.items():
+        config_data['network'][setting] = subnet_id
+    if route_tables:
+        config_data['network']['privateARouteTableId'] = SUBNETS['privateASubnetId'][3]
+        config_data['network']['privateBRouteTableId'] = SUBNETS['privateBSubnetId'][3]
+
+    def subnet_group(name, settings):
+        return {"name": name, "type": name, "subnets": [
+            {"subnetId": subnet_id, "cidr": cidr, "availabilityZone": zone, "routeTableId": route_table}
+            for subnet_id, cidr, zone, route_table in (SUBNETS[setting] for setting in settings)]}
+    return {
+        f"vpc-provider:account={config_data['accountId']}:filter.vpc-id={VPC_ID}:"
+        f"region={config_data['region']}:returnAsymmetricSubnets=true": {
+            "vpcId": VPC_ID,
+            "vpcCidrBlock": "10.1.0.0/16",
+            "ownerAccountId": config_data['accountId'],
+            "availabilityZones": [],
+            "subnetGroups": [subnet_group("Public", ["publicASubnetId", "publicBSubnetId"]),
+                             subnet_group("Private", ["privateASubnetId", "privateBSubnetId"])]
+        }
+    }
+
+
+def test_new_vpc_has_one_nat_gateway_by_default(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    template.resource_count_is("AWS::EC2::VPC", 1)
+    template.resource_count_is("AWS::EC2::NatGateway", 1)
+
+def test_new_vpc_has_a_nat_gateway_per_zone(config_data, synth_infra):
+    config_data['network']['natGatewayPerAz'] = True
+    template = synth_infra(config_data)
+
+    template.resource_count_is("AWS::EC2::NatGateway", 2)
+
+def test_new_vpc_routes_gateway_endpoints_through_the_private_subnets(config_data, synth_infra):
+    template = synth_infra(config_data)
+
+    for service in ("s3", "dynamodb"):
+        template.has_resource_properties("AWS::EC2::VPCEndpoint", {
+            "VpcEndpointType": "Gateway",
+            "ServiceName": {"Fn::Join": ["", ["com.amazonaws.", {"Ref": "AWS::Region"}, f".{service}"]]},
+            "RouteTableIds": [{"Ref": Match.string_like_regexp("VPCprivatesubnetSubnet1RouteTable")},
+                              {"Ref": Match.string_like_regexp("VPCprivatesubnetSubnet2RouteTable")}]
+        })
+    template.resource_properties_count_is("AWS::EC2::VPCEndpoint", {"VpcEndpointType": "Interface"}, 0)
+
+def test_interface_endpoints_accept_https_from_the_vpc(config_data, synth_infra):
+    config_data['network']['endpoints']['interface'] = ["ssm", "sts"]
+    template = synth_infra(config_data)
+
+    template.resource_properties_count_is("AWS::EC2::VPCEndpoint", {
+        "VpcEndpointType": "Interface",
+        "PrivateDnsEnabled": True,
+        "SubnetIds": [{"Ref": Match.string_like_regexp("VPCprivatesubnetSubnet1Subnet")},
+                      {"Ref": Match.string_like_regexp("VPCprivatesubnetSubnet2Subnet")}]
+    }, 2)
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "IpProtocol": "tcp",
+        "FromPort": 443,
+        "ToPort": 443,
+        "CidrIp": {"Fn::GetAtt": [Match.string_like_regexp("VPC"), "CidrBlock"]},
+        "GroupId": {"Fn::GetAtt": [Match.string_like_regexp("VpcEndpointsSecurityGroup"), "GroupId"]}
+    })
+
+def test_existing_vpc_uses_the_configured_subnets_and_route_tables(config_data, synth_infra):
+    context = existing_vpc(config_data)
+    config_data['network']['endpoints']['interface'] = ["ssm"]
+    template = synth_infra(config_data, context)
+
+    template.resource_count_is("AWS::EC2::VPC", 0)
+    template.resource_count_is("AWS::EC2::NatGateway", 0)
+    template.resource_properties_count_is("AWS::EC2::VPCEndpoint", {
+        "VpcEndpointType": "Gateway",
+        "VpcId": VPC_ID,
+        "RouteTableIds": [SUBNETS['privateASubnetId'][3], SUBNETS['privateBSubnetId'][3]]
+    }, 2)
+    template.has_resource_properties("AWS::EC2::VPCEndpoint", {
+        "VpcEndpointType": "Interface",
+        "VpcId": VPC_ID,
+        "SubnetIds": [SUBNETS['privateASubnetId'][0], SUBNETS['privateBSubnetId'][0]]
+    })
+    template.has_resource_properties("AWS::EC2::SecurityGroupIngress", {
+        "FromPort": 443,
+        "CidrIp": "10.1.0.0/16"
+    })
+
+def test_existing_vpc_without_route_tables_skips_gateway_endpoints(config_data, synth_infra):
+    context = existing_vpc(config_data, route_tables=False)
+    template = synth_infra(config_data, context)
+
+    template.resource_count_is("AWS::EC2::VPCEndpoint", 0)
+
+def test_unknown_endpoint_is_rejected(config_data, synth_infra):
+    config_data['network']['endpoints']['interface'] = ["sqs"]
+
+    with pytest.raises(ValueError, match="unknown interface endpoint 'sqs'"):
+        synth_infra(config_data)
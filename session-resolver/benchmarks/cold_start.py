@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Checks the resolver cold-start import time and worst-case resolve latency budgets
+
+The import time is measured in fresh interpreters. The worst case is measured
+against a local EC2 endpoint that accepts connections and never answers, so
+every attempt runs into the read timeout from clients.py. Exits non-zero when
+a budget is exceeded, so it can gate a release.
+
+    python benchmarks/cold_start.py --import-budget-ms 100
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from common import RESOLVER_DIR, setup_environment
+
+setup_environment(CACHE_MAX_SIZE=0)
+
+
+def import_time_ms(runs):
+    """ Returns the median time to import the resolver module in a fresh interpreter """
+    probe = "import time; start = time.perf_counter(); import resolver; print(time.perf_counter() - start)"
+    samples = [float(subprocess.run([sys.executable, '-c', probe], cwd=RESOLVER_DIR, check=True,
+                                    capture_output=True, text=True).stdout) * 1000
+               for _ in range(runs)]
+    return statistics.median(samples)
+
+def start_unresponsive_endpoint():
+    """ Listens on a local port, accepting connections but never sending a byte """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(64)
+    connections = []
+    def accept():
+        while True:
+            connection, _ = listener.accept()
+            connections.append(connection)
+    threading.Thread(target=accept, daemon=True).start()
+    return f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--import-budget-ms', type=float, default=100.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--slack-ms', type=float, default=500.0,
+                        help="allowance over the configured timeouts for retry backoff")
+    args = parser.parse_args()
+
+    import clients
+    import resolver
+
+    import_ms = import_time_ms(args.runs)
+    resolver.ec2.configure(endpoint_url=start_unresponsive_endpoint())
+    start = time.perf_counter()
+    response = resolver.resolve_session('i-0123456789abcdef0', 'HTTP')
+    worst_case_ms = (time.perf_counter() - start) * 1000
+    worst_case_budget_ms = clients.worst_case_seconds() * 1000 + args.slack_ms
+
+    failures = 0
+    for name, value, budget in [('import time', import_ms, args.import_budget_ms),
+                                ('worst-case resolve', worst_case_ms, worst_case_budget_ms)]:
+        ok = value <= budget
+        failures += not ok
+        print(f"{name:<20}{value:>10.1f} ms   budget {budget:>8.1f} ms   {'ok' if ok else 'OVER BUDGET'}")
+    print(f"slow endpoint response: {response['statusCode']} {response['body']}")
+    if response['statusCode'] != 503:
+        failures += 1
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Helpers shared by the resolver benchmarks """
+
+import os
+import random
+import sys
+import time
+
+RESOLVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def setup_environment(**overrides):
+    """ Points boto3 at fake credentials and makes the resolver modules importable
+
+    Must run before the resolver is imported, it reads its configuration at import time.
+    """
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('METRICS_ENABLED', 'false')
+    os.environ.update({name: str(value) for name, value in overrides.items()})
+    if RESOLVER_DIR not in sys.path:
+        sys.path.insert(0, RESOLVER_DIR)
+
+def percentile(samples, pct):
+    """ Returns the pct percentile of an already sorted list of samples """
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+def peak_rate(timestamps, window=1.0):
+    """ Returns the largest number of timestamps falling in any window of the given seconds """
+    timestamps = sorted(timestamps)
+    peak = start = 0
+    for end, timestamp in enumerate(timestamps):
+        while timestamp - timestamps[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+def inject_latency(client, event_name, seconds, jitter_seconds=0.0):
+    """ Delays every matching API call of a client by the given number of seconds
+
+    Hooks before-parameter-build because stubbing handlers answer on before-call
+    and stop any handler registered after them.
+    """
+    def delay(**kwargs):
+        time.sleep(seconds + random.uniform(0, jitter_seconds))
+    client.meta.events.register(f"before-parameter-build.{event_name}", delay)
+    return delay
+
+def count_calls(client, event_name):
+    """ Returns a list that grows by one entry for every matching API call of a client """
+    calls = []
+    def count(**kwargs):
+        calls.append(time.perf_counter())
+    client.meta.events.register(f"before-parameter-build.{event_name}", count)
+    return calls
+
+
+class StubEc2:
+    """ Answers DescribeInstances from a dict, in place of the EC2 API
+
+    Registered on before-call, it short-circuits the HTTP request the way
+    botocore's Stubber does, but is thread-safe and not order dependent. An
+    optional rate limiter emulates the account's EC2 request limit, calls over
+    it fail with RequestLimitExceeded.
+    """
+
+    def __init__(self, endpoints, limiter=None):
+        self.endpoints = endpoints
+        self.limiter = limiter
+        self.throttled = 0
+
+    def __call__(self, params, **kwargs):
+        from botocore.awsrequest import AWSResponse
+        if self.limiter is not None and not self.limiter.acquire():
+            self.throttled += 1
+            return AWSResponse(None, 503, {}, None), {
+                'Error': {'Code': 'RequestLimitExceeded', 'Message': "Request limit exceeded."},
+                'ResponseMetadata': {'HTTPStatusCode': 503}
+            }
+        instance_ids = [value for name, value in params['body'].items()
+                        if name.startswith('InstanceId.')]
+        missing = [instance_id for instance_id in instance_ids if instance_id not in self.endpoints]
+        if missing:
+            return AWSResponse(None, 400, {}, None), {
+                'Error': {'Code': 'InvalidInstanceID.NotFound',
+                          'Message': f"The instance ID '{missing[0]}' does not exist"},
+                'ResponseMetadata': {'HTTPStatusCode': 400}
+            }
+        return AWSResponse(None, 200, {}, None), {
+            'Reservations': [{'Instances': [{
+                'InstanceId': instance_id,
+                'PrivateIpAddress': self.endpoints[instance_id],
+                'State': {'Name': 'running'}
+            }]} for instance_id in instance_ids],
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
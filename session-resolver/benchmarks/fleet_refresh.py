@@ -0,0 +1,93 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Measures refresh time, memory footprint and lookup cost of the fleet index
+
+DescribeInstances pages for a synthetic fleet are served by a botocore Stubber,
+with an optional latency per page to account for the EC2 API round trip.
+
+    pip install -r requirements-dev.txt
+    python benchmarks/fleet_refresh.py --instances 10000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from common import inject_latency, setup_environment
+
+setup_environment()
+
+import boto3
+from botocore.stub import ANY, Stubber
+
+from fleet_index import FleetIndex, fleet_filters
+
+
+def synthetic_pages(instances, page_size):
+    """ Returns DescribeInstances responses describing a fleet of the given size """
+    pages = []
+    for offset in range(0, instances, page_size):
+        reservations = [{
+            'ReservationId': f"r-{number:017x}",
+            'Instances': [{
+                'InstanceId': f"i-{number:017x}",
+                'PrivateIpAddress': f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}",
+                'State': {'Code': 16, 'Name': 'running'},
+                'InstanceType': 'g5.xlarge',
+                'Tags': [{'Key': 'dcv:fleet', 'Value': 'benchmark'}]
+            }]
+        } for number in range(offset, min(offset + page_size, instances))]
+        page = {'Reservations': reservations}
+        if offset + page_size < instances:
+            page['NextToken'] = str(offset + page_size)
+        pages.append(page)
+    return pages
+
+def stubbed_refresh(index, pages, page_latency):
+    """ Runs one refresh of the index with the pages queued on a stubber """
+    stubber = Stubber(index.ec2)
+    for page in pages:
+        stubber.add_response('describe_instances', page, {'Filters': ANY, 'MaxResults': ANY,
+                                                          **({'NextToken': ANY} if page is not pages[0] else {})})
+    if page_latency:
+        inject_latency(index.ec2, 'ec2.DescribeInstances', page_latency)
+    with stubber:
+        index.refresh()
+        stubber.assert_no_pending_responses()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=10000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--page-latency-ms', type=float, default=0.0)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.instances, args.page_size)
+    index = FleetIndex(boto3.client('ec2'), fleet_filters(tag='dcv:fleet=benchmark'),
+                       page_size=args.page_size)
+
+    stubbed_refresh(index, pages, args.page_latency_ms / 1000)
+    # The mapping plus the ID and IP strings it keeps alive once the pages are gone
+    endpoints = index._endpoints
+    index_bytes = sys.getsizeof(endpoints) + sum(
+        sys.getsizeof(instance_id) + sys.getsizeof(ip) for instance_id, ip in endpoints.items())
+
+    instance_ids = [f"i-{number:017x}" for number in range(args.instances)]
+    start = time.perf_counter()
+    for instance_id in random.choices(instance_ids, k=args.lookups):
+        index.get(instance_id)
+    lookup_seconds = time.perf_counter() - start
+
+    print(f"instances:         {len(index)}")
+    print(f"pages:             {len(pages)}")
+    print(f"refresh time:      {index.last_refresh_seconds * 1000:.1f} ms")
+    print(f"index memory:      {index_bytes / 1024:.1f} KiB "
+          f"({index_bytes / max(len(index), 1):.0f} bytes per instance)")
+    print(f"lookup:            {lookup_seconds / args.lookups * 1e6:.3f} us")
+
+
+if __name__ == '__main__':
+    main()
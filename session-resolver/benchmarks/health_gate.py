@@ -0,0 +1,89 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Measures how fast health-gated resolution answers for live and dead DCV servers
+
+Three cached endpoints are resolved with HEALTH_CHECKS enabled. One points to a
+local listening socket, one to a closed local port and one to an address that
+does not answer, by default from the TEST-NET-1 documentation range. The script
+reports the first resolve, which probes the endpoint, and the cached resolves
+that follow, next to the time a gateway would spend connecting to the same
+endpoint without the health gate.
+
+    python benchmarks/health_gate.py --requests 1000 --gateway-timeout 5
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+from common import percentile, setup_environment
+
+setup_environment(HEALTH_CHECKS='true')
+
+
+def start_listener():
+    """ Listens on a local port and accepts connections, like a running DCV server """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(64)
+    def accept():
+        while True:
+            connection, _ = listener.accept()
+            connection.close()
+    threading.Thread(target=accept, daemon=True).start()
+    return listener.getsockname()[1]
+
+def closed_port():
+    """ Returns a local port nothing listens on, like a stopped DCV server """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+def connect_ms(host, port, timeout):
+    """ Returns how long a plain connection attempt takes to succeed or fail """
+    start = time.perf_counter()
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+    except OSError:
+        pass
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--dead-host', default='192.0.2.1', help="address that drops connections")
+    parser.add_argument('--gateway-timeout', type=float, default=5.0,
+                        help="connect timeout of a gateway without the health gate")
+    args = parser.parse_args()
+
+    import resolver
+
+    endpoints = {
+        'running': ('127.0.0.1', start_listener()),
+        'stopped': ('127.0.0.1', closed_port()),
+        'unreachable': (args.dead_host, 8443)
+    }
+    print(f"{'server':<13}{'status':>7}{'first ms':>10}{'cached p50 ms':>15}{'cached p99 ms':>15}{'gateway ms':>12}")
+    for number, (name, (host, port)) in enumerate(endpoints.items()):
+        instance_id = f"i-{number:017x}"
+        resolver.endpoint_cache.put(instance_id, {'PrivateIpAddress': host, 'TcpPort': port, 'UdpPort': port})
+        start = time.perf_counter()
+        response = resolver.resolve_session(instance_id, 'HTTP')
+        first_ms = (time.perf_counter() - start) * 1000
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            resolver.resolve_session(instance_id, 'HTTP')
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"{name:<13}{response['statusCode']:>7}{first_ms:>10.2f}{percentile(latencies, 50):>15.3f}"
+              f"{percentile(latencies, 99):>15.3f}{connect_ms(host, port, args.gateway_timeout):>12.1f}")
+    print(f"health checker: {resolver.health_checker.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Compares resolver latency between the DynamoDB index and the DescribeInstances path
+
+EC2 and DynamoDB are emulated in-process with moto. Because moto answers in
+microseconds, a configurable service latency is injected in front of every
+DescribeInstances and GetItem call so the numbers resemble a real account.
+
+    pip install -r requirements-dev.txt
+    python benchmarks/index_vs_ec2.py --instances 200 --requests 2000
+"""
+
+import argparse
+import os
+import random
+import time
+
+from common import inject_latency, percentile, setup_environment
+
+# The resolver reads its configuration at import time
+setup_environment(INDEX_TABLE_NAME='dcv-session-index-benchmark', CACHE_MAX_SIZE=0)
+
+import boto3
+from moto import mock_aws
+
+
+def run(resolver, session_ids, requests):
+    """ Resolves random session IDs and returns the sorted latencies in milliseconds """
+    latencies = []
+    for _ in range(requests):
+        event = {'queryStringParameters': {'sessionId': random.choice(session_ids), 'transport': 'HTTP'}}
+        start = time.perf_counter()
+        response = resolver.lambda_handler(event, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response['statusCode'] == 200, response
+    return sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--ec2-latency-ms', type=float, default=40.0)
+    parser.add_argument('--dynamodb-latency-ms', type=float, default=4.0)
+    args = parser.parse_args()
+
+    with mock_aws():
+        ec2 = boto3.client('ec2')
+        dynamodb = boto3.client('dynamodb')
+        dynamodb.create_table(TableName=os.environ['INDEX_TABLE_NAME'],
+                              KeySchema=[{'AttributeName': 'SessionId', 'KeyType': 'HASH'}],
+                              AttributeDefinitions=[{'AttributeName': 'SessionId', 'AttributeType': 'S'}],
+                              BillingMode='PAY_PER_REQUEST')
+        image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+        instances = ec2.run_instances(ImageId=image_id, MinCount=args.instances,
+                                      MaxCount=args.instances)['Instances']
+
+        import indexer
+        import resolver
+        for instance in ec2.describe_instances()['Reservations'][0]['Instances']:
+            indexer.index_instance(instance)
+
+        inject_latency(resolver.ec2, 'ec2.DescribeInstances', args.ec2_latency_ms / 1000)
+        inject_latency(resolver.dynamodb, 'dynamodb.GetItem', args.dynamodb_latency_ms / 1000)
+        session_ids = [instance['InstanceId'] for instance in instances]
+
+        results = {}
+        results['index'] = run(resolver, session_ids, args.requests)
+        index_client, resolver.dynamodb = resolver.dynamodb, None
+        results['describe_instances'] = run(resolver, session_ids, args.requests)
+        resolver.dynamodb = index_client
+
+    print(f"{'path':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path, latencies in results.items():
+        print(f"{path:<20}"
+              f"{percentile(latencies, 50):>10.2f}"
+              f"{percentile(latencies, 95):>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}"
+              f"{latencies[-1]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Load tests the resolver Lambda handler with realistic gateway request mixes
+
+Requests mix HTTP and QUIC transports, valid and invalid session IDs, and a
+small set of hot instances among a larger cold fleet. EC2 is replaced by an
+in-process stub with configurable latency (or by moto), so runs are repeatable
+on a laptop. The report covers throughput, latency percentiles and EC2 calls
+per request. Save a run with --save and compare later builds with --compare.
+
+--ec2-rate-limit and --ec2-burst set the resolver's EC2 call budget, and the
+run fails when more calls than the budget allows are made in any second.
+tests/test_throttling.py asserts the same budget.
+--ec2-throttle-rate makes the stub answer RequestLimitExceeded above that rate
+to exercise the circuit breaker and the last known good endpoints.
+
+    python benchmarks/load_test.py --requests 20000 --ec2-latency-ms 40 --save baseline.json
+    python benchmarks/load_test.py --requests 20000 --ec2-latency-ms 40 --compare baseline.json
+    python benchmarks/load_test.py --threads 16 --hot-ratio 0.2 --cache-ttl 1 --ec2-rate-limit 10 --ec2-throttle-rate 5
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import random
+import sys
+import threading
+import time
+
+from common import StubEc2, count_calls, inject_latency, peak_rate, percentile, setup_environment
+
+# Regression thresholds used by --compare, relative to the baseline
+COMPARED_METRICS = {
+    'throughput': 'higher',
+    'p50Ms': 'lower',
+    'p99Ms': 'lower',
+    'ec2CallsPerRequest': 'lower'
+}
+
+
+def request_mix(args, instance_ids, rng):
+    """ Builds the list of gateway events to replay """
+    hot_ids = instance_ids[:args.hot_keys]
+    events = []
+    for number in range(args.requests):
+        draw = rng.random()
+        if draw < args.invalid_ratio:
+            # Mostly distinct unknown IDs, like typos and long terminated instances
+            session_id = f"i-{rng.randrange(16 ** 17):017x}"
+        elif hot_ids and draw < args.invalid_ratio + (1 - args.invalid_ratio) * args.hot_ratio:
+            session_id = rng.choice(hot_ids)
+        else:
+            session_id = rng.choice(instance_ids)
+        events.append({'queryStringParameters': {
+            'sessionId': session_id,
+            'transport': 'QUIC' if rng.random() < args.quic_ratio else 'HTTP',
+            'clientIpAddress': f"198.51.100.{number % 250}"
+        }})
+    return events
+
+def run(resolver, events, threads):
+    """ Sends the events through the Lambda handler and returns latencies and status codes """
+    latencies = []
+    statuses = collections.Counter()
+    lock = threading.Lock()
+    def invoke(event):
+        start = time.perf_counter()
+        response = resolver.lambda_handler(event, None)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[response['statusCode']] += 1
+
+    start = time.perf_counter()
+    if threads <= 1:
+        for event in events:
+            invoke(event)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(invoke, events))
+    return sorted(latencies), statuses, time.perf_counter() - start
+
+def compare(results, baseline_path, tolerance):
+    """ Prints the change against a saved run, returns False when a metric regressed """
+    with open(baseline_path, 'r', encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    ok = True
+    print(f"\n{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric, better in COMPARED_METRICS.items():
+        before, after = baseline[metric], results[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        regressed = change < -tolerance if better == 'higher' else change > tolerance
+        ok = ok and not regressed
+        print(f"{metric:<22}{before:>12.3f}{after:>12.3f}{change:>9.1f}%"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--instances', type=int, default=1000, help="size of the fleet")
+    parser.add_argument('--hot-keys', type=int, default=20, help="instances receiving most requests")
+    parser.add_argument('--hot-ratio', type=float, default=0.8, help="share of valid requests to hot keys")
+    parser.add_argument('--invalid-ratio', type=float, default=0.02)
+    parser.add_argument('--quic-ratio', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=1,
+                        help="concurrent callers, 1 behaves like a single Lambda container")
+    parser.add_argument('--ec2-latency-ms', type=float, default=40.0)
+    parser.add_argument('--ec2-rate-limit', type=float, default=0.0,
+                        help="resolver EC2 calls per second, 0 leaves the limit off")
+    parser.add_argument('--ec2-burst', type=int, default=20, help="resolver EC2 call burst")
+    parser.add_argument('--ec2-throttle-rate', type=float, default=0.0,
+                        help="EC2 calls per second the stub accepts before throttling, 0 never throttles")
+    parser.add_argument('--backend', choices=['stub', 'moto'], default='stub')
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--cache-ttl', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare the results with a saved JSON file")
+    parser.add_argument('--tolerance', type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    setup_environment(CACHE_MAX_SIZE=args.cache_size, CACHE_TTL_SECONDS=args.cache_ttl,
+                      EC2_RATE_LIMIT=args.ec2_rate_limit, EC2_BURST=args.ec2_burst)
+    rng = random.Random(args.seed)
+
+    mock = None
+    if args.backend == 'moto':
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+
+    import boto3
+    import resolver
+    from throttling import TokenBucket
+
+    if args.backend == 'moto':
+        ec2 = boto3.client('ec2')
+        image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+        instance_ids = [instance['InstanceId'] for instance in
+                        ec2.run_instances(ImageId=image_id, MinCount=args.instances,
+                                          MaxCount=args.instances)['Instances']]
+    else:
+        instance_ids = [f"i-{number:017x}" for number in range(args.instances)]
+        endpoints = {instance_id: f"10.0.{number >> 8 & 255}.{number & 255}"
+                     for number, instance_id in enumerate(instance_ids)}
+        limiter = None
+        if args.ec2_throttle_rate:
+            limiter = TokenBucket(args.ec2_throttle_rate, args.ec2_throttle_rate)
+        resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances',
+                                          StubEc2(endpoints, limiter=limiter))
+
+    ec2_calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    if args.ec2_latency_ms:
+        inject_latency(resolver.ec2, 'ec2.DescribeInstances', args.ec2_latency_ms / 1000)
+
+    events = request_mix(args, instance_ids, rng)
+    latencies, statuses, elapsed = run(resolver, events, args.threads)
+    if mock is not None:
+        mock.stop()
+
+    results = {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50Ms': percentile(latencies, 50),
+        'p90Ms': percentile(latencies, 90),
+        'p99Ms': percentile(latencies, 99),
+        'maxMs': latencies[-1],
+        'ec2CallsPerRequest': len(ec2_calls) / len(latencies),
+        'ec2PeakCallsPerSecond': peak_rate(ec2_calls),
+        'statusCodes': {str(status): count for status, count in sorted(statuses.items())},
+        'cache': resolver.endpoint_cache.stats(),
+        'inflight': resolver.inflight_lookups.stats(),
+        'rateLimiter': resolver.ec2_rate_limiter.stats(),
+        'breaker': resolver.ec2_breaker.stats(),
+        'lastKnownGoodServed': resolver.last_known_good.stats()['hits']
+    }
+
+    print(f"requests:              {results['requests']}")
+    print(f"throughput:            {results['throughput']:.1f} req/s")
+    print(f"latency p50/p90/p99:   {results['p50Ms']:.3f} / {results['p90Ms']:.3f} / "
+          f"{results['p99Ms']:.3f} ms (max {results['maxMs']:.3f} ms)")
+    print(f"EC2 calls per request: {results['ec2CallsPerRequest']:.4f}")
+    print(f"status codes:          {results['statusCodes']}")
+    print(f"cache:                 {results['cache']}")
+    print(f"in-flight coalescing:  {results['inflight']}")
+    print(f"rate limiter:          {results['rateLimiter']}")
+    print(f"circuit breaker:       {results['breaker']}")
+    print(f"last known good:       {results['lastKnownGoodServed']} served")
+
+    # The bucket allows its burst on top of one second of refill
+    within_budget = True
+    if args.ec2_rate_limit:
+        budget = args.ec2_burst + args.ec2_rate_limit
+        within_budget = results['ec2PeakCallsPerSecond'] <= budget
+        print(f"EC2 peak calls in 1 s: {results['ec2PeakCallsPerSecond']} "
+              f"(budget {budget:g}, {'ok' if within_budget else 'OVER BUDGET'})")
+    else:
+        print(f"EC2 peak calls in 1 s: {results['ec2PeakCallsPerSecond']}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+    if not within_budget or (args.compare and not compare(results, args.compare, args.tolerance)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
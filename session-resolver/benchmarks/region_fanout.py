@@ -0,0 +1,71 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Compares multi-region fan-out lookup latency with a single-region lookup
+
+Each region answers DescribeInstances from an in-process stub after a random
+latency. Instances are spread evenly across the regions. For every region
+count the script reports the latency of a first lookup, which fans out to all
+regions, of a repeat lookup, which goes straight to the owning region, and of
+an unknown instance ID, which has to wait for every region.
+
+    python benchmarks/region_fanout.py --regions 1,2,4,8 --latency-ms 30 --jitter-ms 30
+"""
+
+import argparse
+import time
+
+from common import StubEc2, inject_latency, percentile, setup_environment
+
+setup_environment()
+
+REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1', 'eu-central-1',
+           'ap-southeast-2', 'ap-northeast-1', 'sa-east-1', 'ca-central-1']
+
+
+def measure(fanout, instance_ids):
+    """ Returns the sorted lookup latencies in milliseconds """
+    latencies = []
+    for instance_id in instance_ids:
+        start = time.perf_counter()
+        try:
+            fanout.describe_instance(instance_id)
+        except Exception:
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', default='1,2,4,8', help="comma-separated region counts to compare")
+    parser.add_argument('--instances', type=int, default=200, help="instances looked up per region count")
+    parser.add_argument('--latency-ms', type=float, default=30.0, help="minimum DescribeInstances latency")
+    parser.add_argument('--jitter-ms', type=float, default=30.0, help="random latency added on top")
+    args = parser.parse_args()
+
+    from clients import LazyClient
+    from regions import RegionFanout
+
+    print(f"{'regions':>8}{'path':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for count in [int(value) for value in args.regions.split(',')]:
+        regions = REGIONS[:count]
+        targets = []
+        instance_ids = []
+        for number, region in enumerate(regions):
+            ids = [f"i-{number:02x}{index:015x}" for index in range(args.instances // count)]
+            instance_ids.extend(ids)
+            client = LazyClient('ec2', region_name=region)
+            client.meta.events.register('before-call.ec2.DescribeInstances',
+                                        StubEc2({instance_id: '10.0.0.1' for instance_id in ids}))
+            inject_latency(client, 'ec2.DescribeInstances', args.latency_ms / 1000, args.jitter_ms / 1000)
+            targets.append((region, client))
+        fanout = RegionFanout(targets, max_workers=count * 4)
+
+        for path, ids in [('fan-out', instance_ids), ('owner', instance_ids),
+                          ('unknown', [f"i-ff{index:015x}" for index in range(len(instance_ids) // 4)])]:
+            latencies = measure(fanout, ids)
+            print(f"{count:>8}{path:>10}{percentile(latencies, 50):>10.1f}{percentile(latencies, 99):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
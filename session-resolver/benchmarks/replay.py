@@ -0,0 +1,216 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Replays a recorded resolver trace against the Lambda handler or the standalone server
+
+Reads the records written with TRACE_ENABLED, from trace files or captured
+logs, and sends the requests with their recorded spacing, or --speed times
+faster. Every hashed session ID becomes a synthetic instance ID. The stubbed
+EC2 knows the ones that were resolved in the trace and not the others, so the
+replay keeps the production mix of hot sessions, cold sessions and unknown
+IDs. Point --resolver-dir at the session-resolver folder of another checkout
+to compare resolver builds on the same traffic.
+
+    python benchmarks/replay.py monday.trace --speed 10 --save baseline.json
+    python benchmarks/replay.py monday.trace --speed 10 --resolver-dir ../next/session-resolver \\
+        --compare baseline.json
+    python benchmarks/replay.py monday.trace --target server --connections 32
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import threading
+import time
+
+from common import StubEc2, count_calls, inject_latency, peak_rate, percentile, setup_environment
+from load_test import compare
+
+
+def load_requests(paths):
+    """ Returns the (offset seconds, session ID, transport) of the recorded requests and the known IDs """
+    from tracing import read_trace
+    records = sorted(read_trace(paths), key=lambda record: record['ts'])
+    if not records:
+        sys.exit("No trace records found")
+    first = records[0]['ts']
+    requests = []
+    known = set()
+    for record in records:
+        session_id = None
+        if record['session'] is not None:
+            session_id = f"i-0{record['session']}"
+            # A 503 does not tell whether EC2 knew the instance, only a resolved ID is known
+            if record['outcome'] == 200:
+                known.add(session_id)
+        requests.append(((record['ts'] - first) / 1000, session_id, record['transport']))
+    return requests, known
+
+def replay_lambda(resolver, requests, speed, threads):
+    """ Invokes the Lambda handler at the recorded times, returns latencies, lags and status codes """
+    latencies = []
+    lags = []
+    statuses = collections.Counter()
+    lock = threading.Lock()
+    def invoke(scheduled, session_id, transport):
+        start = time.perf_counter()
+        params = {'transport': transport}
+        if session_id is not None:
+            params['sessionId'] = session_id
+        response = resolver.lambda_handler({'queryStringParameters': params}, None)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            lags.append((start - scheduled) * 1000)
+            statuses[response['statusCode']] += 1
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        for offset, session_id, transport in requests:
+            scheduled = start + offset / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(invoke, scheduled, session_id, transport)
+    return latencies, lags, statuses, time.perf_counter() - start
+
+async def send_request(reader, writer, session_id, transport):
+    """ Sends one resolve request on a keep-alive connection, returns the status code """
+    query = f"transport={transport}"
+    if session_id is not None:
+        query += f"&sessionId={session_id}"
+    writer.write(f"POST /resolveSession?{query} HTTP/1.1\r\n"
+                 f"Host: resolver\r\nContent-Length: 0\r\n\r\n".encode('latin-1'))
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while (line := await reader.readline()) != b'\r\n':
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            content_length = int(value)
+    await reader.readexactly(content_length)
+    return status
+
+async def replay_server(host, port, requests, speed, connection_count):
+    """ Sends the requests to a resolver server at the recorded times over keep-alive connections """
+    connections = asyncio.Queue()
+    for _ in range(connection_count):
+        connections.put_nowait(await asyncio.open_connection(host, port))
+    latencies = []
+    lags = []
+    statuses = collections.Counter()
+    async def timed(scheduled, session_id, transport):
+        # Waiting for a free connection counts as lag, like a busy gateway
+        reader, writer = await connections.get()
+        start = time.perf_counter()
+        try:
+            status = await send_request(reader, writer, session_id, transport)
+        finally:
+            connections.put_nowait((reader, writer))
+        latencies.append((time.perf_counter() - start) * 1000)
+        lags.append((start - scheduled) * 1000)
+        statuses[status] += 1
+
+    tasks = []
+    start = time.perf_counter()
+    for offset, session_id, transport in requests:
+        scheduled = start + offset / speed
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(scheduled, session_id, transport)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    while not connections.empty():
+        connections.get_nowait()[1].close()
+    return latencies, lags, statuses, elapsed
+
+def start_server(port, workers):
+    """ Runs the resolver server of the loaded build on its own event loop thread """
+    import server
+    def run():
+        asyncio.run(server.serve('127.0.0.1', port, workers))
+    threading.Thread(target=run, daemon=True).start()
+    time.sleep(0.5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('traces', nargs='+', help="trace files or captured logs")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed, 10 replays 10x faster")
+    parser.add_argument('--target', choices=['lambda', 'server'], default='lambda')
+    parser.add_argument('--resolver-dir', help="session-resolver folder of the build to replay against")
+    parser.add_argument('--threads', type=int, default=64, help="concurrent Lambda handler calls")
+    parser.add_argument('--workers', type=int, default=32, help="server lookup threads")
+    parser.add_argument('--connections', type=int, default=16, help="gateway connections to the server")
+    parser.add_argument('--port', type=int, default=18448)
+    parser.add_argument('--ec2-latency-ms', type=float, default=40.0)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare the results with a saved JSON file")
+    parser.add_argument('--tolerance', type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    setup_environment()
+    # The build under test must not add its own trace records to the replay
+    os.environ['TRACE_ENABLED'] = 'false'
+    if args.resolver_dir:
+        sys.path.insert(0, os.path.abspath(args.resolver_dir))
+
+    requests, known = load_requests(args.traces)
+    import resolver
+
+    endpoints = {session_id: f"10.0.{number >> 8 & 255}.{number & 255}"
+                 for number, session_id in enumerate(sorted(known))}
+    if args.target == 'server':
+        # The server reconfigures the EC2 client on start, stub it afterwards
+        start_server(args.port, args.workers)
+    resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances', StubEc2(endpoints))
+    ec2_calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    if args.ec2_latency_ms:
+        inject_latency(resolver.ec2, 'ec2.DescribeInstances', args.ec2_latency_ms / 1000)
+
+    print(f"replaying {len(requests)} requests recorded over {requests[-1][0]:.1f} s "
+          f"at {args.speed:g}x against {args.target} from {os.path.dirname(os.path.abspath(resolver.__file__))}")
+    if args.target == 'server':
+        latencies, lags, statuses, elapsed = asyncio.run(
+            replay_server('127.0.0.1', args.port, requests, args.speed, args.connections))
+    else:
+        latencies, lags, statuses, elapsed = replay_lambda(resolver, requests, args.speed, args.threads)
+    latencies.sort()
+    lags.sort()
+
+    results = {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50Ms': percentile(latencies, 50),
+        'p90Ms': percentile(latencies, 90),
+        'p99Ms': percentile(latencies, 99),
+        'maxMs': latencies[-1],
+        'lagP99Ms': percentile(lags, 99),
+        'ec2CallsPerRequest': len(ec2_calls) / len(latencies),
+        'ec2PeakCallsPerSecond': peak_rate(ec2_calls),
+        'statusCodes': {str(status): count for status, count in sorted(statuses.items())},
+        'cache': resolver.endpoint_cache.stats()
+    }
+
+    print(f"throughput:            {results['throughput']:.1f} req/s")
+    print(f"latency p50/p90/p99:   {results['p50Ms']:.3f} / {results['p90Ms']:.3f} / "
+          f"{results['p99Ms']:.3f} ms (max {results['maxMs']:.3f} ms)")
+    # A high lag means the replay could not keep up and the load is lower than recorded
+    print(f"dispatch lag p99:      {results['lagP99Ms']:.3f} ms")
+    print(f"EC2 calls per request: {results['ec2CallsPerRequest']:.4f} "
+          f"(peak {results['ec2PeakCallsPerSecond']} in 1 s)")
+    print(f"status codes:          {results['statusCodes']}")
+    print(f"cache:                 {results['cache']}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as results_file:
+            json.dump(results, results_file, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
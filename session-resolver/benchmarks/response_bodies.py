@@ -0,0 +1,97 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Measures the CPU time per request saved by precomputed response bodies
+
+Every request is a cache hit, which is the resolver's hot path. The baseline
+builds and serializes the body on every request, as the resolver did before
+bodies were kept with the cached endpoints. Lambda mode runs the whole
+lambda_handler, standalone mode runs resolve_session and the HTTP response
+serialization of server.py.
+
+    python benchmarks/response_bodies.py --requests 200000
+"""
+
+import argparse
+import json
+import time
+
+from common import setup_environment
+
+setup_environment()
+
+
+class FreshBodies:
+    """ Builds the body of the requested transport on every access """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def __getitem__(self, transport):
+        session_details = {
+            'SessionId': self.endpoint.get('SessionId', "console"),
+            'DcvServerEndpoint': self.endpoint['PrivateIpAddress'],
+            'Port': self.endpoint['TcpPort'] if transport == 'HTTP' else self.endpoint['UdpPort'],
+            'WebUrlPath': self.endpoint.get('WebUrlPath', '/'),
+            'TransportProtocol': transport
+        }
+        return json.dumps(session_details)
+
+
+class NullWriter:
+    """ Stands in for an asyncio StreamWriter """
+
+    def write(self, data):
+        pass
+
+
+def cpu_per_request_us(function, events):
+    """ Returns the process CPU time per call of function in microseconds """
+    start = time.process_time()
+    for event in events:
+        function(event)
+    return (time.process_time() - start) / len(events) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--instances', type=int, default=100)
+    args = parser.parse_args()
+
+    import resolver
+    from server import ResolverServer
+
+    instance_ids = [f"i-{number:017x}" for number in range(args.instances)]
+    for number, instance_id in enumerate(instance_ids):
+        resolver.endpoint_cache.put(instance_id, {
+            'PrivateIpAddress': f"10.0.{number >> 8}.{number & 255}",
+            'TcpPort': resolver.TCP_PORT,
+            'UdpPort': resolver.UDP_PORT
+        })
+    events = [{'queryStringParameters': {
+        'sessionId': instance_ids[number % args.instances],
+        'transport': 'HTTP' if number % 2 else 'QUIC'
+    }} for number in range(args.requests)]
+
+    writer = NullWriter()
+    def standalone(event):
+        params = event['queryStringParameters']
+        response = resolver.resolve_session(params['sessionId'], params['transport'])
+        ResolverServer.write_response(writer, response['statusCode'], response['body'], True)
+    modes = [('lambda', lambda event: resolver.lambda_handler(event, None)),
+             ('standalone', standalone)]
+
+    precomputed = resolver.response_bodies
+    print(f"{'mode':<12}{'baseline us':>14}{'precomputed us':>16}{'saved':>9}")
+    for name, function in modes:
+        resolver.response_bodies = FreshBodies
+        cpu_per_request_us(function, events[:1000])
+        baseline = cpu_per_request_us(function, events)
+        resolver.response_bodies = precomputed
+        cpu_per_request_us(function, events[:1000])
+        optimized = cpu_per_request_us(function, events)
+        print(f"{name:<12}{baseline:>14.2f}{optimized:>16.2f}{(baseline - optimized) / baseline * 100:>8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
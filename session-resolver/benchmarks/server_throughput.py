@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Measures the throughput of the standalone resolver server
+
+A moto server on localhost stands in for the EC2 API, so lookups go over real
+HTTP connections from the resolver's shared pool. Gateway connections are
+emulated by asyncio clients that keep their connection alive between requests.
+
+    pip install -r requirements-dev.txt
+    python benchmarks/server_throughput.py --connections 32 --duration 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from common import percentile, setup_environment
+
+setup_environment()
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+
+async def gateway_connection(port, session_ids, deadline, latencies):
+    """ Sends resolve requests over a single keep-alive connection until the deadline """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    while time.perf_counter() < deadline:
+        transport = random.choice(['HTTP', 'QUIC'])
+        request = (f"POST /resolveSession?sessionId={random.choice(session_ids)}"
+                   f"&transport={transport}&clientIpAddress=198.51.100.7 HTTP/1.1\r\n"
+                   f"Host: 127.0.0.1:{port}\r\nContent-Length: 0\r\n\r\n")
+        start = time.perf_counter()
+        writer.write(request.encode('latin-1'))
+        status = (await reader.readline()).split()[1]
+        content_length = 0
+        while (line := await reader.readline()) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                content_length = int(value)
+        await reader.readexactly(content_length)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert status == b'200', status
+    writer.close()
+
+def start_resolver(port, workers, endpoint_url):
+    """ Runs the resolver server on its own event loop thread """
+    import server
+    ready = threading.Event()
+    def run():
+        loop = asyncio.new_event_loop()
+        loop.call_soon(ready.set)
+        loop.run_until_complete(server.serve('127.0.0.1', port, workers, endpoint_url=endpoint_url))
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    time.sleep(0.5)
+
+async def drive(port, session_ids, connections, duration):
+    """ Runs the emulated gateway connections and returns the sorted latencies """
+    latencies = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(gateway_connection(port, session_ids, deadline, latencies)
+                           for _ in range(connections)))
+    return sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=100)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=18447)
+    parser.add_argument('--moto-port', type=int, default=15000)
+    parser.add_argument('--cache', action='store_true',
+                        help="keep the endpoint cache enabled instead of resolving every request")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ['CACHE_MAX_SIZE'] = '0'
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    moto = ThreadedMotoServer(port=args.moto_port, verbose=False)
+    moto.start()
+    endpoint_url = f"http://127.0.0.1:{args.moto_port}"
+    try:
+        ec2 = boto3.client('ec2', endpoint_url=endpoint_url)
+        image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+        instances = ec2.run_instances(ImageId=image_id, MinCount=args.instances,
+                                      MaxCount=args.instances)['Instances']
+        session_ids = [instance['InstanceId'] for instance in instances]
+
+        start_resolver(args.port, args.workers, endpoint_url)
+        latencies = asyncio.run(drive(args.port, session_ids, args.connections, args.duration))
+    finally:
+        moto.stop()
+
+    print(f"requests:     {len(latencies)}")
+    print(f"throughput:   {len(latencies) / args.duration:.1f} req/s")
+    print(f"latency p50:  {percentile(latencies, 50):.2f} ms")
+    print(f"latency p95:  {percentile(latencies, 95):.2f} ms")
+    print(f"latency p99:  {percentile(latencies, 99):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import base64
+import json
+import ssl
+import threading
+import time
+import urllib.request
+
+from fleet_index import SnapshotIndex
+
+
+class BrokerClient:
+    """ Minimal DCV Session Manager broker API client using OAuth client credentials
+
+    https://docs.aws.amazon.com/dcv/latest/sm-dev/what-is-sm-dev.html
+    """
+
+    def __init__(self, broker_url, client_id, client_secret, ca_file=None, verify=True,
+                 timeout=5.0):
+        self.broker_url = broker_url.rstrip('/')
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = timeout
+        if verify:
+            self.ssl_context = ssl.create_default_context(cafile=ca_file)
+        else:
+            # The broker ships with a self-signed certificate
+            self.ssl_context = ssl._create_unverified_context()
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+    def _post(self, path, body=None, headers=None):
+        request = urllib.request.Request(f"{self.broker_url}{path}",
+                                         data=json.dumps(body).encode('utf-8') if body is not None else b'',
+                                         headers=headers or {}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout, context=self.ssl_context) as response:
+            body = json.loads(response.read())
+        if not isinstance(body, dict):
+            raise ValueError(f"Unexpected broker response to {path}")
+        return body
+
+    def access_token(self):
+        """ Returns a cached OAuth access token, requesting a new one shortly before it expires """
+        with self._token_lock:
+            if self._token is None or time.monotonic() > self._token_expires_at:
+                credentials = base64.b64encode(
+                    f"{self.client_id}:{self.client_secret}".encode('utf-8')).decode('ascii')
+                response = self._post('/oauth2/token?grant_type=client_credentials', headers={
+                    'Authorization': f"Basic {credentials}",
+                    'Content-Type': 'application/x-www-form-urlencoded'
+                })
+                self._token = response['access_token']
+                self._token_expires_at = time.monotonic() + int(response.get('expires_in', 3600)) - 60
+            return self._token
+
+    def describe_sessions(self, session_ids=None):
+        """ Yields every session known to the broker, or only the given session IDs """
+        body = {'SessionIds': session_ids} if session_ids else {}
+        while True:
+            response = self._post('/describeSessions', body, headers={
+                'Authorization': f"Bearer {self.access_token()}",
+                'Content-Type': 'application/json'
+            })
+            yield from response.get('Sessions') or []
+            if not response.get('NextToken'):
+                return
+            body['NextToken'] = response['NextToken']
+
+
+def session_endpoint(session, tcp_port, udp_port):
+    """ Converts a broker session description into a resolver endpoint """
+    server = session['Server']
+    endpoint = {
+        'SessionId': session['Id'],
+        'PrivateIpAddress': server['Ip'],
+        'TcpPort': tcp_port,
+        'UdpPort': udp_port,
+        'WebUrlPath': '/'
+    }
+    for server_endpoint in server.get('Endpoints') or []:
+        if server_endpoint.get('Protocol') == 'HTTP':
+            endpoint['TcpPort'] = int(server_endpoint['Port'])
+            endpoint['WebUrlPath'] = server_endpoint.get('WebUrlPath') or '/'
+        elif server_endpoint.get('Protocol') == 'QUIC':
+            endpoint['UdpPort'] = int(server_endpoint['Port'])
+    return endpoint
+
+
+class BrokerSessionTable(SnapshotIndex):
+    """ DCV session ID to host index built from bulk broker DescribeSessions listings """
+
+    name = 'Broker session table'
+
+    def __init__(self, client, tcp_port, udp_port, refresh_interval=30.0):
+        super().__init__(refresh_interval=refresh_interval)
+        self.client = client
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+
+    def load(self):
+        return {session['Id']: session_endpoint(session, self.tcp_port, self.udp_port)
+                for session in self.client.describe_sessions()
+                if session.get('State') == 'READY'}
+
+    def lookup(self, session_id):
+        """ Asks the broker for one session missing from the last listing """
+        for session in self.client.describe_sessions([session_id]):
+            if session['Id'] == session_id and session.get('State') == 'READY':
+                endpoint = session_endpoint(session, self.tcp_port, self.udp_port)
+                self.put(session_id, endpoint)
+                return endpoint
+        return None
@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import threading
+
+# Timeouts and retries sized for the interactive connection path, a gateway
+# connection should fail in seconds rather than hang on botocore's 60s default
+CLIENT_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('CLIENT_CONNECT_TIMEOUT_SECONDS', 1))
+CLIENT_READ_TIMEOUT_SECONDS = float(os.environ.get('CLIENT_READ_TIMEOUT_SECONDS', 2))
+CLIENT_MAX_ATTEMPTS = int(os.environ.get('CLIENT_MAX_ATTEMPTS', 2))
+CLIENT_MAX_POOL_CONNECTIONS = int(os.environ.get('CLIENT_MAX_POOL_CONNECTIONS', 10))
+
+
+def client_config(**overrides):
+    """ Returns the botocore Config used for every resolver client """
+    from botocore.config import Config
+    settings = {
+        'connect_timeout': CLIENT_CONNECT_TIMEOUT_SECONDS,
+        'read_timeout': CLIENT_READ_TIMEOUT_SECONDS,
+        # total_max_attempts counts the first call, max_attempts would only count retries
+        'retries': {'mode': 'adaptive', 'total_max_attempts': CLIENT_MAX_ATTEMPTS},
+        'max_pool_connections': CLIENT_MAX_POOL_CONNECTIONS,
+        'tcp_keepalive': True
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+def worst_case_seconds():
+    """ Upper bound of the time one API call can block with the configured timeouts """
+    # Retries back off exponentially by at most 1s, 2s, 4s... before each new attempt
+    backoff = sum(2 ** retry for retry in range(CLIENT_MAX_ATTEMPTS - 1))
+    return CLIENT_MAX_ATTEMPTS * (CLIENT_CONNECT_TIMEOUT_SECONDS + CLIENT_READ_TIMEOUT_SECONDS) + backoff
+
+def assumed_role_session(role_arn, region_name=None, session_name='dcv-session-resolver'):
+    """ Returns a boto3 session acting as role_arn
+
+    The credentials are fetched on first use, kept for the life of the
+    container and refreshed by botocore shortly before they expire.
+    """
+    import boto3
+    import botocore.session
+    from botocore.credentials import DeferredRefreshableCredentials
+    sts = boto3.client('sts', region_name=region_name, config=client_config())
+    def assume_role():
+        credentials = sts.assume_role(RoleArn=role_arn, RoleSessionName=session_name)['Credentials']
+        return {
+            'access_key': credentials['AccessKeyId'],
+            'secret_key': credentials['SecretAccessKey'],
+            'token': credentials['SessionToken'],
+            'expiry_time': credentials['Expiration'].isoformat()
+        }
+    botocore_session = botocore.session.get_session()
+    botocore_session._credentials = DeferredRefreshableCredentials(assume_role, 'sts-assume-role')
+    return boto3.Session(botocore_session=botocore_session)
+
+
+class LazyClient:
+    """ Stands in for a boto3 client that is only imported and created on first use
+
+    Importing boto3 and building a client dominate the resolver's cold start,
+    and a warm container answering from its caches never needs them.
+    """
+
+    def __init__(self, service_name, endpoint_url=None, region_name=None, role_arn=None,
+                 **config_overrides):
+        self._service_name = service_name
+        self._endpoint_url = endpoint_url
+        self._region_name = region_name
+        self._role_arn = role_arn
+        self._config_overrides = config_overrides
+        self._client = None
+        self._lock = threading.Lock()
+
+    def configure(self, endpoint_url=None, **config_overrides):
+        """ Changes the client settings, the client is recreated on next use """
+        with self._lock:
+            self._endpoint_url = endpoint_url
+            self._config_overrides.update(config_overrides)
+            self._client = None
+
+    @property
+    def client(self):
+        """ Returns the underlying boto3 client, creating it if needed """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    session = boto3
+                    if self._role_arn is not None:
+                        session = assumed_role_session(self._role_arn, self._region_name)
+                    self._client = session.client(self._service_name,
+                                                  region_name=self._region_name,
+                                                  endpoint_url=self._endpoint_url,
+                                                  config=client_config(**self._config_overrides))
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,86 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class EndpointCache:
+    """ Bounded in-memory cache of resolved endpoints with TTL and LRU eviction
+
+    Entries live at module level in the Lambda container, so warm invocations
+    for a recently resolved instance ID skip the EC2 API call. Negative entries
+    (unknown instance IDs) are kept for a shorter TTL so a typo or a terminated
+    instance does not hammer DescribeInstances either.
+    """
+
+    def __init__(self, max_size=1024, ttl=60.0, negative_ttl=5.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """ Returns the cached (value, negative) tuple for key, or None on a miss """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, negative, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if negative:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value, negative
+
+    def put(self, key, value, negative=False):
+        """ Stores value for key, evicting the least recently used entry when full """
+        if self.max_size <= 0:
+            return
+        ttl = self.negative_ttl if negative else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, negative, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """ Drops key from the cache if present """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """ Drops every entry and resets the counters """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.negative_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """ Returns the hit/miss counters and current size """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'negativeHits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __len__(self):
+        return len(self._entries)
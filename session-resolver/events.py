@@ -0,0 +1,103 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Adapters between the resolver and the events of the services that can invoke it
+
+The gateway sends sessionId, transport and clientIpAddress as form parameters,
+in the query string and/or a form-encoded POST body. They are read from API
+Gateway REST (v1) and HTTP (v2) API events, Lambda Function URL events, which
+use the v2 format, Application Load Balancer target events, raw form-encoded
+strings and plain dicts from a direct invoke.
+"""
+
+import base64
+import binascii
+from urllib.parse import parse_qs, unquote_plus
+
+PARAMETERS = ('sessionId', 'transport', 'clientIpAddress')
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+
+def form_params(query_string='', body=''):
+    """ Returns the first value of each form parameter, body parameters override the query string """
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    params = {}
+    for source in (query_string, body):
+        for name, values in parse_qs(source or '').items():
+            params[name] = values[0]
+    return params
+
+def event_body(event):
+    """ Returns the request body of an HTTP event, decoding base64 bodies """
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        try:
+            body = base64.b64decode(body).decode('utf-8', errors='replace')
+        except (binascii.Error, ValueError):
+            return ''
+    return body
+
+def is_alb_event(event):
+    """ Tells whether the event comes from an Application Load Balancer target group """
+    return isinstance(event, dict) and 'elb' in (event.get('requestContext') or {})
+
+def is_http_event(event):
+    """ Tells whether the event is an HTTP request from API Gateway, a Function URL or a load balancer """
+    return isinstance(event, dict) and ('requestContext' in event or 'httpMethod' in event)
+
+def parse_event(event):
+    """ Returns the (session ID, transport, client IP address) of a resolver request, None when missing """
+    if isinstance(event, (str, bytes)):
+        params = form_params(body=event)
+    elif not isinstance(event, dict):
+        params = {}
+    elif 'rawQueryString' in event:
+        # API Gateway HTTP API and Function URL events keep the original query string
+        params = form_params(event['rawQueryString'], event_body(event))
+    elif 'queryStringParameters' in event or 'multiValueQueryStringParameters' in event or 'body' in event:
+        query = event.get('queryStringParameters') or {}
+        if event.get('multiValueQueryStringParameters'):
+            # ALB target groups with multi value headers on only send this form, keep the last
+            # value like ALB itself does when the option is off
+            query = {name: values[-1] for name, values in event['multiValueQueryStringParameters'].items()
+                     if values}
+        if is_alb_event(event):
+            # ALB passes query string values as they were sent, still URL encoded
+            query = {name: unquote_plus(value) for name, value in query.items()}
+        params = dict(query)
+        params.update(form_params(body=event_body(event)))
+    else:
+        params = event
+    return tuple(params.get(name) for name in PARAMETERS)
+
+def format_response(event, response):
+    """ Shapes a resolver response for the service that sent the event
+
+    Returns a new dict, resolver responses can be shared cache entries.
+    """
+    if not is_http_event(event):
+        return dict(response)
+    status = response['statusCode']
+    body = response['body']
+    formatted = {
+        'statusCode': status,
+        'headers': {
+            'Content-Type': 'application/json' if status == 200 and body[:1] == '{' else 'text/plain'
+        },
+        'body': body
+    }
+    if is_alb_event(event):
+        formatted['statusDescription'] = f"{status} {REASONS.get(status, 'Unknown')}"
+        formatted['isBase64Encoded'] = False
+    return formatted
@@ -0,0 +1,151 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import logging
+import threading
+import time
+
+from throttling import guarded_call
+
+logger = logging.getLogger('dcv-session-resolver')
+
+
+def fleet_filters(instance_profile=None, tag=None):
+    """ Builds the DescribeInstances filters selecting the DCV server fleet
+
+    instance_profile is an instance profile name such as dcv-server-profile,
+    tag is either "key" or "key=value".
+    """
+    filters = [{'Name': 'instance-state-name', 'Values': ['pending', 'running']}]
+    if instance_profile:
+        filters.append({'Name': 'iam-instance-profile.arn',
+                        'Values': [f"arn:*:iam::*:instance-profile/{instance_profile}"]})
+    if tag:
+        key, _, value = tag.partition('=')
+        if value:
+            filters.append({'Name': f"tag:{key}", 'Values': [value]})
+        else:
+            filters.append({'Name': 'tag-key', 'Values': [key]})
+    return filters
+
+
+class SnapshotIndex:
+    """ In-memory key to endpoint index reloaded from a bulk listing
+
+    The index is loaded on first use and refreshed in a background thread once
+    it is older than refresh_interval. Readers never take a lock: a refresh
+    builds the new mapping and swaps it in one assignment. Subclasses implement
+    load() to list every entry.
+    """
+
+    name = 'Snapshot index'
+
+    def __init__(self, refresh_interval=300.0, clock=time.monotonic):
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._endpoints = {}
+        self._loaded_at = None
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.last_refresh_seconds = 0.0
+        self.last_refresh_changes = 0
+
+    def load(self):
+        """ Returns the complete key to endpoint mapping """
+        raise NotImplementedError
+
+    def refresh(self):
+        """ Reloads the index and swaps in the new snapshot, returns the number of changed entries """
+        with self._refresh_lock:
+            return self._reload()
+
+    def _reload(self):
+        """ Loads and swaps in a new snapshot, the caller holds the refresh lock """
+        start = self._clock()
+        endpoints = self.load()
+        previous = self._endpoints
+        changes = len(previous.keys() ^ endpoints.keys()) + sum(
+            1 for key, endpoint in endpoints.items()
+            if key in previous and previous[key] != endpoint)
+        self._endpoints = endpoints
+        self._loaded_at = self._clock()
+        self.refreshes += 1
+        self.last_refresh_seconds = self._loaded_at - start
+        self.last_refresh_changes = changes
+        return changes
+
+    def _refresh_in_background(self, initial=False):
+        with self._refresh_lock:
+            # Concurrent first lookups wait for the one initial load instead of each running their own
+            if initial and self._loaded_at is not None:
+                return
+            try:
+                self._reload()
+            except Exception:
+                logger.exception("%s refresh failed", self.name)
+                # Keep serving the previous snapshot and retry after another interval
+                self._loaded_at = self._clock()
+
+    def get(self, key):
+        """ Returns the indexed endpoint for key, or None when it is unknown """
+        if self._loaded_at is None:
+            # The first lookup of the container pays for the initial load
+            self._refresh_in_background(initial=True)
+        elif self._clock() - self._loaded_at > self.refresh_interval \
+                and not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return self._endpoints.get(key)
+
+    def put(self, key, endpoint):
+        """ Adds an entry found by a targeted lookup until the next refresh """
+        self._endpoints[key] = endpoint
+
+    def __len__(self):
+        return len(self._endpoints)
+
+    def stats(self):
+        """ Returns the size of the index and the cost of the last refresh """
+        return {
+            'size': len(self._endpoints),
+            'refreshes': self.refreshes,
+            'lastRefreshSeconds': self.last_refresh_seconds,
+            'lastRefreshChanges': self.last_refresh_changes
+        }
+
+
+class FleetIndex(SnapshotIndex):
+    """ In-memory instance ID to private IP index of the whole DCV server fleet
+
+    The fleet is listed with one paginated DescribeInstances pass. Each page
+    spends a token of the optional rate limiter and goes through the optional
+    circuit breaker shared with the resolver's own EC2 lookups, so a refresh
+    counts against the same call budget. A refused or throttled page fails the
+    refresh and the previous snapshot is kept.
+    """
+
+    name = 'Fleet index'
+
+    def __init__(self, ec2_client, filters, refresh_interval=300.0, page_size=1000,
+                 rate_limiter=None, breaker=None, rate_limit_wait=1.0, clock=time.monotonic):
+        super().__init__(refresh_interval=refresh_interval, clock=clock)
+        self.ec2 = ec2_client
+        self.filters = filters
+        self.page_size = page_size
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.rate_limit_wait = rate_limit_wait
+
+    def load(self):
+        endpoints = {}
+        request = {'Filters': self.filters, 'MaxResults': self.page_size}
+        while True:
+            page = guarded_call(self.ec2.describe_instances, self.rate_limiter, self.breaker,
+                                self.rate_limit_wait, **request)
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    private_ip_addr = instance.get('PrivateIpAddress')
+                    if private_ip_addr:
+                        endpoints[instance['InstanceId']] = private_ip_addr
+            if not page.get('NextToken'):
+                return endpoints
+            request['NextToken'] = page['NextToken']
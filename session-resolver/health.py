@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import concurrent.futures
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+
+class HealthChecker:
+    """ Cached TCP reachability of DCV server endpoints
+
+    The first lookup of an endpoint probes it with a TCP connect and a short
+    timeout. Afterwards the cached status is answered straight away, and once
+    it is older than the TTL a background thread probes the endpoint again, so
+    a request never waits on a known endpoint.
+    """
+
+    def __init__(self, ttl=10.0, timeout=0.25, max_size=4096, max_workers=8, clock=time.monotonic):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_size = max_size
+        self._clock = clock
+        self._statuses = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='health')
+        self.probes = 0
+        self.failed_probes = 0
+
+    def probe(self, host, port):
+        """ Connects to host:port, records and returns whether it accepted the connection """
+        try:
+            with socket.create_connection((host, port), timeout=self.timeout):
+                reachable = True
+        except OSError:
+            reachable = False
+        with self._lock:
+            self.probes += 1
+            self.failed_probes += not reachable
+            self._statuses[(host, port)] = (reachable, self._clock())
+            self._statuses.move_to_end((host, port))
+            while len(self._statuses) > self.max_size:
+                self._statuses.popitem(last=False)
+        return reachable
+
+    def is_reachable(self, host, port):
+        """ Returns the cached reachability of host:port, probing it first when unknown """
+        key = (host, port)
+        with self._lock:
+            status = self._statuses.get(key)
+            if status is not None:
+                self._statuses.move_to_end(key)
+                reachable, checked_at = status
+                stale = self._clock() - checked_at >= self.ttl and key not in self._refreshing
+                if stale:
+                    self._refreshing.add(key)
+        if status is None:
+            return self.probe(host, port)
+        if stale:
+            self._executor.submit(self._refresh, key)
+        return reachable
+
+    def _refresh(self, key):
+        """ Probes an endpoint in the background """
+        try:
+            self.probe(*key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        """ Returns the number of tracked endpoints, unreachable ones and probes made """
+        with self._lock:
+            unreachable = sum(1 for reachable, _ in self._statuses.values() if not reachable)
+        return {
+            'endpoints': len(self._statuses),
+            'unreachable': unreachable,
+            'probes': self.probes,
+            'failedProbes': self.failed_probes
+        }
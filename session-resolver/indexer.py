@@ -0,0 +1,89 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import boto3
+
+ec2 = boto3.client('ec2')
+dynamodb = boto3.client('dynamodb')
+
+INDEX_TABLE_NAME = os.environ.get('INDEX_TABLE_NAME', 'dcv-session-index')
+
+# Instance tags whose values are indexed as additional session IDs for the instance
+ALIAS_TAG_KEYS = [key.strip() for key in
+                  os.environ.get('ALIAS_TAG_KEYS', 'dcv:session-alias').split(',') if key.strip()]
+
+# Instance tags overriding the default DCV server ports
+TCP_PORT_TAG_KEY = 'dcv:tcp-port'
+UDP_PORT_TAG_KEY = 'dcv:udp-port'
+
+TCP_PORT = int(os.environ.get('DCV_TCP_PORT', 8443))
+UDP_PORT = int(os.environ.get('DCV_UDP_PORT', 8443))
+
+def get_index_keys(instance_id):
+    """ Returns the session IDs currently indexed for an instance, including its aliases """
+    response = dynamodb.get_item(TableName=INDEX_TABLE_NAME,
+                                 Key={'SessionId': {'S': instance_id}},
+                                 ProjectionExpression='Aliases',
+                                 ConsistentRead=True)
+    item = response.get('Item')
+    if item is None:
+        return []
+    return [instance_id] + item.get('Aliases', {}).get('SS', [])
+
+def index_instance(instance):
+    """ Writes the endpoint of a running instance under its instance ID and alias tags """
+    instance_id = instance['InstanceId']
+    tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+    aliases = sorted({tags[key] for key in ALIAS_TAG_KEYS if tags.get(key)})
+    endpoint = {
+        'InstanceId': {'S': instance_id},
+        'PrivateIpAddress': {'S': instance['PrivateIpAddress']},
+        'TcpPort': {'N': str(int(tags.get(TCP_PORT_TAG_KEY, TCP_PORT)))},
+        'UdpPort': {'N': str(int(tags.get(UDP_PORT_TAG_KEY, UDP_PORT)))},
+        'State': {'S': instance['State']['Name']}
+    }
+
+    # Drop aliases that were removed from the instance since it was last indexed
+    for stale_key in set(get_index_keys(instance_id)[1:]) - set(aliases):
+        dynamodb.delete_item(TableName=INDEX_TABLE_NAME, Key={'SessionId': {'S': stale_key}})
+
+    instance_item = dict(endpoint, SessionId={'S': instance_id})
+    if aliases:
+        instance_item['Aliases'] = {'SS': aliases}
+    dynamodb.put_item(TableName=INDEX_TABLE_NAME, Item=instance_item)
+    for alias in aliases:
+        dynamodb.put_item(TableName=INDEX_TABLE_NAME, Item=dict(endpoint, SessionId={'S': alias}))
+
+def update_instance_state(instance_id, state):
+    """ Records the new state on every index entry of an already indexed instance """
+    for key in get_index_keys(instance_id):
+        dynamodb.update_item(TableName=INDEX_TABLE_NAME,
+                             Key={'SessionId': {'S': key}},
+                             UpdateExpression='SET #state = :state',
+                             ExpressionAttributeNames={'#state': 'State'},
+                             ExpressionAttributeValues={':state': {'S': state}})
+
+def remove_instance(instance_id):
+    """ Deletes every index entry of an instance """
+    for key in get_index_keys(instance_id):
+        dynamodb.delete_item(TableName=INDEX_TABLE_NAME, Key={'SessionId': {'S': key}})
+
+
+# Invoked by an EventBridge rule on "EC2 Instance State-change Notification" events
+def lambda_handler(event, context):
+    instance_id = event['detail']['instance-id']
+    state = event['detail']['state']
+
+    if state == 'running':
+        response = ec2.describe_instances(InstanceIds=[instance_id])
+        index_instance(response['Reservations'][0]['Instances'][0])
+    elif state == 'terminated':
+        remove_instance(instance_id)
+    else:
+        update_instance_state(instance_id, state)
+
+    return {
+        'instanceId': instance_id,
+        'state': state
+    }
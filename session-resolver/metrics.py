@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+
+# Set METRICS_ENABLED=false to stop writing one metrics record per request
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'DCV/SessionResolver')
+
+DIMENSIONS = ['Transport', 'Outcome']
+
+_current_timer = contextvars.ContextVar('resolver_request_timer', default=None)
+_cold_start = True
+
+
+class RequestTimer:
+    """ Accumulates the time spent in each phase of one resolver request """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """ Adds the time spent in the with block to the named phase """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def start_request():
+    """ Starts timing a request in the current context and returns its timer """
+    timer = RequestTimer()
+    _current_timer.set(timer)
+    return timer
+
+@contextlib.contextmanager
+def phase(name):
+    """ Times the with block as a phase of the request in the current context, if any """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
+
+def emf_record(timer, transport, status_code, cold_start=False):
+    """ Builds a CloudWatch Embedded Metric Format record for a finished request """
+    timings = dict(timer.phases, Total=(time.perf_counter() - timer.started_at) * 1000)
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [DIMENSIONS],
+                'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in timings]
+            }]
+        },
+        # Keep the dimension bounded whatever the client sent
+        'Transport': transport if transport in ('HTTP', 'QUIC') else 'Invalid',
+        'Outcome': str(status_code),
+        'ColdStart': cold_start,
+        **{name: round(value, 3) for name, value in timings.items()}
+    }
+
+def finish_request(timer, transport, status_code):
+    """ Writes the EMF record of a finished request to stdout, where CloudWatch Logs picks it up """
+    global _cold_start
+    _current_timer.set(None)
+    if not METRICS_ENABLED:
+        return
+    record = emf_record(timer, transport, status_code, _cold_start)
+    _cold_start = False
+    sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+    sys.stdout.flush()
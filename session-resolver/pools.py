@@ -0,0 +1,241 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import bisect
+import datetime
+import hashlib
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from fleet_index import SnapshotIndex
+from throttling import guarded_call
+
+
+class PickCounter:
+    """ Per-member load that counts each pick as one more connection for pick_ttl seconds
+
+    The resolver never hears when a connection ends, so a pick only adds to the
+    load of its member until it ages out. The real load comes back with the
+    next refresh of the pool. Subclasses get on_change(member_id, old, new)
+    calls, under the lock, whenever a load changes.
+    """
+
+    def __init__(self, members, loads, pick_ttl=30.0, clock=time.monotonic):
+        self.pick_ttl = pick_ttl
+        self._clock = clock
+        self._members = {member['InstanceId']: member for member in members}
+        self._member_ids = list(self._members)
+        self._loads = {member_id: int(loads.get(member_id, 0)) for member_id in self._member_ids}
+        # Picks in the order they age out, as (expires_at, member_id)
+        self._picks = deque()
+        self._lock = threading.Lock()
+
+    def on_change(self, member_id, old_load, new_load):
+        pass
+
+    def _add(self, member_id, delta):
+        old_load = self._loads[member_id]
+        self._loads[member_id] = old_load + delta
+        self.on_change(member_id, old_load, old_load + delta)
+
+    def _expire(self):
+        """ Takes the aged out picks off their members, the caller holds the lock """
+        now = self._clock()
+        while self._picks and self._picks[0][0] <= now:
+            self._add(self._picks.popleft()[1], -1)
+
+    def _record_pick(self, member_id):
+        """ Counts a pick until it ages out, the caller holds the lock """
+        self._add(member_id, 1)
+        if self.pick_ttl > 0:
+            self._picks.append((self._clock() + self.pick_ttl, member_id))
+
+    def loads(self):
+        """ Returns the current load of every member """
+        with self._lock:
+            self._expire()
+            return dict(self._loads)
+
+
+class LeastConnections(PickCounter):
+    """ Picks the member with the fewest connections in O(1)
+
+    Members sit in buckets keyed by their connection count, oldest pick first,
+    so members with the same count take turns. A pick moves its member one
+    bucket up and an aged out pick one bucket down.
+    """
+
+    def __init__(self, members, loads, pick_ttl=30.0, clock=time.monotonic):
+        super().__init__(members, loads, pick_ttl=pick_ttl, clock=clock)
+        self._buckets = defaultdict(dict)
+        for member_id, load in self._loads.items():
+            self._buckets[load][member_id] = self._members[member_id]
+        self._min_load = min(self._buckets) if self._buckets else 0
+
+    def on_change(self, member_id, old_load, new_load):
+        member = self._buckets[old_load].pop(member_id)
+        if not self._buckets[old_load]:
+            del self._buckets[old_load]
+        self._buckets[new_load][member_id] = member
+        self._min_load = min(self._min_load, new_load)
+
+    def select(self, client_key=None):
+        with self._lock:
+            if not self._members:
+                return None
+            self._expire()
+            while not self._buckets.get(self._min_load):
+                self._buckets.pop(self._min_load, None)
+                self._min_load += 1
+            member_id = next(iter(self._buckets[self._min_load]))
+            self._record_pick(member_id)
+            return self._members[member_id]
+
+
+class PowerOfTwoChoices(PickCounter):
+    """ Samples two random members and picks the less loaded one """
+
+    def select(self, client_key=None):
+        with self._lock:
+            if not self._members:
+                return None
+            self._expire()
+            first, second = random.choice(self._member_ids), random.choice(self._member_ids)
+            member_id = first if self._loads[first] <= self._loads[second] else second
+            self._record_pick(member_id)
+            return self._members[member_id]
+
+
+class ConsistentHash:
+    """ Maps a client to the same member while the pool is unchanged
+
+    Each member owns several points on a hash ring so that adding or removing
+    a member only moves the clients of its neighbours.
+    """
+
+    replicas = 64
+
+    def __init__(self, members, loads, pick_ttl=None):
+        # A hash pick does not depend on load, loads and pick_ttl are unused
+        ring = sorted((self._hash(f"{member['InstanceId']}#{replica}"), member)
+                      for member in members for replica in range(self.replicas))
+        self._points = [point for point, _ in ring]
+        self._members = [member for _, member in ring]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def select(self, client_key=None):
+        if not self._members:
+            return None
+        if client_key is None:
+            return random.choice(self._members)
+        index = bisect.bisect(self._points, self._hash(client_key)) % len(self._points)
+        return self._members[index]
+
+
+STRATEGIES = {
+    'least-connections': LeastConnections,
+    'power-of-two-choices': PowerOfTwoChoices,
+    'consistent-hash': ConsistentHash
+}
+
+
+def cloudwatch_loads(cloudwatch, namespace, metric_name, instance_ids, period=60):
+    """ Returns the latest value of a per-instance CloudWatch metric for each instance ID """
+    end = datetime.datetime.now(datetime.timezone.utc)
+    loads = {}
+    # GetMetricData accepts up to 500 queries per call
+    for offset in range(0, len(instance_ids), 500):
+        batch = instance_ids[offset:offset + 500]
+        queries = [{
+            'Id': f"m{number}",
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': namespace,
+                    'MetricName': metric_name,
+                    'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}]
+                },
+                'Period': period,
+                'Stat': 'Maximum'
+            }
+        } for number, instance_id in enumerate(batch)]
+        paginator = cloudwatch.get_paginator('get_metric_data')
+        for page in paginator.paginate(MetricDataQueries=queries,
+                                       StartTime=end - datetime.timedelta(seconds=period * 5),
+                                       EndTime=end, ScanBy='TimestampDescending'):
+            for result in page['MetricDataResults']:
+                if result['Values']:
+                    loads.setdefault(batch[int(result['Id'][1:])], result['Values'][0])
+    return loads
+
+
+class PoolTable(SnapshotIndex):
+    """ Pool name to load balancing strategy index over the running tagged DCV servers
+
+    Pool membership comes from an instance tag and the per-host load from an
+    optional CloudWatch metric. Both are reloaded in the background, so picking
+    a host never waits on an API call. The DescribeInstances pages go through
+    the optional rate limiter and circuit breaker shared with the resolver.
+    """
+
+    name = 'Pool table'
+
+    def __init__(self, ec2_client, tag_key, strategy='least-connections', cloudwatch_client=None,
+                 load_metric=None, refresh_interval=60.0, pick_ttl=30.0, rate_limiter=None,
+                 breaker=None, rate_limit_wait=1.0):
+        super().__init__(refresh_interval=refresh_interval)
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown pool strategy '{strategy}', expected one of {sorted(STRATEGIES)}")
+        self.ec2 = ec2_client
+        self.tag_key = tag_key
+        self.strategy = STRATEGIES[strategy]
+        self.cloudwatch = cloudwatch_client
+        self.load_metric = load_metric
+        self.pick_ttl = pick_ttl
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.rate_limit_wait = rate_limit_wait
+
+    def describe_pages(self):
+        """ Yields the DescribeInstances pages listing the running tagged instances """
+        request = {'Filters': [
+            {'Name': 'tag-key', 'Values': [self.tag_key]},
+            {'Name': 'instance-state-name', 'Values': ['running']}
+        ]}
+        while True:
+            page = guarded_call(self.ec2.describe_instances, self.rate_limiter, self.breaker,
+                                self.rate_limit_wait, **request)
+            yield page
+            if not page.get('NextToken'):
+                return
+            request['NextToken'] = page['NextToken']
+
+    def load(self):
+        members = defaultdict(list)
+        for page in self.describe_pages():
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+                    if instance.get('PrivateIpAddress') and tags.get(self.tag_key):
+                        members[tags[self.tag_key]].append({
+                            'InstanceId': instance['InstanceId'],
+                            'PrivateIpAddress': instance['PrivateIpAddress']
+                        })
+
+        loads = {}
+        if self.cloudwatch is not None and self.load_metric:
+            namespace, _, metric_name = self.load_metric.rpartition('/')
+            instance_ids = [member['InstanceId'] for pool in members.values() for member in pool]
+            loads = cloudwatch_loads(self.cloudwatch, namespace, metric_name, instance_ids)
+
+        return {pool: self.strategy(pool_members, loads, pick_ttl=self.pick_ttl)
+                for pool, pool_members in members.items()}
+
+    def select(self, pool, client_key=None):
+        """ Returns the member picked for a client, or None when pool is not a known pool """
+        strategy = self.get(pool)
+        return strategy.select(client_key) if strategy is not None else None
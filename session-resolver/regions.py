@@ -0,0 +1,90 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import concurrent.futures
+from botocore.exceptions import BotoCoreError, ClientError
+from endpoint_cache import EndpointCache
+
+
+def parse_targets(spec):
+    """ Parses comma-separated "region" and "region=role-arn" entries into (region, role ARN) pairs """
+    targets = []
+    for entry in spec.split(','):
+        region, _, role_arn = entry.strip().partition('=')
+        if region:
+            targets.append((region.strip(), role_arn.strip() or None))
+    return targets
+
+def is_not_found(error):
+    """ Tells whether an API error means the instance ID does not exist in that region """
+    return (isinstance(error, ClientError)
+            and error.response['Error']['Code'].startswith('InvalidInstanceID'))
+
+def describe_instance(client, instance_id):
+    """ Returns the DescribeInstances description of a single instance """
+    response = client.describe_instances(InstanceIds=[instance_id])
+    return response['Reservations'][0]['Instances'][0]
+
+
+class RegionFanout:
+    """ Looks instance IDs up across several regions and accounts at once
+
+    Every target is queried concurrently and the first one that knows the
+    instance answers, so an unknown instance costs about one round trip to the
+    fastest region that has it rather than one per region. The owning target is
+    remembered and queried alone on later lookups of the same instance.
+    """
+
+    def __init__(self, targets, max_workers=16, owner_cache_size=4096, owner_ttl=3600.0):
+        self.targets = dict(targets)
+        self.owners = EndpointCache(max_size=owner_cache_size, ttl=owner_ttl, negative_ttl=0)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='fanout')
+        self.fanouts = 0
+        self.direct_lookups = 0
+
+    def describe_instance(self, instance_id):
+        """ Returns the name of the target owning instance_id and its description
+
+        Raises the not found ClientError when no target has the instance, or
+        the error of a failed target when none of the others had it.
+        """
+        owner = self.owners.get(instance_id)
+        if owner is not None:
+            name = owner[0]
+            self.direct_lookups += 1
+            try:
+                return name, describe_instance(self.targets[name], instance_id)
+            except ClientError as error:
+                if not is_not_found(error):
+                    raise
+                self.owners.invalidate(instance_id)
+        return self._fan_out(instance_id)
+
+    def _fan_out(self, instance_id):
+        """ Queries every target concurrently and returns the first positive answer """
+        self.fanouts += 1
+        futures = {self._executor.submit(describe_instance, client, instance_id): name
+                   for name, client in self.targets.items()}
+        errors = []
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                instance = future.result()
+            except (BotoCoreError, ClientError) as error:
+                errors.append(error)
+                continue
+            # The slower targets finish in the background, bounded by the client timeouts
+            name = futures[future]
+            self.owners.put(instance_id, name)
+            return name, instance
+        # A failed target may own the instance, so report the failure rather than not found
+        raise next((error for error in errors if not is_not_found(error)), errors[0])
+
+    def stats(self):
+        """ Returns the number of targets, remembered owners, fan-outs and direct lookups """
+        return {
+            'targets': len(self.targets),
+            'owners': len(self.owners),
+            'fanouts': self.fanouts,
+            'directLookups': self.direct_lookups
+        }
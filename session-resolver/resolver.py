@@ -2,33 +2,353 @@
 # SPDX-License-Identifier: MIT-0
 
 import json
-import boto3
-from botocore.exceptions import ClientError
+import logging
+import os
+from botocore.exceptions import BotoCoreError, ClientError
+import events
+import metrics
+from clients import LazyClient
+from endpoint_cache import EndpointCache
+from fleet_index import FleetIndex, fleet_filters
+from pools import PoolTable
+from singleflight import SingleFlight
+from throttling import CircuitBreaker, TokenBucket, is_throttling
 
-ec2 = boto3.client('ec2')
+logger = logging.getLogger('dcv-session-resolver')
 
-TCP_PORT = 8443
-UDP_PORT = 8443
+# Clients are created on first use with the timeouts and retries from clients.py
+ec2 = LazyClient('ec2')
 
-def get_instance_ip(instance_id):
-    """ Given an instance ID this returns the private Ip address corresponding to it """
+# Provisioned concurrency and SnapStart run the init phase ahead of traffic,
+# so creating the EC2 client there keeps it off the first request
+PREWARM_CLIENTS = os.environ.get('PREWARM_CLIENTS', 'false').lower() == 'true'
+if PREWARM_CLIENTS:
+    ec2.client
+
+# DCV server ports returned to the gateway, the CDK samples set them from their transport profile
+TCP_PORT = int(os.environ.get('DCV_TCP_PORT', 8443))
+UDP_PORT = int(os.environ.get('DCV_UDP_PORT', 8443))
+
+# Budget of DescribeInstances calls per container, off by default. It only bounds one container,
+# size it as the function's share of the account EC2 request rate divided by its reserved concurrency
+EC2_RATE_LIMIT = float(os.environ.get('EC2_RATE_LIMIT', 0))
+EC2_BURST = int(os.environ.get('EC2_BURST', 20))
+EC2_RATE_LIMIT_WAIT_SECONDS = float(os.environ.get('EC2_RATE_LIMIT_WAIT_SECONDS', 0.1))
+EC2_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('EC2_BREAKER_FAILURE_THRESHOLD', 5))
+EC2_BREAKER_RESET_SECONDS = float(os.environ.get('EC2_BREAKER_RESET_SECONDS', 5))
+LAST_KNOWN_GOOD_MAX_SIZE = int(os.environ.get('LAST_KNOWN_GOOD_MAX_SIZE', 4096))
+LAST_KNOWN_GOOD_TTL_SECONDS = float(os.environ.get('LAST_KNOWN_GOOD_TTL_SECONDS', 86400))
+
+ec2_rate_limiter = TokenBucket(EC2_RATE_LIMIT, EC2_BURST)
+ec2_breaker = CircuitBreaker(failure_threshold=EC2_BREAKER_FAILURE_THRESHOLD,
+                             reset_timeout=EC2_BREAKER_RESET_SECONDS)
+
+# Endpoint cache limits, overridable through the Lambda environment variables
+CACHE_MAX_SIZE = int(os.environ.get('CACHE_MAX_SIZE', 1024))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', 60))
+CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get('CACHE_NEGATIVE_TTL_SECONDS', 5))
+
+# DynamoDB table maintained by indexer.py, leave unset to always query EC2
+INDEX_TABLE_NAME = os.environ.get('INDEX_TABLE_NAME', '')
+
+dynamodb = LazyClient('dynamodb') if INDEX_TABLE_NAME else None
+
+# Prefetch the whole DCV server fleet selected by instance profile name and/or "key=value" tag
+FLEET_INSTANCE_PROFILE = os.environ.get('FLEET_INSTANCE_PROFILE', '')
+FLEET_TAG = os.environ.get('FLEET_TAG', '')
+FLEET_REFRESH_SECONDS = float(os.environ.get('FLEET_REFRESH_SECONDS', 300))
+
+fleet_index = None
+if FLEET_INSTANCE_PROFILE or FLEET_TAG:
+    fleet_index = FleetIndex(ec2, fleet_filters(FLEET_INSTANCE_PROFILE, FLEET_TAG),
+                             refresh_interval=FLEET_REFRESH_SECONDS,
+                             rate_limiter=ec2_rate_limiter, breaker=ec2_breaker)
+
+# Route a pool name sent as sessionId to the least loaded running server tagged with it
+POOL_TAG_KEY = os.environ.get('POOL_TAG_KEY', '')
+POOL_STRATEGY = os.environ.get('POOL_STRATEGY', 'least-connections')
+POOL_LOAD_METRIC = os.environ.get('POOL_LOAD_METRIC', '')
+POOL_REFRESH_SECONDS = float(os.environ.get('POOL_REFRESH_SECONDS', 60))
+POOL_PICK_TTL_SECONDS = float(os.environ.get('POOL_PICK_TTL_SECONDS', 30))
+
+pool_table = None
+if POOL_TAG_KEY:
+    pool_table = PoolTable(ec2, POOL_TAG_KEY, strategy=POOL_STRATEGY,
+                           cloudwatch_client=LazyClient('cloudwatch') if POOL_LOAD_METRIC else None,
+                           load_metric=POOL_LOAD_METRIC, refresh_interval=POOL_REFRESH_SECONDS,
+                           pick_ttl=POOL_PICK_TTL_SECONDS, rate_limiter=ec2_rate_limiter,
+                           breaker=ec2_breaker)
+
+# Also search these regions and accounts, as "region" or "region=role-arn" entries,
+# for instance IDs that are not found in the function's own region
+FANOUT_TARGETS = os.environ.get('FANOUT_TARGETS', '')
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 16))
+FANOUT_OWNER_CACHE_SIZE = int(os.environ.get('FANOUT_OWNER_CACHE_SIZE', 4096))
+FANOUT_OWNER_TTL_SECONDS = float(os.environ.get('FANOUT_OWNER_TTL_SECONDS', 3600))
+
+region_fanout = None
+if FANOUT_TARGETS:
+    # Only a multi-region deployment pays for importing the thread pool
+    from regions import RegionFanout, parse_targets
+    fanout_targets = [(os.environ.get('AWS_REGION', 'default'), ec2)]
+    for region, role_arn in parse_targets(FANOUT_TARGETS):
+        name = f"{region}={role_arn}" if role_arn else region
+        fanout_targets.append((name, LazyClient('ec2', region_name=region, role_arn=role_arn)))
+    if PREWARM_CLIENTS:
+        for _, regional_ec2 in fanout_targets:
+            regional_ec2.client
+    region_fanout = RegionFanout(fanout_targets, max_workers=FANOUT_MAX_WORKERS,
+                                 owner_cache_size=FANOUT_OWNER_CACHE_SIZE,
+                                 owner_ttl=FANOUT_OWNER_TTL_SECONDS)
+
+# Resolve DCV session IDs through the Session Manager broker instead of instance IDs
+RESOLUTION_MODE = os.environ.get('RESOLUTION_MODE', 'instance')
+BROKER_URL = os.environ.get('BROKER_URL', '')
+BROKER_CLIENT_ID = os.environ.get('BROKER_CLIENT_ID', '')
+BROKER_CLIENT_SECRET = os.environ.get('BROKER_CLIENT_SECRET', '')
+BROKER_CLIENT_SECRET_ARN = os.environ.get('BROKER_CLIENT_SECRET_ARN', '')
+BROKER_CA_FILE = os.environ.get('BROKER_CA_FILE') or None
+BROKER_VERIFY_TLS = os.environ.get('BROKER_VERIFY_TLS', 'true').lower() == 'true'
+BROKER_REFRESH_SECONDS = float(os.environ.get('BROKER_REFRESH_SECONDS', 30))
+
+broker_sessions = None
+if RESOLUTION_MODE == 'session-manager':
+    # Only this mode pays for importing the HTTP and TLS stack
+    from broker import BrokerClient, BrokerSessionTable
+    if BROKER_CLIENT_SECRET_ARN:
+        BROKER_CLIENT_SECRET = LazyClient('secretsmanager').get_secret_value(
+            SecretId=BROKER_CLIENT_SECRET_ARN)['SecretString']
+    broker_sessions = BrokerSessionTable(
+        BrokerClient(BROKER_URL, BROKER_CLIENT_ID, BROKER_CLIENT_SECRET,
+                     ca_file=BROKER_CA_FILE, verify=BROKER_VERIFY_TLS),
+        TCP_PORT, UDP_PORT, refresh_interval=BROKER_REFRESH_SECONDS)
+
+# Probe DCV servers before returning them, so the gateway does not wait on a dead host
+HEALTH_CHECKS = os.environ.get('HEALTH_CHECKS', 'false').lower() == 'true'
+HEALTH_TTL_SECONDS = float(os.environ.get('HEALTH_TTL_SECONDS', 10))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_PROBE_TIMEOUT_SECONDS', 0.25))
+HEALTH_POOL_ATTEMPTS = int(os.environ.get('HEALTH_POOL_ATTEMPTS', 3))
+
+health_checker = None
+if HEALTH_CHECKS:
+    from health import HealthChecker
+    health_checker = HealthChecker(ttl=HEALTH_TTL_SECONDS, timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+
+# Record a privacy-safe trace of the requests, to replay with benchmarks/replay.py
+TRACE_ENABLED = os.environ.get('TRACE_ENABLED', 'false').lower() == 'true'
+TRACE_FILE = os.environ.get('TRACE_FILE', '')
+TRACE_SALT = os.environ.get('TRACE_SALT', '')
+
+trace_writer = None
+if TRACE_ENABLED:
+    from tracing import TraceWriter
+    trace_writer = TraceWriter(TRACE_FILE, TRACE_SALT)
+
+# Survives across warm invocations of the same Lambda container
+endpoint_cache = EndpointCache(max_size=CACHE_MAX_SIZE,
+                               ttl=CACHE_TTL_SECONDS,
+                               negative_ttl=CACHE_NEGATIVE_TTL_SECONDS)
+
+# Concurrent cache misses for the same instance ID share one upstream lookup
+inflight_lookups = SingleFlight()
+
+# Endpoints outlive the cache here, to be served while EC2 cannot be called
+last_known_good = EndpointCache(max_size=LAST_KNOWN_GOOD_MAX_SIZE,
+                                ttl=LAST_KNOWN_GOOD_TTL_SECONDS,
+                                negative_ttl=0)
+
+def get_indexed_endpoint(session_id):
+    """ Looks the session ID up in the index table, returns None when it is not indexed """
+    try:
+        with metrics.phase('IndexLookup'):
+            response = dynamodb.get_item(TableName=INDEX_TABLE_NAME,
+                                         Key={'SessionId': {'S': session_id}})
+    except (BotoCoreError, ClientError):
+        return None
+    item = response.get('Item')
+    if item is None or item['State']['S'] != 'running':
+        return None
+    return {
+        'PrivateIpAddress': item['PrivateIpAddress']['S'],
+        'TcpPort': int(item['TcpPort']['N']),
+        'UdpPort': int(item['UdpPort']['N'])
+    }
+
+def remember_endpoint(session_id, endpoint):
+    """ Caches a resolved endpoint and keeps it as the last known good one """
+    endpoint_cache.put(session_id, endpoint)
+    last_known_good.put(session_id, endpoint)
+
+def session_not_found(session_id):
+    """ Returns the 404 response of a session ID that has no DCV server to connect to """
+    return {
+        'statusCode': 404,
+        'body': f"Invalid session ID '{session_id}'."
+    }
+
+def ec2_unavailable(instance_id, reason):
+    """ Serves the last known good endpoint while EC2 cannot be called, or a 503 """
+    stale = last_known_good.get(instance_id)
+    if stale is not None:
+        return stale[0]
+    return {
+        'statusCode': 503,
+        'body': reason
+    }
+
+def lookup_instance_endpoint(instance_id):
+    """ Resolves an instance ID through the fleet index, index table or EC2 and caches the outcome """
+    if fleet_index is not None:
+        private_ip_addr = fleet_index.get(instance_id)
+        if private_ip_addr is not None:
+            endpoint = {
+                'PrivateIpAddress': private_ip_addr,
+                'TcpPort': TCP_PORT,
+                'UdpPort': UDP_PORT
+            }
+            remember_endpoint(instance_id, endpoint)
+            return endpoint
+    if dynamodb is not None:
+        endpoint = get_indexed_endpoint(instance_id)
+        if endpoint is not None:
+            remember_endpoint(instance_id, endpoint)
+            return endpoint
+    # Checked in this order so an open breaker does not spend a token
+    if not ec2_breaker.allow() or not ec2_rate_limiter.acquire(EC2_RATE_LIMIT_WAIT_SECONDS):
+        return ec2_unavailable(instance_id, "EC2 API throttled")
+    try:
+        with metrics.phase('Ec2Call'):
+            if region_fanout is not None:
+                _, instance = region_fanout.describe_instance(instance_id)
+            else:
+                response = ec2.describe_instances(InstanceIds=[instance_id])
+                instance = response['Reservations'][0]['Instances'][0]
+        ec2_breaker.record_success()
+        private_ip_addr = instance.get('PrivateIpAddress')
+        # Terminated instances are still described for a while, without an address
+        if not private_ip_addr or instance.get('State', {}).get('Name') == 'terminated':
+            not_found = session_not_found(instance_id)
+            endpoint_cache.put(instance_id, not_found, negative=True)
+            last_known_good.invalidate(instance_id)
+            return not_found
+        endpoint = {
+            'PrivateIpAddress': private_ip_addr,
+            'TcpPort': TCP_PORT,
+            'UdpPort': UDP_PORT
+        }
+        remember_endpoint(instance_id, endpoint)
+        if fleet_index is not None:
+            fleet_index.put(instance_id, private_ip_addr)
+        return endpoint
+    except ClientError as error:
+        # A throttled lookup says nothing about the instance, it must not turn into a 404
+        if is_throttling(error):
+            ec2_breaker.record_failure()
+            return ec2_unavailable(instance_id, "EC2 API throttled")
+        ec2_breaker.record_success()
+        not_found = session_not_found(instance_id)
+        # Only remember IDs EC2 says do not exist, not transient API failures
+        if error.response['Error']['Code'].startswith('InvalidInstanceID'):
+            endpoint_cache.put(instance_id, not_found, negative=True)
+            last_known_good.invalidate(instance_id)
+        return not_found
+    except BotoCoreError:
+        # Timed out or could not reach EC2 after the capped retries
+        ec2_breaker.record_failure()
+        return ec2_unavailable(instance_id, "EC2 API unavailable")
+
+def get_instance_endpoint(instance_id):
+    """ Given an instance ID this returns the private Ip address and ports of its DCV server """
+    with metrics.phase('CacheLookup'):
+        cached = endpoint_cache.get(instance_id)
+    if cached is not None:
+        return cached[0]
+    return inflight_lookups.do(instance_id, lookup_instance_endpoint, instance_id)
+
+def lookup_broker_session(session_id):
+    """ Resolves a DCV session ID through the cached broker session table """
     try:
-        response = ec2.describe_instances(InstanceIds=[instance_id])
-        private_ip_addr = response['Reservations'][0]['Instances'][0]['PrivateIpAddress']
-        return private_ip_addr
-    except ClientError:
+        with metrics.phase('BrokerLookup'):
+            endpoint = broker_sessions.get(session_id) or broker_sessions.lookup(session_id)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        # Unreachable broker, or an OAuth or DescribeSessions answer that is not what the API documents
+        logger.warning("Broker lookup of session '%s' failed: %r", session_id, error)
         return {
-            'statusCode': 404,
-            'body': f"Invalid session ID '{instance_id}'."
+            'statusCode': 503,
+            'body': "Session Manager broker unavailable"
         }
+    if endpoint is None:
+        not_found = session_not_found(session_id)
+        endpoint_cache.put(session_id, not_found, negative=True)
+        return not_found
+    endpoint_cache.put(session_id, endpoint)
+    return endpoint
 
+def get_session_endpoint(session_id):
+    """ Given a session ID from the gateway this returns the DCV server endpoint hosting it """
+    with metrics.phase('CacheLookup'):
+        cached = endpoint_cache.get(session_id)
+    if cached is not None:
+        return cached[0]
+    lookup = lookup_broker_session if broker_sessions is not None else lookup_instance_endpoint
+    return inflight_lookups.do(session_id, lookup, session_id)
 
-# https://docs.aws.amazon.com/dcv/latest/gw-admin/session-resolver.html#implementing-session-resolver
-def lambda_handler(event, context):
-    # Gateway POST - sessionId=session_id&transport=transport&clientIpAddress=clientIpAddress
-    session_id = event['queryStringParameters']['sessionId']
-    transport = event['queryStringParameters']['transport']
+def get_instance_ip(instance_id):
+    """ Given an instance ID this returns the private Ip address corresponding to it """
+    endpoint = get_instance_endpoint(instance_id)
+    if 'statusCode' in endpoint:
+        return endpoint
+    return endpoint['PrivateIpAddress']
+
+def response_bodies(endpoint):
+    """ Returns the serialized gateway response bodies of an endpoint by transport
+
+    The bodies are built on first use and kept in the endpoint dict itself, so
+    they are cached and expire along with it. A changed endpoint is always a
+    new dict and never serves an old body.
+    """
+    bodies = endpoint.get('ResponseBodies')
+    if bodies is None:
+        bodies = {}
+        for transport, port in [('HTTP', endpoint.get('TcpPort', TCP_PORT)),
+                                ('QUIC', endpoint.get('UdpPort', UDP_PORT))]:
+            session_details = {
+                'SessionId': endpoint.get('SessionId', "console"),
+                'DcvServerEndpoint': endpoint['PrivateIpAddress'],
+                'Port': port,
+                'WebUrlPath': endpoint.get('WebUrlPath', '/'),
+                'TransportProtocol': transport
+            }
+            bodies[transport] = json.dumps(session_details)
+        # Concurrent first uses build equal bodies, whichever is stored last wins
+        endpoint['ResponseBodies'] = bodies
+    return bodies
+
+def is_reachable(endpoint):
+    """ Tells whether the DCV server of an endpoint accepts connections, always True without health checks """
+    if health_checker is None:
+        return True
+    with metrics.phase('HealthCheck'):
+        # DCV listens for QUIC on UDP, the TCP listener tells whether the server is up
+        return health_checker.is_reachable(endpoint['PrivateIpAddress'],
+                                           endpoint.get('TcpPort', TCP_PORT))
 
+def select_pool_member(pool, client_ip_address):
+    """ Picks a member of a pool, skipping members known to be unreachable """
+    attempts = HEALTH_POOL_ATTEMPTS if health_checker is not None else 1
+    for _ in range(attempts):
+        with metrics.phase('PoolSelect'):
+            member = pool_table.select(pool, client_ip_address)
+        if member is None or is_reachable(member):
+            return member
+    return {
+        'statusCode': 503,
+        'body': f"No reachable DCV server in pool '{pool}'."
+    }
+
+
+def resolve_session(session_id, transport, client_ip_address=None):
+    """ Builds the session resolver response for the gateway from the request parameters """
     if session_id is None:
         return {
             'statusCode': 400,
@@ -38,22 +358,43 @@ def lambda_handler(event, context):
     if transport not in ["HTTP", "QUIC"]:
         return {
             'statusCode': 400,
-            'body': "Invalid transport parameter: " + transport
+            'body': "Invalid transport parameter: " + str(transport)
         }
 
-    server_endpoint = get_instance_ip(session_id)
-    port = int(TCP_PORT if transport == 'HTTP' else UDP_PORT)
-    session_details = {
-        'SessionId': "console",
-        'DcvServerEndpoint': server_endpoint,
-        'Port': port,
-        'WebUrlPath': '/',
-        'TransportProtocol':transport
-    }
+    server_endpoint = None
+    if pool_table is not None:
+        server_endpoint = select_pool_member(session_id, client_ip_address)
+    if server_endpoint is None:
+        server_endpoint = get_session_endpoint(session_id)
+        if 'statusCode' not in server_endpoint and not is_reachable(server_endpoint):
+            return {
+                'statusCode': 503,
+                'body': f"DCV server of session '{session_id}' is not reachable."
+            }
     if 'statusCode' in server_endpoint:
         return server_endpoint
-    if 'statusCode' not in server_endpoint:
-        return {
-            'statusCode': 200,
-            'body': json.dumps(session_details)
-        }
+    with metrics.phase('Serialize'):
+        body = response_bodies(server_endpoint)[transport]
+    return {
+        'statusCode': 200,
+        'body': body
+    }
+
+def trace_request(session_id, transport, status_code):
+    """ Adds a finished request to the trace, when tracing is enabled """
+    if trace_writer is not None:
+        trace_writer.record(session_id, transport, status_code)
+
+
+# https://docs.aws.amazon.com/dcv/latest/gw-admin/session-resolver.html#implementing-session-resolver
+def lambda_handler(event, context):
+    timer = metrics.start_request()
+    # Gateway POST - sessionId=session_id&transport=transport&clientIpAddress=clientIpAddress
+    # from API Gateway, a Function URL, an ALB or a direct invoke
+    with timer.phase('Parse'):
+        session_id, transport, client_ip_address = events.parse_event(event)
+
+    response = resolve_session(session_id, transport, client_ip_address)
+    metrics.finish_request(timer, transport, response['statusCode'])
+    trace_request(session_id, transport, response['statusCode'])
+    return events.format_response(event, response)
@@ -0,0 +1,198 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Standalone asyncio HTTP server exposing the session resolver to the Connection Gateway
+
+Runs the same resolution logic as the Lambda function without the API Gateway
+hop or cold starts. Point the gateway [resolver] url at this server, for example
+url="https://resolver.example.internal:8447".
+
+    python server.py --port 8447 --certfile cert.pem --keyfile key.pem
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import ssl
+from urllib.parse import urlsplit
+
+import metrics
+import resolver
+from events import REASONS, form_params
+from singleflight import AsyncSingleFlight
+
+logger = logging.getLogger('dcv-session-resolver')
+
+# Idle keep-alive connections from the gateway are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 75
+
+# Headers and body of a request must arrive within this many seconds of its request line
+REQUEST_TIMEOUT = 10
+
+# Largest request body accepted, the gateway only sends a few form parameters
+MAX_BODY_SIZE = 8192
+
+
+class ResolverServer:
+    """ Serves POST /resolveSession requests with HTTP/1.1 keep-alive """
+
+    def __init__(self, executor):
+        self.executor = executor
+        # Identical requests arriving together wait on one worker thread
+        self.inflight = AsyncSingleFlight()
+
+    async def handle_connection(self, reader, writer):
+        """ Serves requests on one gateway connection until it is closed or idles out """
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                keep_alive = await self.handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            logger.debug("Dropping connection: %s", error)
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, reader, writer):
+        """ Parses one request, writes its response and returns whether to keep the connection """
+        timer = metrics.start_request()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REQUEST_TIMEOUT
+        with timer.phase('Parse'):
+            method, target, version = request_line.decode('latin-1').split()
+            try:
+                headers = await asyncio.wait_for(self.read_headers(reader), REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                # A stalled client must not hold the connection and its coroutine
+                self.write_response(writer, 408, "Request timeout", False)
+                return False
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        content_length = int(headers.get('content-length', 0))
+        if content_length > MAX_BODY_SIZE:
+            self.write_response(writer, 413, "Request body too large", False)
+            return False
+        try:
+            body = await asyncio.wait_for(reader.readexactly(content_length),
+                                          max(0.0, deadline - loop.time())) if content_length else b''
+        except asyncio.TimeoutError:
+            self.write_response(writer, 408, "Request timeout", False)
+            return False
+
+        url = urlsplit(target)
+        if method == 'GET' and url.path == '/health':
+            self.write_response(writer, 200, "OK", keep_alive)
+        elif method != 'POST':
+            self.write_response(writer, 405, "Only POST is supported", keep_alive)
+        elif url.path.rstrip('/').endswith('/resolveSession') or url.path in ('', '/'):
+            # The gateway sends its parameters in the query string, accept a form body too
+            with timer.phase('Parse'):
+                params = form_params(url.query, body)
+            transport = params.get('transport')
+            response = await self.resolve(params.get('sessionId'), transport,
+                                          params.get('clientIpAddress'))
+            self.write_response(writer, response['statusCode'], response['body'], keep_alive)
+            metrics.finish_request(timer, transport, response['statusCode'])
+            resolver.trace_request(params.get('sessionId'), transport, response['statusCode'])
+        else:
+            self.write_response(writer, 404, "Not found", keep_alive)
+        return keep_alive
+
+    @staticmethod
+    async def read_headers(reader):
+        """ Reads the header lines of a request up to the blank line """
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def resolve(self, session_id, transport, client_ip_address=None):
+        """ Resolves a session, coalescing identical requests that are already in flight """
+        try:
+            # The client address is part of the key, pools pick a host per client
+            return await self.inflight.do((session_id, transport, client_ip_address),
+                                          self.resolve_in_executor,
+                                          session_id, transport, client_ip_address)
+        except Exception:
+            logger.exception("Failed to resolve session '%s'", session_id)
+            return {
+                'statusCode': 500,
+                'body': "Internal error resolving session"
+            }
+
+    async def resolve_in_executor(self, session_id, transport, client_ip_address):
+        """ Runs the blocking resolver lookup on the shared thread pool """
+        loop = asyncio.get_running_loop()
+        # Carry the request timer into the worker thread so it records the lookup phases
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, resolver.resolve_session,
+                                          session_id, transport, client_ip_address)
+
+    @staticmethod
+    def write_response(writer, status, body, keep_alive):
+        """ Serializes an HTTP/1.1 response on the connection """
+        payload = body.encode('utf-8')
+        content_type = 'application/json' if status == 200 and payload[:1] == b'{' else 'text/plain'
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + payload)
+
+
+async def serve(host, port, workers, ssl_context=None, endpoint_url=None):
+    """ Starts the resolver server and serves until cancelled """
+    # One EC2 connection per worker thread, shared by every gateway connection
+    resolver.ec2.configure(endpoint_url=endpoint_url, max_pool_connections=workers)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                     thread_name_prefix='resolver')
+    server = await asyncio.start_server(ResolverServer(executor).handle_connection,
+                                        host, port, ssl=ssl_context)
+    logger.info("Session resolver listening on %s", ', '.join(
+        str(sock.getsockname()) for sock in server.sockets))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8447)
+    parser.add_argument('--workers', type=int, default=32,
+                        help="threads and pooled EC2 connections used for lookups")
+    parser.add_argument('--certfile', help="PEM certificate, enables HTTPS")
+    parser.add_argument('--keyfile', help="PEM private key of the certificate")
+    parser.add_argument('--endpoint-url', help="override the EC2 API endpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    ssl_context = None
+    if args.certfile:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.certfile, args.keyfile)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, ssl_context, args.endpoint_url))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+
+
+class _Call:
+    """ An upstream call in flight and the outcome its waiters will share """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """ Coalesces concurrent calls for the same key into one upstream call
+
+    The first thread to ask for a key runs the function, every thread asking for
+    the same key while it runs waits and receives the same result or exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.saved_calls = 0
+
+    def do(self, key, function, *args):
+        """ Returns function(*args), sharing the call with concurrent callers of key """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.upstream_calls += 1
+            else:
+                self.saved_calls += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """ Returns how many upstream calls were made and how many were saved """
+        return {
+            'upstreamCalls': self.upstream_calls,
+            'savedCalls': self.saved_calls
+        }
+
+
+class AsyncSingleFlight:
+    """ Coalesces concurrent awaits for the same key into one upstream coroutine """
+
+    def __init__(self):
+        self._tasks = {}
+        self.upstream_calls = 0
+        self.saved_calls = 0
+
+    async def do(self, key, function, *args):
+        """ Returns await function(*args), sharing the call with concurrent callers of key """
+        # Imported here, the Lambda handler only needs the threaded variant
+        import asyncio
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(function(*args))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.upstream_calls += 1
+        else:
+            self.saved_calls += 1
+        # A cancelled waiter must not cancel the call the other waiters share
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """ Returns how many upstream calls were made and how many were saved """
+        return {
+            'upstreamCalls': self.upstream_calls,
+            'savedCalls': self.saved_calls
+        }
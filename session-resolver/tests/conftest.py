@@ -0,0 +1,52 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Fixtures shared by the resolver tests
+
+The resolver modules read their configuration from environment variables at
+import time, so each test imports fresh copies of them with load_resolver.
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+RESOLVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if RESOLVER_DIR not in sys.path:
+    sys.path.insert(0, RESOLVER_DIR)
+
+# Modules of the deployment package, dropped from sys.modules before each load
+RESOLVER_MODULES = sorted(name[:-3] for name in os.listdir(RESOLVER_DIR) if name.endswith('.py'))
+
+
+@pytest.fixture(autouse=True)
+def aws_environment(monkeypatch):
+    """ Points boto3 at fake credentials and turns the per-request metrics records off """
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('METRICS_ENABLED', 'false')
+    for name in ('AWS_PROFILE', 'AWS_SESSION_TOKEN'):
+        monkeypatch.delenv(name, raising=False)
+
+@pytest.fixture
+def load_resolver(monkeypatch):
+    """ Returns a function importing a fresh copy of a resolver module with extra environment variables """
+    def load(module_name='resolver', **environment):
+        for name, value in environment.items():
+            monkeypatch.setenv(name, str(value))
+        for name in RESOLVER_MODULES:
+            sys.modules.pop(name, None)
+        return importlib.import_module(module_name)
+    yield load
+    for name in RESOLVER_MODULES:
+        sys.modules.pop(name, None)
+
+@pytest.fixture
+def request_event():
+    """ Returns a function building the API Gateway event of a gateway request """
+    def build(session_id, transport='HTTP'):
+        return {'queryStringParameters': {'sessionId': session_id, 'transport': transport}}
+    return build
@@ -0,0 +1,100 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of Session Manager resolution against a local broker stand-in """
+
+import http.server
+import json
+import threading
+
+import pytest
+
+SESSION = {
+    'Id': 'session-1',
+    'State': 'READY',
+    'Server': {
+        'Ip': '10.0.1.20',
+        'Endpoints': [
+            {'Protocol': 'HTTP', 'Port': 8443, 'WebUrlPath': '/session-1'},
+            {'Protocol': 'QUIC', 'Port': 9443}
+        ]
+    }
+}
+
+
+class BrokerHandler(http.server.BaseHTTPRequestHandler):
+    """ Answers the broker OAuth and DescribeSessions calls with the bodies of the test """
+
+    responses = {}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = self.responses[self.path.split('?')[0]]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def broker():
+    """ Serves the broker API on a local port, returns the response bodies by path """
+    BrokerHandler.responses = {
+        '/oauth2/token': json.dumps({'access_token': 'token', 'expires_in': 3600}).encode(),
+        '/describeSessions': json.dumps({'Sessions': [SESSION]}).encode()
+    }
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), BrokerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def resolver(broker, load_resolver):
+    return load_resolver('resolver', RESOLUTION_MODE='session-manager',
+                         BROKER_URL=f"http://127.0.0.1:{broker.server_address[1]}",
+                         BROKER_CLIENT_ID='session-resolver', BROKER_CLIENT_SECRET='secret')
+
+
+def test_ready_session_resolves_to_its_broker_endpoint(resolver, request_event):
+    response = resolver.lambda_handler(request_event('session-1', 'QUIC'), None)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['SessionId'] == 'session-1'
+    assert body['DcvServerEndpoint'] == '10.0.1.20'
+    assert body['Port'] == 9443
+    assert body['WebUrlPath'] == '/session-1'
+
+def test_unknown_session_is_not_found(resolver, request_event):
+    response = resolver.lambda_handler(request_event('session-2'), None)
+
+    assert response['statusCode'] == 404
+
+@pytest.mark.parametrize('path, body', [
+    ('/oauth2/token', b'<html>Bad gateway</html>'),
+    ('/oauth2/token', json.dumps({'error': 'invalid_client'}).encode()),
+    ('/describeSessions', b'null'),
+    ('/describeSessions', json.dumps({'Sessions': [{'Id': 'session-1', 'State': 'READY'}]}).encode()),
+    ('/describeSessions', json.dumps({'Sessions': {'Id': 'session-1'}}).encode())
+], ids=['token-not-json', 'token-missing', 'sessions-null', 'server-missing', 'sessions-not-list'])
+def test_malformed_broker_response_is_unavailable(resolver, request_event, path, body):
+    BrokerHandler.responses[path] = body
+
+    response = resolver.lambda_handler(request_event('session-1'), None)
+
+    assert response['statusCode'] == 503
+    assert response['body'] == "Session Manager broker unavailable"
+
+def test_unreachable_broker_is_unavailable(load_resolver, request_event):
+    resolver = load_resolver('resolver', RESOLUTION_MODE='session-manager',
+                             BROKER_URL='http://127.0.0.1:9', BROKER_CLIENT_ID='session-resolver',
+                             BROKER_CLIENT_SECRET='secret')
+
+    response = resolver.lambda_handler(request_event('session-1'), None)
+
+    assert response['statusCode'] == 503
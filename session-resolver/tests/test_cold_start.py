@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the resolver cold-start import budget and worst-case resolve latency """
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+RESOLVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Median import time of resolver.py in a fresh interpreter, boto3 excluded
+IMPORT_BUDGET_MS = 100.0
+
+# Allowance over the worst case of clients.py for scheduling and connection setup
+WORST_CASE_SLACK_SECONDS = 0.5
+
+
+def run_fresh(code, **environment):
+    """ Runs code in a fresh interpreter from the resolver folder and returns its output """
+    return subprocess.run([sys.executable, '-c', code], cwd=RESOLVER_DIR, check=True,
+                          capture_output=True, text=True,
+                          env=dict(environment, AWS_DEFAULT_REGION='us-east-1',
+                                   METRICS_ENABLED='false')).stdout
+
+@pytest.fixture
+def unresponsive_endpoint():
+    """ Listens on a local port, accepting connections but never sending a byte """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(64)
+    connections = []
+    def accept():
+        while True:
+            try:
+                connections.append(listener.accept()[0])
+            except OSError:
+                return
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}"
+    listener.close()
+    for connection in connections:
+        connection.close()
+
+
+def test_import_does_not_load_boto3():
+    output = run_fresh("import sys, resolver; print('boto3' in sys.modules)")
+
+    assert output.strip() == 'False'
+
+def test_import_time_is_within_budget():
+    probe = "import time; start = time.perf_counter(); import resolver; print(time.perf_counter() - start)"
+    samples = [float(run_fresh(probe)) * 1000 for _ in range(5)]
+
+    assert statistics.median(samples) <= IMPORT_BUDGET_MS
+
+def test_unresponsive_ec2_fails_within_the_worst_case(load_resolver, unresponsive_endpoint):
+    resolver = load_resolver('resolver', CACHE_MAX_SIZE=0, EC2_RATE_LIMIT=0,
+                             CLIENT_CONNECT_TIMEOUT_SECONDS=0.2, CLIENT_READ_TIMEOUT_SECONDS=0.2,
+                             CLIENT_MAX_ATTEMPTS=2)
+    clients = sys.modules['clients']
+    resolver.ec2.configure(endpoint_url=unresponsive_endpoint)
+
+    start = time.perf_counter()
+    response = resolver.resolve_session('i-0123456789abcdef0', 'HTTP')
+    elapsed = time.perf_counter() - start
+
+    assert response['statusCode'] == 503
+    assert clients.CLIENT_READ_TIMEOUT_SECONDS <= elapsed
+    assert elapsed <= clients.worst_case_seconds() + WORST_CASE_SLACK_SECONDS
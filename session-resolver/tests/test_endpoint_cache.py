@@ -0,0 +1,104 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the endpoint cache and of the negative caching of instances without an address """
+
+import pytest
+
+from benchmarks.common import count_calls
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+@pytest.fixture
+def endpoint_cache(load_resolver):
+    return load_resolver('endpoint_cache')
+
+class Clock:
+    """ Monotonic clock the tests move forward by hand """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def described_instance(instance):
+    """ Returns a before-call handler answering DescribeInstances with a single instance """
+    def answer(**kwargs):
+        from botocore.awsrequest import AWSResponse
+        return AWSResponse(None, 200, {}, None), {
+            'Reservations': [{'Instances': [dict(instance, InstanceId=INSTANCE_ID)]}],
+            'ResponseMetadata': {'HTTPStatusCode': 200}
+        }
+    return answer
+
+
+def test_entries_expire_after_the_ttl(endpoint_cache):
+    clock = Clock()
+    cache = endpoint_cache.EndpointCache(ttl=60, clock=clock)
+    cache.put('a', {'PrivateIpAddress': '10.0.0.1'})
+
+    clock.now = 59.9
+    assert cache.get('a') == ({'PrivateIpAddress': '10.0.0.1'}, False)
+    clock.now = 60.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_negative_entries_use_the_shorter_ttl(endpoint_cache):
+    clock = Clock()
+    cache = endpoint_cache.EndpointCache(ttl=60, negative_ttl=5, clock=clock)
+    cache.put('unknown', {'statusCode': 404}, negative=True)
+
+    clock.now = 4.0
+    assert cache.get('unknown') == ({'statusCode': 404}, True)
+    clock.now = 5.0
+    assert cache.get('unknown') is None
+
+def test_least_recently_used_entry_is_evicted(endpoint_cache):
+    cache = endpoint_cache.EndpointCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == (1, False)
+    assert cache.get('c') == (3, False)
+
+def test_counters(endpoint_cache):
+    cache = endpoint_cache.EndpointCache(max_size=1)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('missing')
+    cache.put('b', 2, negative=True)
+    cache.get('b')
+
+    assert cache.stats() == {'size': 1, 'hits': 1, 'negativeHits': 1, 'misses': 1, 'evictions': 1}
+    cache.clear()
+    assert cache.stats() == {'size': 0, 'hits': 0, 'negativeHits': 0, 'misses': 0, 'evictions': 0}
+
+@pytest.mark.parametrize('max_size, ttl', [(0, 60), (16, 0)])
+def test_disabled_cache_stores_nothing(endpoint_cache, max_size, ttl):
+    cache = endpoint_cache.EndpointCache(max_size=max_size, ttl=ttl)
+    cache.put('a', 1)
+
+    assert cache.get('a') is None
+
+@pytest.mark.parametrize('instance', [
+    {'State': {'Name': 'terminated'}},
+    {'State': {'Name': 'terminated'}, 'PrivateIpAddress': '10.0.0.10'},
+    {'State': {'Name': 'stopped'}}
+], ids=['terminated', 'terminated-with-address', 'no-address'])
+def test_instance_without_an_address_is_not_found(load_resolver, request_event, instance):
+    resolver = load_resolver('resolver')
+    calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances', described_instance(instance))
+
+    responses = [resolver.lambda_handler(request_event(INSTANCE_ID), None) for _ in range(3)]
+
+    assert [response['statusCode'] for response in responses] == [404] * 3
+    # The not-found answer is negative-cached
+    assert len(calls) == 1
+    assert resolver.endpoint_cache.get(INSTANCE_ID)[1] is True
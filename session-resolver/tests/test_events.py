@@ -0,0 +1,86 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the event adapters for each service that can invoke the resolver """
+
+import base64
+
+import pytest
+
+import events
+
+EXPECTED = ('i-0123456789abcdef0', 'QUIC', '198.51.100.7')
+FORM = 'sessionId=i-0123456789abcdef0&transport=QUIC&clientIpAddress=198.51.100.7'
+RESPONSE = {'statusCode': 200, 'body': '{"SessionId": "console"}'}
+
+
+def test_api_gateway_v1_event():
+    event = {
+        'httpMethod': 'POST',
+        'requestContext': {'stage': 'prod'},
+        'queryStringParameters': {'sessionId': 'i-0123456789abcdef0', 'transport': 'HTTP'},
+        'body': 'transport=QUIC&clientIpAddress=198.51.100.7'
+    }
+    assert events.parse_event(event) == EXPECTED
+
+@pytest.mark.parametrize('context', [{'http': {'method': 'GET'}}, {'http': {'method': 'GET'}, 'apiId': 'abc'}],
+                         ids=['function-url', 'http-api'])
+def test_v2_event_reads_the_raw_query_string(context):
+    event = {'version': '2.0', 'rawQueryString': FORM, 'requestContext': context}
+    assert events.parse_event(event) == EXPECTED
+
+def test_alb_event_decodes_query_string_values():
+    event = {
+        'requestContext': {'elb': {'targetGroupArn': 'arn'}},
+        'httpMethod': 'GET',
+        'queryStringParameters': {'sessionId': 'pool%3Acad', 'transport': 'QUIC',
+                                  'clientIpAddress': '2001%3Adb8%3A%3A1'},
+        'body': ''
+    }
+    assert events.parse_event(event) == ('pool:cad', 'QUIC', '2001:db8::1')
+
+def test_alb_multi_value_event_keeps_the_last_value():
+    event = {
+        'requestContext': {'elb': {'targetGroupArn': 'arn'}},
+        'httpMethod': 'GET',
+        'multiValueQueryStringParameters': {'sessionId': ['i-0000000000000000a', 'pool%3Acad'],
+                                            'transport': ['HTTP'], 'clientIpAddress': []},
+        'body': ''
+    }
+    assert events.parse_event(event) == ('pool:cad', 'HTTP', None)
+
+def test_base64_body_is_decoded():
+    event = {
+        'requestContext': {'http': {'method': 'POST'}},
+        'rawQueryString': '',
+        'body': base64.b64encode(FORM.encode()).decode(),
+        'isBase64Encoded': True
+    }
+    assert events.parse_event(event) == EXPECTED
+
+def test_invalid_base64_body_is_ignored():
+    event = {'httpMethod': 'POST', 'body': '%%%not base64', 'isBase64Encoded': True}
+    assert events.parse_event(event) == (None, None, None)
+
+@pytest.mark.parametrize('event', [FORM, FORM.encode(), dict(zip(events.PARAMETERS, EXPECTED))],
+                         ids=['string', 'bytes', 'dict'])
+def test_direct_invoke_payloads(event):
+    assert events.parse_event(event) == EXPECTED
+
+def test_direct_invoke_response_is_a_copy():
+    formatted = events.format_response({'sessionId': EXPECTED[0]}, RESPONSE)
+    assert formatted == RESPONSE
+    formatted['statusCode'] = 500
+    assert RESPONSE['statusCode'] == 200
+
+def test_http_response_headers():
+    formatted = events.format_response({'httpMethod': 'GET'}, RESPONSE)
+    assert formatted['headers'] == {'Content-Type': 'application/json'}
+    assert 'statusDescription' not in formatted
+    not_found = events.format_response({'httpMethod': 'GET'}, {'statusCode': 404, 'body': 'Invalid'})
+    assert not_found['headers'] == {'Content-Type': 'text/plain'}
+
+def test_alb_response_has_a_status_description():
+    formatted = events.format_response({'requestContext': {'elb': {}}}, {'statusCode': 503, 'body': 'Busy'})
+    assert formatted['statusDescription'] == '503 Service Unavailable'
+    assert formatted['isBase64Encoded'] is False
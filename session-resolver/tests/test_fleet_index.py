@@ -0,0 +1,131 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the snapshot index loading and the EC2 call budget of the fleet index """
+
+import sys
+import threading
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+
+@pytest.fixture
+def fleet_index(load_resolver):
+    return load_resolver('fleet_index')
+
+@pytest.fixture
+def throttling(fleet_index):
+    # The copy fleet_index was loaded with, so exception classes match
+    return sys.modules['throttling']
+
+@pytest.fixture
+def ec2():
+    with mock_aws():
+        yield boto3.client('ec2')
+
+def run_fleet(ec2, count, tags):
+    """ Starts count moto instances with the given tags and returns their descriptions
+
+    Each instance gets its own reservation, moto pages DescribeInstances by reservation.
+    """
+    image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+    return [ec2.run_instances(ImageId=image_id, MinCount=1, MaxCount=1, TagSpecifications=[{
+        'ResourceType': 'instance',
+        'Tags': [{'Key': key, 'Value': value} for key, value in tags.items()]
+    }])['Instances'][0] for _ in range(count)]
+
+def count_calls(client, event_name):
+    """ Returns a list that grows by one entry for every matching API call of a client """
+    calls = []
+    client.meta.events.register(f"before-parameter-build.{event_name}",
+                                lambda **kwargs: calls.append(event_name))
+    return calls
+
+
+def test_concurrent_first_lookups_share_one_load(fleet_index):
+    loads = []
+
+    class SlowIndex(fleet_index.SnapshotIndex):
+        def load(self):
+            loads.append(threading.get_ident())
+            time.sleep(0.1)
+            return {'i-0123456789abcdef0': '10.0.0.10'}
+
+    index = SlowIndex()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.get('i-0123456789abcdef0')))
+               for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert results == ['10.0.0.10'] * 16
+
+def test_failed_first_load_is_not_repeated_by_waiting_lookups(fleet_index):
+    loads = []
+
+    class FailingIndex(fleet_index.SnapshotIndex):
+        def load(self):
+            loads.append(1)
+            time.sleep(0.05)
+            raise RuntimeError("listing failed")
+
+    index = FailingIndex()
+    threads = [threading.Thread(target=index.get, args=('i-0123456789abcdef0',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(index) == 0
+
+def test_fleet_index_spends_a_token_per_page(ec2, fleet_index, throttling):
+    fleet = run_fleet(ec2, 12, {'dcv:fleet': 'test'})
+    run_fleet(ec2, 3, {'dcv:fleet': 'other'})
+    limiter = throttling.TokenBucket(rate=100, burst=100)
+    index = fleet_index.FleetIndex(ec2, fleet_index.fleet_filters(tag='dcv:fleet=test'),
+                                   page_size=5, rate_limiter=limiter)
+    calls = count_calls(ec2, 'ec2.DescribeInstances')
+
+    assert index.get(fleet[0]['InstanceId']) == fleet[0]['PrivateIpAddress']
+    assert len(index) == 12
+    assert len(calls) == 3
+    assert limiter.stats() == {'granted': 3, 'rejected': 0}
+
+def test_open_breaker_keeps_the_refresh_from_calling_ec2(ec2, fleet_index, throttling):
+    fleet = run_fleet(ec2, 2, {'dcv:fleet': 'test'})
+    breaker = throttling.CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    index = fleet_index.FleetIndex(ec2, fleet_index.fleet_filters(tag='dcv:fleet=test'),
+                                   breaker=breaker)
+    calls = count_calls(ec2, 'ec2.DescribeInstances')
+
+    assert index.get(fleet[0]['InstanceId']) is None
+    assert calls == []
+    assert index.refreshes == 0
+    assert breaker.stats()['rejected'] == 1
+
+def test_exhausted_rate_limit_keeps_the_previous_snapshot(ec2, fleet_index, throttling):
+    fleet = run_fleet(ec2, 2, {'dcv:fleet': 'test'})
+    clock = [0.0]
+    limiter = throttling.TokenBucket(rate=1, burst=1, clock=lambda: clock[0])
+    index = fleet_index.FleetIndex(ec2, fleet_index.fleet_filters(tag='dcv:fleet=test'),
+                                   refresh_interval=10, rate_limiter=limiter, rate_limit_wait=0,
+                                   clock=lambda: clock[0])
+    index.refresh()
+
+    with pytest.raises(throttling.CallRefused):
+        index.refresh()
+    assert index.get(fleet[1]['InstanceId']) == fleet[1]['PrivateIpAddress']
+
+def test_resolver_fleet_index_shares_the_ec2_budget(load_resolver):
+    resolver = load_resolver('resolver', FLEET_TAG='dcv:fleet=test', EC2_RATE_LIMIT=5)
+
+    assert resolver.fleet_index.rate_limiter is resolver.ec2_rate_limiter
+    assert resolver.fleet_index.breaker is resolver.ec2_breaker
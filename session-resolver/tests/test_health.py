@@ -0,0 +1,120 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of health-gated resolution against local listening sockets """
+
+import json
+import socket
+import sys
+import time
+
+import pytest
+
+from benchmarks.common import StubEc2
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+@pytest.fixture
+def listener():
+    """ Listens on a local port, as a DCV server that accepts connections """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(64)
+    yield server
+    server.close()
+
+@pytest.fixture
+def closed_port():
+    """ Returns a local port nothing listens on """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+@pytest.fixture
+def health(load_resolver):
+    return load_resolver('health')
+
+def health_gated_resolver(load_resolver, port, endpoints):
+    """ Loads the resolver with health checks on port and EC2 answering from endpoints """
+    resolver = load_resolver('resolver', HEALTH_CHECKS='true', DCV_TCP_PORT=port,
+                             HEALTH_PROBE_TIMEOUT_SECONDS=0.25, HEALTH_TTL_SECONDS=60)
+    resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances', StubEc2(endpoints))
+    return resolver
+
+def wait_for(condition, timeout=2.0):
+    """ Polls condition until it holds or the timeout passes """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_probe_tells_listening_from_closed_ports(health, listener, closed_port):
+    checker = health.HealthChecker(timeout=0.25)
+
+    assert checker.is_reachable('127.0.0.1', listener.getsockname()[1])
+    assert not checker.is_reachable('127.0.0.1', closed_port)
+    assert checker.stats() == {'endpoints': 2, 'unreachable': 1, 'probes': 2, 'failedProbes': 1}
+
+def test_cached_status_is_answered_without_probing(health, listener):
+    checker = health.HealthChecker(ttl=60, timeout=0.25)
+    port = listener.getsockname()[1]
+    checker.is_reachable('127.0.0.1', port)
+
+    for _ in range(10):
+        assert checker.is_reachable('127.0.0.1', port)
+    assert checker.stats()['probes'] == 1
+
+def test_stale_status_is_refreshed_in_the_background(health, listener):
+    clock = [0.0]
+    checker = health.HealthChecker(ttl=10, timeout=0.25, clock=lambda: clock[0])
+    port = listener.getsockname()[1]
+    assert checker.is_reachable('127.0.0.1', port)
+
+    listener.close()
+    clock[0] = 11.0
+
+    # The stale answer is returned at once and the background probe finds the server gone
+    assert checker.is_reachable('127.0.0.1', port)
+    assert wait_for(lambda: not checker.is_reachable('127.0.0.1', port))
+
+def test_reachable_server_is_resolved(load_resolver, listener, request_event):
+    resolver = health_gated_resolver(load_resolver, listener.getsockname()[1],
+                                     {INSTANCE_ID: '127.0.0.1'})
+
+    response = resolver.lambda_handler(request_event(INSTANCE_ID, 'QUIC'), None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['DcvServerEndpoint'] == '127.0.0.1'
+
+def test_unreachable_server_fails_fast(load_resolver, closed_port, request_event):
+    resolver = health_gated_resolver(load_resolver, closed_port, {INSTANCE_ID: '127.0.0.1'})
+    resolver.lambda_handler(request_event(INSTANCE_ID), None)
+
+    start = time.perf_counter()
+    response = resolver.lambda_handler(request_event(INSTANCE_ID), None)
+    elapsed = time.perf_counter() - start
+
+    assert response['statusCode'] == 503
+    assert elapsed < resolver.HEALTH_PROBE_TIMEOUT_SECONDS
+
+def test_pool_skips_unreachable_members(load_resolver, listener, request_event):
+    resolver = health_gated_resolver(load_resolver, listener.getsockname()[1], {})
+    pools = sys.modules['pools']
+    # Only 127.0.0.1 listens, 127.0.0.2 refuses connections to the same port
+    strategy = pools.LeastConnections([
+        {'InstanceId': 'i-00000000000000001', 'PrivateIpAddress': '127.0.0.2'},
+        {'InstanceId': 'i-00000000000000002', 'PrivateIpAddress': '127.0.0.1'}
+    ], {})
+
+    class Pools:
+        def select(self, pool, client_key=None):
+            return strategy.select(client_key) if pool == 'cad' else None
+    resolver.pool_table = Pools()
+
+    bodies = [json.loads(resolver.lambda_handler(request_event('cad'), None)['body']) for _ in range(4)]
+
+    assert {body['DcvServerEndpoint'] for body in bodies} == {'127.0.0.1'}
@@ -0,0 +1,136 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the DynamoDB endpoint index, with EC2 and DynamoDB emulated by moto """
+
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+TABLE_NAME = 'dcv-session-index-test'
+
+
+@pytest.fixture
+def aws():
+    """ Returns moto EC2 and DynamoDB clients with an empty index table """
+    with mock_aws():
+        dynamodb = boto3.client('dynamodb')
+        dynamodb.create_table(TableName=TABLE_NAME,
+                              KeySchema=[{'AttributeName': 'SessionId', 'KeyType': 'HASH'}],
+                              AttributeDefinitions=[{'AttributeName': 'SessionId', 'AttributeType': 'S'}],
+                              BillingMode='PAY_PER_REQUEST')
+        yield boto3.client('ec2'), dynamodb
+
+@pytest.fixture
+def indexer(aws, load_resolver):
+    return load_resolver('indexer', INDEX_TABLE_NAME=TABLE_NAME)
+
+@pytest.fixture
+def resolver(aws, load_resolver):
+    return load_resolver('resolver', INDEX_TABLE_NAME=TABLE_NAME, EC2_RATE_LIMIT=0)
+
+def run_instance(ec2, tags=None):
+    """ Starts a moto instance with the given tags and returns its description """
+    image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+    options = {}
+    if tags:
+        options['TagSpecifications'] = [{
+            'ResourceType': 'instance',
+            'Tags': [{'Key': key, 'Value': value} for key, value in tags.items()]
+        }]
+    return ec2.run_instances(ImageId=image_id, MinCount=1, MaxCount=1, **options)['Instances'][0]
+
+def state_change(instance_id, state):
+    """ Returns an EC2 Instance State-change Notification event """
+    return {'detail': {'instance-id': instance_id, 'state': state}}
+
+def index_item(dynamodb, session_id):
+    return dynamodb.get_item(TableName=TABLE_NAME, Key={'SessionId': {'S': session_id}}).get('Item')
+
+def count_calls(client, event_name):
+    """ Returns a list that grows by one entry for every matching API call of a client """
+    calls = []
+    client.meta.events.register(f"before-parameter-build.{event_name}",
+                                lambda **kwargs: calls.append(event_name))
+    return calls
+
+
+def test_running_instance_is_indexed_under_its_id_and_aliases(aws, indexer):
+    ec2, dynamodb = aws
+    instance = run_instance(ec2, {'dcv:session-alias': 'cad-01', 'dcv:tcp-port': '9443'})
+
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+
+    item = index_item(dynamodb, instance['InstanceId'])
+    assert item['PrivateIpAddress']['S'] == instance['PrivateIpAddress']
+    assert item['TcpPort']['N'] == '9443'
+    assert item['UdpPort']['N'] == '8443'
+    assert item['State']['S'] == 'running'
+    assert item['Aliases']['SS'] == ['cad-01']
+    assert index_item(dynamodb, 'cad-01')['InstanceId']['S'] == instance['InstanceId']
+
+def test_removed_alias_tag_is_dropped_on_reindex(aws, indexer):
+    ec2, dynamodb = aws
+    instance = run_instance(ec2, {'dcv:session-alias': 'cad-01'})
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+
+    ec2.delete_tags(Resources=[instance['InstanceId']], Tags=[{'Key': 'dcv:session-alias'}])
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+
+    assert index_item(dynamodb, 'cad-01') is None
+    assert 'Aliases' not in index_item(dynamodb, instance['InstanceId'])
+
+def test_state_changes_update_and_terminate_removes_every_entry(aws, indexer):
+    ec2, dynamodb = aws
+    instance = run_instance(ec2, {'dcv:session-alias': 'cad-01'})
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'stopped'), None)
+    assert index_item(dynamodb, instance['InstanceId'])['State']['S'] == 'stopped'
+    assert index_item(dynamodb, 'cad-01')['State']['S'] == 'stopped'
+
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'terminated'), None)
+    assert index_item(dynamodb, instance['InstanceId']) is None
+    assert index_item(dynamodb, 'cad-01') is None
+
+def test_resolver_answers_indexed_sessions_without_describe_instances(aws, indexer, resolver,
+                                                                     request_event):
+    ec2, _ = aws
+    instance = run_instance(ec2, {'dcv:session-alias': 'cad-01', 'dcv:udp-port': '9443'})
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+    describe_calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    get_item_calls = count_calls(resolver.dynamodb, 'dynamodb.GetItem')
+
+    response = resolver.lambda_handler(request_event('cad-01', 'QUIC'), None)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['DcvServerEndpoint'] == instance['PrivateIpAddress']
+    assert body['Port'] == 9443
+    assert body['TransportProtocol'] == 'QUIC'
+    assert len(get_item_calls) == 1
+    assert describe_calls == []
+
+def test_resolver_falls_back_to_ec2_on_index_miss(aws, resolver, request_event):
+    ec2, _ = aws
+    instance = run_instance(ec2)
+    describe_calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+
+    response = resolver.lambda_handler(request_event(instance['InstanceId']), None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['DcvServerEndpoint'] == instance['PrivateIpAddress']
+    assert len(describe_calls) == 1
+
+def test_resolver_does_not_use_stopped_index_entries(aws, indexer, resolver, request_event):
+    ec2, _ = aws
+    instance = run_instance(ec2, {'dcv:session-alias': 'cad-01'})
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'running'), None)
+    indexer.lambda_handler(state_change(instance['InstanceId'], 'stopped'), None)
+
+    response = resolver.lambda_handler(request_event('cad-01'), None)
+
+    # An alias is not an instance ID, so the EC2 fallback cannot find it either
+    assert response['statusCode'] == 404
@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the pool load balancing strategies and the pool table """
+
+import collections
+import sys
+import threading
+
+import boto3
+import pytest
+from moto import mock_aws
+
+
+@pytest.fixture
+def pools(load_resolver):
+    return load_resolver('pools')
+
+def members(count):
+    return [{'InstanceId': f"i-{number:017x}", 'PrivateIpAddress': f"10.0.0.{number}"}
+            for number in range(count)]
+
+def pick_many(strategy, picks, threads=8):
+    """ Picks from several threads at once and returns the picks per member """
+    counts = collections.Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    def worker():
+        barrier.wait()
+        for _ in range(picks // threads):
+            member = strategy.select()
+            with lock:
+                counts[member['InstanceId']] += 1
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counts
+
+
+@pytest.mark.parametrize('name', ['least-connections', 'power-of-two-choices'])
+def test_concurrent_picks_are_all_counted(pools, name):
+    strategy = pools.STRATEGIES[name](members(4), {}, pick_ttl=0)
+
+    counts = pick_many(strategy, 8000)
+
+    assert sum(counts.values()) == 8000
+    assert strategy.loads() == dict(counts)
+
+def test_least_connections_starts_with_the_least_loaded_member(pools):
+    pool = members(3)
+    strategy = pools.LeastConnections(pool, {pool[0]['InstanceId']: 5, pool[1]['InstanceId']: 1,
+                                             pool[2]['InstanceId']: 3})
+
+    picks = [strategy.select()['InstanceId'] for _ in range(4)]
+
+    # Members with the same count take turns, the one that waited longest first
+    assert picks == [pool[1]['InstanceId'], pool[1]['InstanceId'], pool[2]['InstanceId'],
+                     pool[1]['InstanceId']]
+
+@pytest.mark.parametrize('name', ['least-connections', 'power-of-two-choices'])
+def test_picks_age_out(pools, name):
+    clock = [0.0]
+    pool = members(2)
+    strategy = pools.STRATEGIES[name](pool, {pool[0]['InstanceId']: 2}, pick_ttl=30,
+                                      clock=lambda: clock[0])
+    for _ in range(4):
+        strategy.select()
+    assert sum(strategy.loads().values()) == 6
+
+    clock[0] = 31.0
+
+    assert strategy.loads() == {pool[0]['InstanceId']: 2, pool[1]['InstanceId']: 0}
+
+def test_least_connections_goes_back_to_an_idle_member(pools):
+    clock = [0.0]
+    pool = members(2)
+    strategy = pools.LeastConnections(pool, {}, pick_ttl=30, clock=lambda: clock[0])
+    for _ in range(10):
+        strategy.select()
+    clock[0] = 20.0
+    for _ in range(3):
+        strategy.select()
+
+    clock[0] = 31.0
+
+    # The first ten picks aged out, member 0 still carries two of the newer picks and member 1 one
+    assert strategy.select()['InstanceId'] == pool[1]['InstanceId']
+
+def test_pool_table_routes_tagged_instances_within_the_ec2_budget(pools):
+    throttling = sys.modules['throttling']
+    with mock_aws():
+        ec2 = boto3.client('ec2')
+        image_id = ec2.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+        for pool in ('cad', 'cad', 'render'):
+            ec2.run_instances(ImageId=image_id, MinCount=1, MaxCount=1, TagSpecifications=[{
+                'ResourceType': 'instance', 'Tags': [{'Key': 'dcv:pool', 'Value': pool}]}])
+        limiter = throttling.TokenBucket(rate=10, burst=10)
+        table = pools.PoolTable(ec2, 'dcv:pool', rate_limiter=limiter)
+
+        picked = {table.select('cad')['InstanceId'] for _ in range(2)}
+
+    assert len(picked) == 2
+    assert table.select('unknown') is None
+    assert limiter.stats()['granted'] == 1
@@ -0,0 +1,138 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the standalone server keep-alive and request coalescing over local sockets """
+
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from benchmarks.common import StubEc2, count_calls
+
+INSTANCE_ID = 'i-0123456789abcdef0'
+
+
+@pytest.fixture
+def resolver(load_resolver):
+    resolver = load_resolver('resolver', CACHE_MAX_SIZE=0)
+    resolver.ec2.meta.events.register('before-parameter-build.ec2.DescribeInstances',
+                                      lambda **kwargs: time.sleep(0.2))
+    resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances',
+                                      StubEc2({INSTANCE_ID: '10.0.0.10'}))
+    return resolver
+
+@pytest.fixture
+def server(resolver):
+    """ Serves the resolver on a local port from a background event loop """
+    import server as server_module
+    loop = asyncio.new_event_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=16)
+    resolver_server = server_module.ResolverServer(executor)
+    listening = loop.run_until_complete(
+        asyncio.start_server(resolver_server.handle_connection, '127.0.0.1', 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    resolver_server.port = listening.sockets[0].getsockname()[1]
+    yield resolver_server
+
+    async def shutdown():
+        # Ends the connection handlers still waiting on idle keep-alive connections
+        listening.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    executor.shutdown(wait=False)
+
+def post(connection, session_id, transport='HTTP', headers=None):
+    """ Sends a gateway resolveSession request and returns the response and its body """
+    connection.request('POST', f"/resolveSession?sessionId={session_id}&transport={transport}",
+                       headers=headers or {})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def test_requests_share_a_keep_alive_connection(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+
+    first, first_body = post(connection, INSTANCE_ID)
+    socket = connection.sock
+    second, second_body = post(connection, INSTANCE_ID, 'QUIC')
+
+    assert (first.status, second.status) == (200, 200)
+    assert first.getheader('Connection') == 'keep-alive'
+    assert connection.sock is socket
+    assert json.loads(first_body)['TransportProtocol'] == 'HTTP'
+    assert json.loads(second_body)['TransportProtocol'] == 'QUIC'
+    connection.close()
+
+def test_connection_close_is_honoured(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+
+    response, _ = post(connection, INSTANCE_ID, headers={'Connection': 'close'})
+
+    assert response.getheader('Connection') == 'close'
+    assert connection.sock is None
+    connection.close()
+
+def test_form_encoded_body_and_health_check(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+
+    connection.request('POST', '/resolveSession', body=f"sessionId={INSTANCE_ID}&transport=HTTP",
+                       headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    resolved = connection.getresponse()
+    resolved.read()
+    connection.request('GET', '/health')
+    health = connection.getresponse()
+    health.read()
+
+    assert (resolved.status, health.status) == (200, 200)
+    connection.close()
+
+def test_identical_concurrent_requests_make_one_lookup(resolver, server):
+    calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    def resolve(_):
+        connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+        try:
+            return post(connection, INSTANCE_ID)[0].status
+        finally:
+            connection.close()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as clients:
+        statuses = list(clients.map(resolve, range(10)))
+
+    assert statuses == [200] * 10
+    assert len(calls) == 1
+    assert server.inflight.stats()['upstreamCalls'] + server.inflight.stats()['savedCalls'] == 10
+    assert server.inflight.stats()['savedCalls'] >= 1
+
+@pytest.mark.parametrize('request_head', [
+    b"POST /resolveSession HTTP/1.1\r\nHost: resolver\r\n",
+    b"POST /resolveSession HTTP/1.1\r\nContent-Length: 64\r\n\r\nsessionId="
+], ids=['stalled-headers', 'short-body'])
+def test_stalled_request_is_closed_with_408(server, monkeypatch, request_head):
+    monkeypatch.setattr(sys.modules['server'], 'REQUEST_TIMEOUT', 0.2)
+    client = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+
+    start = time.perf_counter()
+    client.sendall(request_head)
+    response = b''
+    while chunk := client.recv(4096):
+        response += chunk
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    assert response.startswith(b"HTTP/1.1 408 Request Timeout\r\n")
+    assert b"Connection: close" in response
+    assert elapsed < 2
@@ -0,0 +1,124 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the threaded and asyncio request coalescing """
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+CALLERS = 8
+
+
+@pytest.fixture
+def singleflight(load_resolver):
+    return load_resolver('singleflight')
+
+def call_together(flight, key, function, callers=CALLERS):
+    """ Calls flight.do from several threads at once and returns their results or exceptions """
+    outcomes = [None] * callers
+    barrier = threading.Barrier(callers)
+    def caller(index):
+        barrier.wait()
+        try:
+            outcomes[index] = flight.do(key, function, index)
+        except Exception as error:
+            outcomes[index] = error
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+def blocking(release, calls):
+    """ Returns a function that counts its calls and blocks until release is set """
+    def function(index):
+        calls.append(index)
+        release.wait(5)
+        if isinstance(release.outcome, Exception):
+            raise release.outcome
+        return release.outcome
+    return function
+
+def finish(threads, release, outcome, waiters):
+    """ Lets the upstream call end with outcome once every other caller waits on it """
+    for _ in range(5000):
+        if waiters() >= CALLERS - 1:
+            break
+        time.sleep(0.001)
+    release.outcome = outcome
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_callers_share_one_call(singleflight):
+    flight = singleflight.SingleFlight()
+    release, calls = threading.Event(), []
+
+    threads, outcomes = call_together(flight, 'key', blocking(release, calls))
+    finish(threads, release, {'statusCode': 200}, lambda: flight.saved_calls)
+
+    assert len(calls) == 1
+    assert outcomes == [{'statusCode': 200}] * CALLERS
+    assert flight.stats() == {'upstreamCalls': 1, 'savedCalls': CALLERS - 1}
+
+def test_exception_reaches_every_caller(singleflight):
+    flight = singleflight.SingleFlight()
+    release, calls = threading.Event(), []
+    error = RuntimeError("EC2 unavailable")
+
+    threads, outcomes = call_together(flight, 'key', blocking(release, calls))
+    finish(threads, release, error, lambda: flight.saved_calls)
+
+    assert len(calls) == 1
+    assert all(outcome is error for outcome in outcomes)
+
+def test_finished_call_is_not_shared(singleflight):
+    flight = singleflight.SingleFlight()
+
+    assert [flight.do('key', lambda value: value, index) for index in range(3)] == [0, 1, 2]
+    assert flight.stats() == {'upstreamCalls': 3, 'savedCalls': 0}
+
+def test_different_keys_do_not_wait_on_each_other(singleflight):
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+    blocked = threading.Thread(target=flight.do, args=('slow', release.wait, 5))
+    blocked.start()
+
+    assert flight.do('fast', lambda value: value, 'done') == 'done'
+    release.set()
+    blocked.join()
+
+def test_async_callers_share_one_call(singleflight):
+    flight = singleflight.AsyncSingleFlight()
+    calls = []
+
+    async def lookup(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return {'statusCode': 200}
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', lookup, 'key') for _ in range(CALLERS)))
+
+    assert asyncio.run(main()) == [{'statusCode': 200}] * CALLERS
+    assert calls == ['key']
+    assert flight.stats() == {'upstreamCalls': 1, 'savedCalls': CALLERS - 1}
+
+def test_cancelled_async_waiter_does_not_cancel_the_call(singleflight):
+    flight = singleflight.AsyncSingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.05)
+        return 'resolved'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('key', lookup))
+        second = asyncio.ensure_future(flight.do('key', lookup))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'resolved'
@@ -0,0 +1,109 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Tests of the EC2 call budget, circuit breaker and last known good endpoints """
+
+import collections
+import concurrent.futures
+import time
+
+import pytest
+
+from benchmarks.common import StubEc2, count_calls, peak_rate
+
+FLEET = {f"i-{number:017x}": f"10.0.{number >> 8 & 255}.{number & 255}" for number in range(400)}
+
+
+class ThrottlingEc2:
+    """ Answers every DescribeInstances call with RequestLimitExceeded """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        from botocore.awsrequest import AWSResponse
+        self.calls += 1
+        return AWSResponse(None, 503, {}, None), {
+            'Error': {'Code': 'RequestLimitExceeded', 'Message': "Request limit exceeded."},
+            'ResponseMetadata': {'HTTPStatusCode': 503}
+        }
+
+
+def stub_ec2(resolver, handler, latency=0.0):
+    """ Answers the resolver's DescribeInstances calls with handler and counts them """
+    calls = count_calls(resolver.ec2, 'ec2.DescribeInstances')
+    if latency:
+        resolver.ec2.meta.events.register('before-parameter-build.ec2.DescribeInstances',
+                                          lambda **kwargs: time.sleep(latency))
+    resolver.ec2.meta.events.register('before-call.ec2.DescribeInstances', handler)
+    return calls
+
+def replay(resolver, session_ids, threads=16):
+    """ Resolves the session IDs from a thread pool and returns the status codes """
+    def invoke(session_id):
+        return resolver.lambda_handler(
+            {'queryStringParameters': {'sessionId': session_id, 'transport': 'HTTP'}}, None)['statusCode']
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        return collections.Counter(executor.map(invoke, session_ids))
+
+
+def test_rate_limit_is_off_by_default(load_resolver):
+    resolver = load_resolver('resolver')
+
+    assert resolver.EC2_RATE_LIMIT == 0
+    assert all(resolver.ec2_rate_limiter.acquire() for _ in range(1000))
+
+def test_load_stays_within_the_ec2_call_budget(load_resolver):
+    rate, burst = 20, 10
+    resolver = load_resolver('resolver', EC2_RATE_LIMIT=rate, EC2_BURST=burst,
+                             EC2_RATE_LIMIT_WAIT_SECONDS=0.05)
+    calls = stub_ec2(resolver, StubEc2(FLEET), latency=0.002)
+    # Cold lookups across the fleet, each instance requested a few times
+    session_ids = [instance_id for instance_id in list(FLEET)[:150] for _ in range(4)]
+
+    start = time.perf_counter()
+    statuses = replay(resolver, session_ids)
+    elapsed = time.perf_counter() - start
+
+    assert len(calls) <= burst + rate * elapsed
+    assert peak_rate(calls) <= burst + rate
+    # Turned away lookups are unavailable, never reported as unknown sessions
+    assert set(statuses) <= {200, 503}
+    assert statuses[200] >= len(calls)
+    assert resolver.ec2_rate_limiter.stats()['granted'] == len(calls)
+
+def test_throttled_lookups_open_the_breaker_and_are_not_cached_as_not_found(load_resolver):
+    resolver = load_resolver('resolver', EC2_BREAKER_FAILURE_THRESHOLD=3, EC2_BREAKER_RESET_SECONDS=60,
+                             CLIENT_MAX_ATTEMPTS=1)
+    ec2 = ThrottlingEc2()
+    stub_ec2(resolver, ec2)
+    session_ids = list(FLEET)[:10]
+
+    statuses = replay(resolver, session_ids, threads=1)
+
+    assert statuses == {503: 10}
+    assert ec2.calls == 3
+    assert resolver.ec2_breaker.stats()['state'] == 'open'
+    assert all(resolver.endpoint_cache.get(session_id) is None for session_id in session_ids)
+
+def test_last_known_good_endpoint_is_served_while_ec2_throttles(load_resolver):
+    resolver = load_resolver('resolver', CACHE_TTL_SECONDS=0, CLIENT_MAX_ATTEMPTS=1)
+    instance_id = next(iter(FLEET))
+    stub = StubEc2(FLEET)
+    stub_ec2(resolver, lambda **kwargs: stub(**kwargs) if not throttled else ThrottlingEc2()(**kwargs))
+    throttled = False
+    assert replay(resolver, [instance_id]) == {200: 1}
+
+    throttled = True
+    response = resolver.resolve_session(instance_id, 'HTTP')
+
+    assert response['statusCode'] == 200
+    assert resolver.last_known_good.stats()['hits'] >= 1
+
+def test_unknown_instance_is_not_found(load_resolver):
+    resolver = load_resolver('resolver', CLIENT_MAX_ATTEMPTS=1)
+    calls = stub_ec2(resolver, StubEc2(FLEET))
+
+    assert replay(resolver, ['i-0fffffffffffffff0'] * 3, threads=1) == {404: 3}
+    # The not-found answer is cached
+    assert len(calls) == 1
@@ -0,0 +1,166 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Error codes AWS APIs use when a caller exceeds its request rate
+THROTTLING_ERROR_CODES = frozenset([
+    'RequestLimitExceeded',
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException'
+])
+
+
+def is_throttling(error):
+    """ Tells whether an API error means the caller is being throttled """
+    return (isinstance(error, ClientError)
+            and error.response['Error']['Code'] in THROTTLING_ERROR_CODES)
+
+def guarded_call(method, rate_limiter=None, breaker=None, max_wait=0.0, **kwargs):
+    """ Calls an AWS API method through a rate limiter and a circuit breaker
+
+    A call the breaker or the limiter turns away raises CallRefused without
+    reaching the API. Throttled and timed out calls count as breaker failures,
+    any other answer from the API closes the breaker.
+    """
+    if breaker is not None and not breaker.allow():
+        raise CallRefused("Circuit breaker open")
+    if rate_limiter is not None and not rate_limiter.acquire(max_wait):
+        raise CallRefused("Rate limit exceeded")
+    try:
+        response = method(**kwargs)
+    except ClientError as error:
+        if breaker is not None:
+            if is_throttling(error):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        raise
+    except BotoCoreError:
+        if breaker is not None:
+            breaker.record_failure()
+        raise
+    if breaker is not None:
+        breaker.record_success()
+    return response
+
+
+class CallRefused(Exception):
+    """ Raised when the rate limiter or the circuit breaker keeps a call from reaching the API """
+
+
+class TokenBucket:
+    """ Client-side rate limiter for the API calls of a Lambda container
+
+    Holds up to burst tokens and refills at rate tokens per second. A caller
+    that finds the bucket empty may wait for the next token when it arrives
+    within max_wait, otherwise it is turned away without calling the API.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+
+    def acquire(self, max_wait=0.0):
+        """ Takes one token, returns False when none is available within max_wait seconds """
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                self.rejected += 1
+                return False
+            # A negative balance reserves the token of a waiting caller
+            self._tokens -= 1
+            self.granted += 1
+        if wait > 0:
+            self._sleep(wait)
+        return True
+
+    def stats(self):
+        """ Returns how many calls were let through and turned away """
+        return {
+            'granted': self.granted,
+            'rejected': self.rejected
+        }
+
+
+class CircuitBreaker:
+    """ Stops calling an API that keeps throttling or timing out
+
+    The breaker opens after failure_threshold consecutive failures. While it
+    is open, calls are refused without reaching the API, except for one trial
+    call every reset_timeout seconds. A successful trial closes the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=5.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        """ Returns 'closed', 'open' or 'half-open' when a trial call is due """
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """ Tells whether a call may go through to the API """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at >= self.reset_timeout:
+                # Let one trial through and restart the timer for the others
+                self._opened_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """ Closes the breaker after a call the API answered """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """ Counts a throttled or timed out call, opening the breaker at the threshold """
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None:
+                self._opened_at = self._clock()
+            elif self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self.opens += 1
+
+    def stats(self):
+        """ Returns the breaker state and how often it opened and refused calls """
+        return {
+            'state': self.state,
+            'opens': self.opens,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+""" Builds per-phase latency tables from captured resolver EMF log records
+
+Accepts any text file holding the resolver's metrics records one per line,
+for example the output of
+    aws logs tail /aws/lambda/<resolver-function> --since 1h > resolver.log
+or an export of the log group. Lines that are not EMF records are skipped.
+
+    python tools/emf_report.py resolver.log [more.log ...]
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+PHASE_ORDER = ['Parse', 'CacheLookup', 'IndexLookup', 'Ec2Call', 'BrokerLookup', 'PoolSelect',
+               'HealthCheck', 'Serialize', 'Total']
+
+
+def percentile(samples, pct):
+    """ Returns the pct percentile of an already sorted list of samples """
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+def read_records(paths):
+    """ Yields the EMF records found in the given log files """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as log_file:
+            for line in log_file:
+                start = line.find('{"_aws"')
+                if start < 0:
+                    continue
+                try:
+                    record = json.loads(line[start:])
+                except ValueError:
+                    continue
+                yield record
+
+def aggregate(records, group_by):
+    """ Groups the phase timings of the records by the given dimensions """
+    groups = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        key = tuple(str(record.get(dimension)) for dimension in group_by)
+        metrics = record['_aws']['CloudWatchMetrics'][0]['Metrics']
+        for metric in metrics:
+            if metric['Name'] in record:
+                groups[key][metric['Name']].append(float(record[metric['Name']]))
+    return groups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', nargs='+', help="captured log files")
+    parser.add_argument('--group-by', default='Transport,Outcome',
+                        help="comma-separated record fields to group by, empty for a single table")
+    args = parser.parse_args()
+
+    group_by = [field for field in args.group_by.split(',') if field]
+    groups = aggregate(read_records(args.logs), group_by)
+    if not groups:
+        print("No EMF records found")
+        return
+
+    for key in sorted(groups):
+        phases = groups[key]
+        title = ', '.join(f"{field}={value}" for field, value in zip(group_by, key)) or 'All requests'
+        print(f"\n{title} ({len(phases.get('Total', []))} requests)")
+        print(f"{'phase':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for phase in sorted(phases, key=lambda name: (name not in PHASE_ORDER,
+                                                      PHASE_ORDER.index(name) if name in PHASE_ORDER else 0,
+                                                      name)):
+            samples = sorted(phases[phase])
+            print(f"{phase:<14}{len(samples):>8}"
+                  f"{percentile(samples, 50):>10.2f}"
+                  f"{percentile(samples, 95):>10.2f}"
+                  f"{percentile(samples, 99):>10.2f}"
+                  f"{samples[-1]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
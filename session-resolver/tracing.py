@@ -0,0 +1,63 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import json
+import sys
+import threading
+import time
+
+TRANSPORTS = ('HTTP', 'QUIC')
+
+
+class TraceWriter:
+    """ Writes one compact record per resolver request, for benchmarks/replay.py
+
+    A record holds the request timestamp in milliseconds, a salted hash of the
+    session ID, the transport and the status code returned. Session IDs, client
+    addresses and DCV server endpoints are never written, and the hash still
+    tells repeated requests for the same session apart from new ones.
+    """
+
+    def __init__(self, path='', salt=''):
+        self.salt = salt.encode('utf-8')
+        self._lock = threading.Lock()
+        # Lambda writes to stdout, where CloudWatch Logs picks the records up
+        self._file = open(path, 'a', encoding='utf-8') if path else sys.stdout
+        self.records = 0
+
+    def hash_session(self, session_id):
+        """ Returns the salted hash of a session ID, None when the request had none """
+        if session_id is None:
+            return None
+        digest = hashlib.sha256(self.salt + str(session_id).encode('utf-8', errors='replace'))
+        return digest.hexdigest()[:16]
+
+    def record(self, session_id, transport, status_code):
+        """ Appends a finished request to the trace """
+        line = json.dumps({
+            '_trace': 1,
+            'ts': int(time.time() * 1000),
+            'session': self.hash_session(session_id),
+            # Keep whatever the client sent out of the trace
+            'transport': transport if transport in TRANSPORTS else 'Invalid',
+            'outcome': status_code
+        }, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.records += 1
+
+
+def read_trace(paths):
+    """ Yields the trace records found in trace files or captured logs, in file order """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as trace_file:
+            for line in trace_file:
+                start = line.find('{"_trace"')
+                if start < 0:
+                    continue
+                try:
+                    yield json.loads(line[start:])
+                except ValueError:
+                    continue